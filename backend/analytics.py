@@ -0,0 +1,126 @@
+"""
+文章按天统计
+浏览、点赞、评论先按 (日期, 文章, 指标) 累加在缓存中，同时记录待写入的文章id，
+定时任务只把这些文章的计数批量写入 ArticleDailyStats，每篇文章每天只有一行；作者统计接口按日期范围读取这张窄表，不需要逐条事件的明细
+"""
+import datetime
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+
+from .dirty import drain as drain_dirty, mark as mark_dirty
+from .models import Article, ArticleDailyStats
+
+METRICS = ('views', 'likes', 'comments')
+# 缓存中的计数保留两天，跨零点时前一天的计数仍可写入
+BUCKET_TIMEOUT = 2 * 24 * 60 * 60
+MAX_RANGE_DAYS = 366
+FLUSH_BATCH_SIZE = 1000
+DIRTY_ANALYTICS = 'analytics'
+
+
+def bucket_key(day, article_id, metric):
+    return f'analytics:{day.isoformat()}:{article_id}:{metric}'
+
+
+def record(article_id, metric, delta=1, day=None):
+    """累加当天的计数，缓存不可用时丢弃"""
+    key = bucket_key(day or datetime.date.today(), article_id, metric)
+    cache.add(key, 0, BUCKET_TIMEOUT)
+    try:
+        value = cache.incr(key, delta)
+    except ValueError:
+        return
+    if value == delta:
+        # 从0开始累加时记录，定时任务只处理有待写入计数的文章
+        mark_dirty(DIRTY_ANALYTICS, article_id)
+
+
+def flush(days=None):
+    """将缓存中的计数写入数据库（默认今天和昨天），只处理记录过计数的文章，返回写入的行数"""
+    today = datetime.date.today()
+    days = days or [today - datetime.timedelta(days=1), today]
+    article_ids = sorted(drain_dirty(DIRTY_ANALYTICS))
+    written = 0
+    try:
+        for i in range(0, len(article_ids), FLUSH_BATCH_SIZE):
+            written += _flush_batch(article_ids[i:i + FLUSH_BATCH_SIZE], days)
+    except Exception:
+        # 未处理完的文章留到下次
+        mark_dirty(DIRTY_ANALYTICS, *article_ids)
+        raise
+    return written
+
+
+def _flush_batch(ids, days):
+    keys = {
+        bucket_key(day, article_id, metric): (article_id, day, metric)
+        for article_id in ids for day in days for metric in METRICS
+    }
+    deltas, flushed = {}, {}
+    for key, value in cache.get_many(list(keys)).items():
+        if not value:
+            continue
+        article_id, day, metric = keys[key]
+        deltas.setdefault((article_id, day), Counter())[metric] += value
+        flushed[key] = (article_id, value)
+    if not deltas:
+        return 0
+    written = _write(deltas, days)
+    # 写入成功后再扣减，写入失败时计数保留在缓存中，下次重试；期间新增的计数扣减后仍有剩余，文章留在待写入集合里
+    for key, (article_id, value) in flushed.items():
+        try:
+            remaining = cache.decr(key, value)
+        except ValueError:
+            continue
+        if remaining:
+            mark_dirty(DIRTY_ANALYTICS, article_id)
+    return written
+
+
+def _write(deltas, days):
+    """写入计数，返回写入的行数；已经删除的文章的计数丢弃"""
+    # 只有定时任务写入这张表（调度器保证同一时间只有一个节点执行），先查后写不会冲突
+    with transaction.atomic():
+        live = set(Article.all_objects.filter(pk__in={key[0] for key in deltas}).values_list('pk', flat=True))
+        deltas = {key: counts for key, counts in deltas.items() if key[0] in live}
+        existing = {
+            (row.article_id, row.day): row
+            for row in ArticleDailyStats.objects.filter(article_id__in=live, day__in=days)
+        }
+        created, updated = [], []
+        for (article_id, day), counts in deltas.items():
+            row = existing.get((article_id, day))
+            if row is None:
+                created.append(ArticleDailyStats(article_id=article_id, day=day, **counts))
+                continue
+            for metric, value in counts.items():
+                setattr(row, metric, getattr(row, metric) + value)
+            updated.append(row)
+        ArticleDailyStats.objects.bulk_create(created)
+        ArticleDailyStats.objects.bulk_update(updated, METRICS)
+    return len(deltas)
+
+
+def daily_series(article_ids, start, end):
+    """按天汇总多篇文章的计数，返回 start 到 end 的每一天（没有数据的日期补0）"""
+    rows = ArticleDailyStats.objects.filter(article_id__in=article_ids, day__range=(start, end)).values('day').annotate(
+        **{metric: Sum(metric) for metric in METRICS}
+    )
+    by_day = {row['day']: row for row in rows}
+    series = []
+    for offset in range((end - start).days + 1):
+        day = start + datetime.timedelta(days=offset)
+        row = by_day.get(day, {})
+        series.append({'date': day.isoformat(), **{metric: row.get(metric) or 0 for metric in METRICS}})
+    return series
+
+
+def article_totals(article_ids, start, end):
+    """按文章汇总日期范围内的计数，返回 {文章id: {指标: 数量}}"""
+    rows = ArticleDailyStats.objects.filter(article_id__in=article_ids, day__range=(start, end)).values(
+        'article_id',
+    ).annotate(**{metric: Sum(metric) for metric in METRICS})
+    return {row['article_id']: {metric: row[metric] for metric in METRICS} for row in rows}
@@ -0,0 +1,54 @@
+import datetime
+
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+
+from .analytics import MAX_RANGE_DAYS, METRICS, article_totals, daily_series
+from .models import Article
+
+DEFAULT_RANGE_DAYS = 30
+TOP_ARTICLES = 20
+
+
+def parse_day(value, default):
+    return datetime.date.fromisoformat(value) if value else default
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def author_stats(request):
+    """
+    当前作者文章的按天统计：?start=&end=（YYYY-MM-DD，默认最近30天），?article_id= 只看一篇文章。
+    数据由定时任务批量写入，最近几分钟的计数可能尚未计入
+    """
+    try:
+        end = parse_day(request.query_params.get('end'), datetime.date.today())
+        start = parse_day(request.query_params.get('start'), end - datetime.timedelta(days=DEFAULT_RANGE_DAYS - 1))
+    except ValueError:
+        return Response({'errors': '日期格式应为 YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+    if start > end or (end - start).days >= MAX_RANGE_DAYS:
+        return Response({'errors': f'日期范围应在 {MAX_RANGE_DAYS} 天以内'}, status=status.HTTP_400_BAD_REQUEST)
+
+    articles = Article.objects.filter(author_id=request.user.id)
+    article_id = request.query_params.get('article_id')
+    if article_id:
+        if not article_id.isdigit():
+            return Response({'errors': 'article_id 应为整数'}, status=status.HTTP_400_BAD_REQUEST)
+        articles = articles.filter(id=article_id)
+        if not articles.exists():
+            return Response({'errors': '文章不存在'}, status=status.HTTP_404_NOT_FOUND)
+    article_ids = articles.values('id')
+
+    totals = article_totals(article_ids, start, end)
+    top = sorted(totals.items(), key=lambda item: (-item[1]['views'], item[0]))[:TOP_ARTICLES]
+    titles = dict(Article.objects.filter(id__in=[article_id for article_id, _ in top]).values_list('id', 'title'))
+
+    return Response({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'series': daily_series(article_ids, start, end),
+        'totals': {metric: sum(counts[metric] for counts in totals.values()) for metric in METRICS},
+        'articles': [{'id': article_id, 'title': titles.get(article_id), **counts} for article_id, counts in top],
+    }, status=status.HTTP_200_OK)
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class BackendConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'backend'
+
+    def ready(self):
+        # 注册信号处理函数
+        from . import signals  # noqa: F401
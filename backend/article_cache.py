@@ -0,0 +1,62 @@
+"""
+文章详情缓存
+文章正文等不常变化的字段按 (id, updated_time) 缓存，计数与当前用户状态在读取时叠加
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+from .coalesce import coalesce
+from .models import Article
+
+BODY_TIMEOUT = 60 * 60
+
+
+def version_key(article_id):
+    return f'article:{article_id}:updated'
+
+
+def body_key(article_id, updated_time):
+    return f'article:{article_id}:body:{updated_time.timestamp()}'
+
+
+def get_article_version(article_id):
+    """获取文章的更新时间，文章不存在时返回None"""
+    updated_time = cache.get(version_key(article_id))
+    if updated_time is None:
+        updated_time = Article.objects.filter(id=article_id).values_list('updated_time', flat=True).first()
+        if updated_time is None:
+            return None
+        cache.set(version_key(article_id), updated_time, BODY_TIMEOUT)
+    return updated_time
+
+
+def get_article_body(article_id, updated_time):
+    """获取缓存的文章主体（不含计数和用户状态），缓存未命中时并发请求只查询一次"""
+    key = body_key(article_id, updated_time)
+    body = cache.get(key)
+    if body is None:
+        body = coalesce(key, lambda: load_article_body(article_id), timeout=BODY_TIMEOUT)
+    return body
+
+
+def load_article_body(article_id):
+    article = Article.objects.select_related('author', 'author__backend_profile').get(id=article_id)
+    profile_pic = article.author.backend_profile.profile_pic
+    return {
+        'author_id': article.author_id,
+        'title': article.title,
+        'content': article.content,
+        'pub_time': article.pub_time.isoformat(),
+        'author': article.author.username,
+        'category_id': article.category_id,
+        'updated_time': article.updated_time,
+        'profile_pic': profile_pic.url if profile_pic else None,
+        'tags': [tag.tag for tag in article.tags.all()],
+    }
+
+
+def invalidate_article(*article_ids):
+    """文章内容变化后使详情缓存失效（提交后再执行一次，避免缓存未提交前的旧数据）"""
+    keys = [version_key(article_id) for article_id in article_ids]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -1,11 +1,82 @@
-from django.db.models import Q, Prefetch, Count
+import hashlib
+import logging
+
+from django.core.cache import cache
+from django.db.models import Q, Count
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.views import APIView
-from .models import Article, Comment, Like, Dislike
+from .models import Article
+from .article_cache import get_article_version, get_article_body
+from .coalesce import coalesce
+from .counters import get_comment_counts, get_counts, get_counts_many, record_view
+from .conditional import FEED_GENERATION_KEY, make_etag, get_generation, get_modified, modified_key, not_modified, set_validators
+from .deletion import soft_delete_articles
+from .fieldsets import Field, parse_fields, project, render
 from .serializers import ArticleSerializer
+from .tagging import tagged_article_ids
+from .taxonomy import get_taxonomy
+from .viewer_state import get_viewer_state, get_viewer_states
+
+logger = logging.getLogger(__name__)
+
+# 计数字段存放在 ArticleStats 中，排序时需要映射
+STATS_ORDERING = {
+    'views': 'stats__views',
+    'like_count': 'stats__like_count',
+    'dislike_count': 'stats__dislike_count',
+}
+
+
+def stats_ordering(ordering):
+    descending = ordering.startswith('-')
+    field = ordering.lstrip('-')
+    field = STATS_ORDERING.get(field, field)
+    return f'-{field}' if descending else field
+
+
+def summarize(content):
+    return content[:150] + '...' if len(content) > 150 else content
+
+
+def profile_pic_url(user):
+    profile = user.backend_profile
+    return profile.profile_pic.url if profile.profile_pic else None
+
+
+# 文章列表可通过 ?fields= 选择的字段，未指定时按此顺序全部返回
+ARTICLE_LIST_FIELDS = {
+    'id': Field(lambda article, context: article.id),
+    'author': Field(lambda article, context: article.author.username,
+                    only=('author__username',), select_related=('author',)),
+    'title': Field(lambda article, context: article.title, only=('title',)),
+    'content': Field(lambda article, context: summarize(article.excerpt), only=('excerpt',)),
+    'pub_time': Field(lambda article, context: article.pub_time.isoformat(), only=('pub_time',)),
+    'category': Field(lambda article, context: context['category_names'][article.category_id], only=('category',)),
+    'views': Field(lambda article, context: article.stats.views,
+                   only=('stats__views',), select_related=('stats',)),
+    'like_count': Field(lambda article, context: article.stats.like_count,
+                        only=('stats__like_count',), select_related=('stats',)),
+    'dislike_count': Field(lambda article, context: article.stats.dislike_count,
+                           only=('stats__dislike_count',), select_related=('stats',)),
+    'comments_count': Field(lambda article, context: article.comment_count,
+                            annotations={'comment_count': Count('comments', distinct=True)}),
+    'updated_time': Field(lambda article, context: article.updated_time.isoformat(), only=('updated_time',)),
+    'profile_pic': Field(lambda article, context: profile_pic_url(article.author),
+                         only=('author__backend_profile__profile_pic',), select_related=('author__backend_profile',)),
+    'tags': Field(lambda article, context: [tag.tag for tag in article.tags.all()], prefetch_related=('tags',)),
+    'liked': Field(lambda article, context: context['viewer_states'][article.id]['liked']),
+    'disliked': Field(lambda article, context: context['viewer_states'][article.id]['disliked']),
+}
+# 与当前用户相关的字段，不进入共享的列表缓存
+VIEWER_FIELDS = ('liked', 'disliked')
+# 经常变化的计数字段，不进入共享的列表缓存，每次请求读取最新值
+COUNT_FIELDS = ('views', 'like_count', 'dislike_count', 'comments_count')
+EMPTY_COUNTS = {'views': 0, 'like_count': 0, 'dislike_count': 0}
+FEED_PAGE_TIMEOUT = 300
+COUNTER_ORDERING_TIMEOUT = 30  # 按计数排序时页内文章随计数变化，缓存时间不宜过长
 
 
 class ArticleList(APIView):
@@ -14,15 +85,90 @@ class ArticleList(APIView):
         """
         获取文章
         """
+        fields, invalid = parse_fields(request, ARTICLE_LIST_FIELDS)
+        if invalid:
+            return Response({
+                'errors': f'不支持的字段: {", ".join(invalid)}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
         # 获取分页参数
         page = int(request.query_params.get('page', 1))
         page_size = int(request.query_params.get('page_size', 16))
-        author_id = request.query_params.get('author_id')
-        
+
+        # 计数和点赞状态之外的内容按数据代数缓存（点赞、评论不更新代数）；
+        # 缓存失效时相同参数的并发请求只查询一次
+        shared_fields = [name for name in fields if name not in COUNT_FIELDS and name not in VIEWER_FIELDS]
+        generation = get_generation()
+        key = 'feed:page:' + hashlib.md5(f'{generation}:{request.get_full_path()}'.encode()).hexdigest()
+        data = cache.get(key)
+        if data is None:
+            ordering = request.query_params.get('ordering', '').lstrip('-')
+            timeout = COUNTER_ORDERING_TIMEOUT if ordering in STATS_ORDERING else FEED_PAGE_TIMEOUT
+            data = coalesce(key, lambda: self.load_page(request.query_params, shared_fields, page, page_size),
+                            timeout=timeout)
+
+        article_list = data['results']
+        overlay = None
+        if len(shared_fields) < len(fields):
+            overlay = self.load_overlay(data['ids'], fields, request.user)
+            # 缓存中的结果被多个请求共享，叠加计数和用户状态时生成新的字典
+            article_list = [
+                {name: overlay[article_id][name] if name in overlay[article_id] else item[name] for name in fields}
+                for article_id, item in zip(data['ids'], article_list)
+            ]
+
+        # 浏览量每次请求都会变化，不计入ETag；其余计数和点赞状态变化时只影响包含这些文章的页
+        versions = [
+            [article_id] + [value for name, value in sorted(overlay[article_id].items()) if name != 'views']
+            for article_id in data['ids']
+        ] if overlay is not None else None
+        etag = make_etag('feed', generation, request.get_full_path(), request.user.id, versions)
+        # 不含计数和用户状态时，列表只随数据代数变化，可以使用代数的修改时间
+        last_modified = None if overlay is not None else get_modified(modified_key(FEED_GENERATION_KEY))
+        response = not_modified(request, etag, last_modified, vary=['Authorization'])
+        if response is not None:
+            return response
+
+        total_count = data['count']
+        return set_validators(Response({
+            'results': article_list,
+            'count': total_count,
+            'page': page,
+            'page_size': page_size,
+            'total_pages': (total_count + page_size - 1) // page_size,
+        }), etag, last_modified, vary=['Authorization'])
+
+    def load_overlay(self, article_ids, fields, user):
+        """读取一页文章的最新计数和用户状态，返回 {文章id: {字段: 值}}，只包含请求的字段"""
+        overlay = {article_id: {} for article_id in article_ids}
+        names = [name for name in fields if name in COUNT_FIELDS and name != 'comments_count']
+        if names:
+            counts = get_counts_many(article_ids)
+            for article_id in article_ids:
+                row = counts.get(article_id, EMPTY_COUNTS)
+                overlay[article_id].update((name, row[name]) for name in names)
+        if 'comments_count' in fields:
+            for article_id, total in get_comment_counts(article_ids).items():
+                overlay[article_id]['comments_count'] = total
+        names = [name for name in fields if name in VIEWER_FIELDS]
+        if names:
+            states = get_viewer_states(article_ids, user)
+            for article_id in article_ids:
+                overlay[article_id].update((name, states[article_id][name]) for name in names)
+        return overlay
+
+    def load_page(self, params, fields, page, page_size):
+        """查询一页文章，返回 {'ids': 文章id列表, 'results': 按字段输出的列表, 'count': 总数}"""
+        author_id = params.get('author_id')
+
         # 获取搜索、排序和分类参数
-        search = request.query_params.get('search')
-        ordering = request.query_params.get('ordering')
-        category = request.query_params.get('category')
+        search = params.get('search')
+        ordering = params.get('ordering')
+        category = params.get('category')
+
+        # 获取标签参数，多个标签用逗号分隔，tag_mode=and 时要求包含全部标签
+        tags = params.get('tags')
+        match_all = params.get('tag_mode', 'or').lower() == 'and'
 
         # 分页查询
         start = (page - 1) * page_size
@@ -39,57 +185,53 @@ class ArticleList(APIView):
         if category:
             article_queryset = article_queryset.filter(category_id=category)
             
-        # 如果指定了搜索关键词，则进行搜索
+        # 如果指定了搜索关键词，则进行搜索（正文压缩存储，匹配保存时同步的明文）
         if search:
             query = Q()
             keywords = search.split()
             for word in keywords:
-                query |= Q(title__icontains=word) | Q(content__icontains=word) | Q(author__username__icontains=word) | Q(tags__tag__icontains=word)
+                query |= Q(title__icontains=word) | Q(search__text__icontains=word) | Q(author__username__icontains=word) | Q(tags__tag__icontains=word)
             article_queryset = article_queryset.filter(query)
 
+        # 如果指定了标签，则通过标签倒排索引筛选
+        page_ids = None
+        if tags:
+            tag_id_map = get_taxonomy().tag_ids
+            tag_names = [name.strip() for name in tags.split(',') if name.strip()]
+            tag_ids = [tag_id_map[name] for name in tag_names if name in tag_id_map]
+            if match_all and len(tag_ids) < len(set(tag_names)):
+                # 存在未知标签时不可能全部匹配
+                tag_ids = []
+            postings = tagged_article_ids(tag_ids, match_all)
+            if author_id or category or search or ordering:
+                article_queryset = article_queryset.filter(id__in=postings)
+            else:
+                # 仅按标签筛选时直接在索引上分页，避免扫描文章表
+                page_ids = list(postings[start:end])
+                article_queryset = article_queryset.filter(id__in=page_ids)
+
         # 应用排序
         if ordering:
-            article_queryset = article_queryset.order_by(ordering)
+            article_queryset = article_queryset.order_by(stats_ordering(ordering))
 
-        total_count = article_queryset.count()
+        total_count = postings.count() if page_ids is not None else article_queryset.count()
         
-        # 优化查询
-        articles = article_queryset.select_related(
-            'author',
-            'category',
-            'author__backend_profile',
-        ).prefetch_related(
-            'tags',
-            Prefetch('comments', queryset=Comment.objects.only('id'))
-        ).annotate(
-            comment_count=Count('comments', distinct=True),
-        ).distinct()
-
-        articles = articles[start:end]
-
-        article_list = [{
-            'id': article.id,
-            'author': article.author.username,
-            'title': article.title,
-            'content': article.content[:150] + '...' if len(article.content) > 150 else article.content,
-            'pub_time': article.pub_time.isoformat(),
-            'category': article.category.category,
-            'views': article.views,
-            'like_count': article.like_count,
-            'dislike_count': article.dislike_count,
-            'comments_count': article.comment_count,
-            'updated_time': article.updated_time.isoformat(),
-            'profile_pic': article.author.backend_profile.profile_pic.url if article.author.backend_profile.profile_pic else None,
-            'tags': [tag.tag for tag in article.tags.all()],
-        } for article in articles]
+        # 只查询请求的字段需要的列和关联
+        articles = project(article_queryset, ARTICLE_LIST_FIELDS, fields).distinct()
 
-        return Response({
-            'results': article_list,
+        if page_ids is None:
+            articles = articles[start:end]
+        else:
+            # 保持索引中的发布时间顺序
+            position = {article_id: i for i, article_id in enumerate(page_ids)}
+            articles = sorted(articles, key=lambda article: position[article.id])
+
+        context = {'category_names': get_taxonomy().category_names}
+        return {
+            'ids': [article.id for article in articles],
+            'results': [render(article, ARTICLE_LIST_FIELDS, fields, context) for article in articles],
             'count': total_count,
-            'page': page,
-            'page_size': page_size,
-            'total_pages': (total_count + page_size - 1) // page_size,
-        })
+        }
 
     @permission_classes([IsAuthenticated])
     def post(self, request):
@@ -106,16 +248,16 @@ class ArticleList(APIView):
                     'id': article.id,
                     'title': article.title,
                     'content': article.content,
-                    'category': article.category.category,
+                    'category': get_taxonomy().category_names[article.category_id],
                     'author': article.author.username,
                     'pub_time': article.pub_time,
-                    'tags': [tag.tag for tag in article.tags.all()],
+                    'tags': serializer.resolved_tag_names,
                 }
             }
 
             return Response(response_data, status=status.HTTP_201_CREATED)
 
-        print(f"序列化器验证失败: {serializer.errors}")
+        logger.warning('发布文章校验失败: %s', serializer.errors)
         return Response({
             'errors': serializer.errors
         }, status=status.HTTP_400_BAD_REQUEST)
@@ -127,36 +269,44 @@ class ArticleDetail(APIView):
         """
             获取文章
             """
-        try:
-            article = Article.objects.get(id=pk)
-            article.views += 1
-            article.save()
-        except Article.DoesNotExist:
+        # 版本与计数优先从缓存读取，匿名用户命中缓存时不查询数据库
+        updated_time = get_article_version(pk)
+        counts = get_counts(pk) if updated_time else None
+        if counts is None:
             return Response({'errors': '文章不存在'}, status=status.HTTP_404_NOT_FOUND)
 
-        liked = False
-        disliked = False
-        if request.user.is_authenticated:
-            liked = Like.objects.filter(article_id=article.id, user_id=request.user.id).exists()
-            disliked = Dislike.objects.filter(article_id=article.id, user_id=request.user.id).exists()
+        record_view(pk)
+        counts['views'] += 1
+
+        # 浏览量每次请求都会变化，不计入ETag；304时客户端沿用已缓存的浏览量
+        etag = make_etag(
+            'article', pk, updated_time.isoformat(),
+            counts['like_count'], counts['dislike_count'], request.user.id,
+        )
+        response = not_modified(request, etag, updated_time, vary=['Authorization'])
+        if response is not None:
+            return response
+
+        body = get_article_body(pk, updated_time)
+        viewer_state = get_viewer_state(pk, request.user)
 
         article_dict = {
-            'author_id': article.author.id,
-            'title': article.title,
-            'content': article.content,
-            'pub_time': article.pub_time.isoformat(),
-            'author': article.author.username,
-            'category': article.category.category,
-            'views': article.views,
-            'like_count': article.like_count,
-            'dislike_count': article.dislike_count,
-            'liked': liked,
-            'disliked': disliked,
-            'updated_time': article.updated_time,
-            'profile_pic': article.author.backend_profile.profile_pic.url if article.author.backend_profile.profile_pic else None,
-            'tags': [tag.tag for tag in article.tags.all()],
+            'author_id': body['author_id'],
+            'title': body['title'],
+            'content': body['content'],
+            'pub_time': body['pub_time'],
+            'author': body['author'],
+            'category': get_taxonomy().category_names[body['category_id']],
+            'views': counts['views'],
+            'like_count': counts['like_count'],
+            'dislike_count': counts['dislike_count'],
+            'liked': viewer_state['liked'],
+            'disliked': viewer_state['disliked'],
+            'updated_time': body['updated_time'],
+            'profile_pic': body['profile_pic'],
+            'tags': body['tags'],
         }
-        return Response(article_dict)
+        return set_validators(Response(article_dict), etag, updated_time, vary=['Authorization'])
 
     @permission_classes([IsAuthenticated])
     def put(self, request, pk):
@@ -184,7 +334,8 @@ class ArticleDetail(APIView):
                 'errors': '文章不存在'
             }, status=status.HTTP_404_NOT_FOUND)
 
-        article.delete()
+        # 只做标记，评论、点赞等关联数据由后台任务分批清理
+        soft_delete_articles([article.id])
         return Response({
             'success': True
         }, status=status.HTTP_200_OK)
\ No newline at end of file
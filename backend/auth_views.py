@@ -1,3 +1,4 @@
+import logging
 import string
 import random
 from django.core.mail import send_mail
@@ -11,6 +12,8 @@ from blog import settings
 from .models import UserProfile, Captcha
 from .serializers import UserRegistrationSerializer, LoginSerializer, PasswordResetSerializer
 
+logger = logging.getLogger(__name__)
+
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -110,8 +113,9 @@ def send_captcha(request):
         message = f'您的验证码是：{captcha}，10分钟内有效。'
         from_email = settings.DEFAULT_FROM_EMAIL
         recipient_list = [email]
-        print(f"生成的验证码: {captcha}")
         send_mail(subject, message, from_email, recipient_list)
+        # 日志中不记录验证码本身
+        logger.debug('验证码邮件已发送')
 
         return Response({
             "message":'验证码发送成功'
@@ -0,0 +1,306 @@
+"""
+两级缓存后端
+L1 为进程内有界LRU（短TTL），L2 为共享缓存（Redis）。
+写操作通过 Redis 发布/订阅广播失效消息（批量操作合并为一条），其他进程收到后删除本地L1条目；
+Redis 不可用时退化为仅使用L1，站点继续提供服务。
+
+注意：L1 直接保存对象引用（不做序列化），调用方不应修改取到的缓存值。
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# 视为L2不可用的错误；键不存在时 incr/decr 抛出的 ValueError 等正常错误交给调用方处理
+L2_ERRORS = (ConnectionError, socket.timeout)
+try:
+    from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+except ImportError:
+    pass
+else:
+    L2_ERRORS += (RedisConnectionError, RedisTimeoutError)
+
+
+class LocalLRU:
+    """线程安全的有界LRU，条目带过期时间"""
+
+    def __init__(self, max_entries, timeout):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return _MISSING
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        timeout = self.timeout if timeout is None else min(timeout, self.timeout)
+        if timeout <= 0:
+            self.delete(key)
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def add(self, key, value, timeout=None):
+        if self.get(key) is not _MISSING:
+            return False
+        self.set(key, value, timeout)
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            return self._data.pop(key, _MISSING) is not _MISSING
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TieredCache(BaseCache):
+    """
+    CACHES 配置示例：
+        'default': {
+            'BACKEND': 'backend.cache.TieredCache',
+            'LOCATION': 'redis',  # 作为L2的缓存别名
+            'OPTIONS': {'L1_MAX_ENTRIES': 1000, 'L1_TIMEOUT': 5},
+        }
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._l2_alias = location
+        self._l1 = LocalLRU(int(options.get('L1_MAX_ENTRIES', 1000)), float(options.get('L1_TIMEOUT', 5)))
+        # L2 出错后暂停访问的秒数，避免每次请求都等待连接超时
+        self._retry_interval = float(options.get('L2_RETRY_INTERVAL', 5))
+        self._channel = options.get('INVALIDATION_CHANNEL', 'cache:invalidate')
+        self._l2_down_until = 0
+        self._listener_pid = None
+        self._stats = Counter()
+
+    @property
+    def l2(self):
+        return caches[self._l2_alias]
+
+    # ---- 内部工具 ----
+
+    def _l1_timeout(self, timeout):
+        # L1 的过期时间取传入值与 L1_TIMEOUT 中较小者
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def _call_l2(self, method, *args, fallback=None, **kwargs):
+        if time.monotonic() < self._l2_down_until:
+            self._stats['l2_skipped'] += 1
+            return fallback
+        try:
+            return getattr(self.l2, method)(*args, **kwargs)
+        except L2_ERRORS:
+            self._stats['l2_errors'] += 1
+            self._l2_down_until = time.monotonic() + self._retry_interval
+            logger.warning('二级缓存不可用，暂时只使用进程内缓存', exc_info=True)
+            return fallback
+
+    def _redis(self):
+        try:
+            from django_redis import get_redis_connection
+        except ImportError:
+            return None
+        try:
+            return get_redis_connection(self._l2_alias)
+        except NotImplementedError:
+            # L2 不是 django_redis 后端（如测试中的本地内存缓存）
+            return None
+
+    def _broadcast(self, *l1_keys):
+        connection = self._redis()
+        if connection is None or time.monotonic() < self._l2_down_until:
+            return
+        try:
+            # 一批键合并为一条消息，以换行分隔
+            connection.publish(self._channel, '\n'.join(l1_keys))
+        except Exception:
+            self._stats['l2_errors'] += 1
+            logger.warning('缓存失效广播失败', exc_info=True)
+
+    def _ensure_listener(self):
+        # fork 后线程不会被继承，按进程启动订阅线程
+        if self._listener_pid == os.getpid():
+            return
+        self._listener_pid = os.getpid()
+        if self._redis() is None:
+            return
+        threading.Thread(target=self._listen, name='cache-invalidation', daemon=True).start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self._redis().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self._channel)
+                for message in pubsub.listen():
+                    for key in message['data'].decode().split('\n'):
+                        if key == '*':
+                            self._l1.clear()
+                        else:
+                            self._l1.delete(key)
+            except Exception:
+                logger.warning('缓存失效订阅中断，稍后重连', exc_info=True)
+            # 订阅断开期间可能错过失效消息，清空L1
+            self._l1.clear()
+            time.sleep(self._retry_interval)
+
+    def _invalidate(self, key, version):
+        l1_key = self.make_and_validate_key(key, version=version)
+        self._l1.delete(l1_key)
+        self._broadcast(l1_key)
+
+    # ---- 缓存接口 ----
+
+    def get(self, key, default=None, version=None):
+        self._ensure_listener()
+        l1_key = self.make_and_validate_key(key, version=version)
+        value = self._l1.get(l1_key)
+        if value is not _MISSING:
+            self._stats['l1_hits'] += 1
+            return value
+        self._stats['l1_misses'] += 1
+
+        value = self._call_l2('get', key, _MISSING, version=version, fallback=_MISSING)
+        if value is _MISSING:
+            self._stats['l2_misses'] += 1
+            return default
+        self._stats['l2_hits'] += 1
+        self._l1.set(l1_key, value)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        l1_key = self.make_and_validate_key(key, version=version)
+        self._l1.set(l1_key, value, self._l1_timeout(timeout))
+        self._call_l2('set', key, value, timeout=timeout, version=version)
+        self._broadcast(l1_key)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        # add 用于加锁等原子操作，以L2为准；L2 不可用时退化为进程内加锁
+        l1_key = self.make_and_validate_key(key, version=version)
+        added = self._call_l2('add', key, value, timeout=timeout, version=version, fallback=_MISSING)
+        if added is _MISSING:
+            return self._l1.add(l1_key, value, self._l1_timeout(timeout))
+        self._l1.delete(l1_key)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._invalidate(key, version)
+        return self._call_l2('touch', key, timeout=timeout, version=version, fallback=False)
+
+    def delete(self, key, version=None):
+        self._invalidate(key, version)
+        return self._call_l2('delete', key, version=version, fallback=False)
+
+    def has_key(self, key, version=None):
+        l1_key = self.make_and_validate_key(key, version=version)
+        if self._l1.get(l1_key) is not _MISSING:
+            return True
+        return self._call_l2('has_key', key, version=version, fallback=False)
+
+    # 批量操作对L2只发一次请求，失效消息也只广播一条
+
+    def get_many(self, keys, version=None):
+        self._ensure_listener()
+        found, missing = {}, {}
+        for key in keys:
+            l1_key = self.make_and_validate_key(key, version=version)
+            value = self._l1.get(l1_key)
+            if value is _MISSING:
+                missing[key] = l1_key
+            else:
+                found[key] = value
+        self._stats['l1_hits'] += len(found)
+        self._stats['l1_misses'] += len(missing)
+        if not missing:
+            return found
+
+        values = self._call_l2('get_many', list(missing), version=version, fallback={})
+        self._stats['l2_hits'] += len(values)
+        self._stats['l2_misses'] += len(missing) - len(values)
+        for key, value in values.items():
+            self._l1.set(missing[key], value)
+            found[key] = value
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        l1_keys = []
+        for key, value in data.items():
+            l1_key = self.make_and_validate_key(key, version=version)
+            self._l1.set(l1_key, value, self._l1_timeout(timeout))
+            l1_keys.append(l1_key)
+        failed = self._call_l2('set_many', data, timeout=timeout, version=version, fallback=[])
+        if l1_keys:
+            self._broadcast(*l1_keys)
+        return failed
+
+    def delete_many(self, keys, version=None):
+        l1_keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        if not l1_keys:
+            return
+        for l1_key in l1_keys:
+            self._l1.delete(l1_key)
+        self._broadcast(*l1_keys)
+        self._call_l2('delete_many', list(keys), version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self._invalidate(key, version)
+        value = self._call_l2('incr', key, delta, version=version, fallback=_MISSING)
+        if value is _MISSING:
+            raise ValueError("Key '%s' not found" % key)
+        return value
+
+    def clear(self):
+        self._l1.clear()
+        self._call_l2('clear')
+        self._broadcast('*')
+
+    def close(self, **kwargs):
+        self._call_l2('close', **kwargs)
+
+    # ---- 监控指标 ----
+
+    def metrics(self):
+        """返回本进程各级缓存的命中与未命中次数"""
+        return {
+            'l1': {
+                'hits': self._stats['l1_hits'],
+                'misses': self._stats['l1_misses'],
+                'size': len(self._l1),
+                'max_entries': self._l1.max_entries,
+            },
+            'l2': {
+                'hits': self._stats['l2_hits'],
+                'misses': self._stats['l2_misses'],
+                'errors': self._stats['l2_errors'],
+                'skipped': self._stats['l2_skipped'],
+                'available': time.monotonic() >= self._l2_down_until,
+            },
+        }
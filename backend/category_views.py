@@ -1,20 +1,15 @@
-from django.core.cache import cache
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny
 
-from .models import Category
+from .taxonomy import get_taxonomy
 
 
 @api_view(['GET'])
 def get_categories(request):
-    category_list = cache.get('category_list')
-
-    if category_list is None:
-        categories = Category.objects.all()
-        category_list = [{"id": cat.id, 'name': cat.category} for cat in categories]
-        cache.set('category_list', category_list, 60*24*7)
+    category_names = get_taxonomy().category_names
+    category_list = [{"id": pk, 'name': name} for pk, name in category_names.items()]
 
     return Response(category_list, status=status.HTTP_200_OK)
 
@@ -22,27 +17,20 @@ def get_categories(request):
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def tags(request, category):
-    cache_key = f'category_tags:{category}'
-
-    cached_data = cache.get(cache_key)
-    if cached_data:
-        return Response(cached_data, status=status.HTTP_200_OK)
+    taxonomy = get_taxonomy()
 
-    try:
-        tag_s = Category.objects.get(category=category).tags
-    except Category.DoesNotExist:
+    category_id = taxonomy.category_ids.get(category)
+    if category_id is None:
         return Response({
             "errors":'分类不存在'
         }, status=status.HTTP_404_NOT_FOUND)
 
     tags_list = [
         {
-            'tag_id':tag.id,
-            'tag':tag.tag,
-        } for tag in tag_s
+            'tag_id':tag_id,
+            'tag':tag_name,
+        } for tag_id, tag_name in taxonomy.tags_of(category_id)
     ]
     response_data = {'tags':tags_list}
 
-    cache.set(cache_key, response_data, 60*30)
-
     return Response(response_data, status=status.HTTP_200_OK)
\ No newline at end of file
@@ -0,0 +1,114 @@
+"""
+请求合并
+缓存失效时，同一个键的并发计算只由一个调用方执行，其余调用方等待并共享结果：
+进程内每个键对应一个 Future，同一进程中的并发线程等待它；
+指定 timeout 时结果写入缓存，并通过缓存中的锁（cache.add）合并多个进程，
+未获得锁的进程轮询缓存等待结果。等待超时后调用方自行计算，不会因持锁方异常而一直阻塞。
+
+共享的结果会被多个请求同时使用，调用方不应修改
+"""
+import functools
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, TimeoutError
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .scheduler import NODE_ID
+
+_MISSING = object()
+POLL_INTERVAL = 0.02
+
+_inflight = {}
+_lock = threading.Lock()
+_stats = Counter()
+
+
+def lock_key(key):
+    return f'coalesce:lock:{key}'
+
+
+def coalesce(key, compute, timeout=None, wait_timeout=None):
+    """
+    返回 compute() 的结果，并发的相同 key 只计算一次。
+    timeout 为 None 时只在进程内合并；否则结果以 key 写入缓存 timeout 秒，并跨进程合并
+    """
+    wait_timeout = settings.COALESCE_WAIT_TIMEOUT if wait_timeout is None else wait_timeout
+    with _lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = _inflight[key] = Future()
+
+    if not leader:
+        try:
+            result = future.result(wait_timeout)
+            _stats['shared'] += 1
+            return result
+        except TimeoutError:
+            _stats['timeouts'] += 1
+            return compute()
+
+    try:
+        if timeout is None:
+            _stats['computed'] += 1
+            result = compute()
+        else:
+            result = _compute_shared(key, compute, timeout, wait_timeout)
+    except BaseException as exc:
+        future.set_exception(exc)
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        with _lock:
+            _inflight.pop(key, None)
+
+
+def _compute_shared(key, compute, timeout, wait_timeout):
+    # 其他进程可能已经算好
+    result = cache.get(key, _MISSING)
+    if result is not _MISSING:
+        _stats['remote'] += 1
+        return result
+
+    if not cache.add(lock_key(key), NODE_ID, settings.COALESCE_LOCK_TIMEOUT):
+        deadline = time.monotonic() + wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            result = cache.get(key, _MISSING)
+            if result is not _MISSING:
+                _stats['remote'] += 1
+                return result
+        _stats['timeouts'] += 1
+        return compute()
+
+    try:
+        _stats['computed'] += 1
+        result = compute()
+        cache.set(key, result, timeout)
+        return result
+    finally:
+        cache.delete(lock_key(key))
+
+
+def coalesced(key, timeout=None, wait_timeout=None):
+    """
+    装饰器形式，key(*args, **kwargs) 返回合并用的键：
+        @coalesced(lambda article_id: f'article:{article_id}:body', timeout=60)
+        def load_body(article_id): ...
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return coalesce(key(*args, **kwargs), lambda: func(*args, **kwargs), timeout, wait_timeout)
+        return wrapper
+    return decorator
+
+
+def stats():
+    """当前进程的合并统计"""
+    return dict(_stats)
@@ -0,0 +1,71 @@
+"""
+楼中楼评论
+评论的 path 由祖先到自身的id依次编码为定长 base36 段拼接而成：
+  - 按 path 排序即先序遍历，同级评论按发布先后排列
+  - 一个评论及其全部回复的 path 都以它的 path 开头，对应 [path, path + '~') 这一连续范围，
+    在 (article, path) 索引上一次范围查询即可取出整棵子树
+"""
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber, Substr
+
+from .models import Comment
+
+PATH_SEGMENT_WIDTH = 8
+MAX_DEPTH = 255 // PATH_SEGMENT_WIDTH - 1
+# 大于所有 base36 字符，作为子树范围的上界
+PATH_END = '~'
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def comments_modified_key(article_id):
+    """评论列表 Last-Modified 的缓存键，评论增删时更新"""
+    return f'comments:{article_id}:modified'
+
+
+def encode_segment(comment_id):
+    """将评论id编码为定长 base36 段，保证字符串顺序与数值顺序一致"""
+    digits = []
+    while comment_id:
+        comment_id, remainder = divmod(comment_id, 36)
+        digits.append(DIGITS[remainder])
+    return ''.join(reversed(digits)).rjust(PATH_SEGMENT_WIDTH, '0')
+
+
+def subtree(article_id, path, upper=None):
+    """path 开头的整棵子树；指定 upper 时到 upper 子树结束为止，按先序排列"""
+    return Comment.objects.filter(
+        article_id=article_id, path__gte=path, path__lt=(upper or path) + PATH_END,
+    ).order_by('path')
+
+
+def root_page(article_id, start, end, replies):
+    """
+    一页顶层评论及每条顶层评论的前 replies 条回复（先序），返回 (查询集, 顶层评论总数)
+    先在 (article, depth, path) 索引上取出本页首尾两条顶层评论的 path，
+    再在 (article, path) 索引上做一次范围查询，按所属顶层评论编号截取回复
+    """
+    roots = Comment.objects.filter(article_id=article_id, depth=0)
+    paths = list(roots.order_by('path').values_list('path', flat=True)[start:end])
+    if not paths:
+        return Comment.objects.none(), roots.count()
+
+    queryset = subtree(article_id, paths[0], paths[-1]).annotate(
+        position=Window(
+            RowNumber(),
+            partition_by=[Substr('path', 1, PATH_SEGMENT_WIDTH)],
+            order_by=F('path').asc(),
+        ),
+    ).filter(position__lte=replies + 1)
+    return queryset, roots.count()
+
+
+def build_tree(comments, render):
+    """将先序排列的评论组装为嵌套结构，父评论不在结果中的评论作为根节点"""
+    nodes, tree = {}, []
+    for comment in comments:
+        node = render(comment)
+        node['replies'] = []
+        nodes[comment.id] = node
+        parent = nodes.get(comment.parent_id)
+        (parent['replies'] if parent is not None else tree).append(node)
+    return tree
@@ -1,3 +1,4 @@
+from django.db.models import Count, Max
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
@@ -5,25 +6,88 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.views import APIView
 
 from .models import Comment, Article
+from .article_views import profile_pic_url
+from .comment_tree import comments_modified_key, subtree, root_page, build_tree
+from .conditional import get_modified, make_etag, not_modified, set_validators
+from .fieldsets import Field, parse_fields, project, render
 from .serializers import CommentSerializer
 
+# 评论列表可通过 ?fields= 选择的字段
+COMMENT_FIELDS = {
+    'id': Field(lambda comment, context: comment.id),
+    'author_id': Field(lambda comment, context: comment.author_id, only=('author',)),
+    'author': Field(lambda comment, context: comment.author.username,
+                    only=('author__username',), select_related=('author',)),
+    'pub_time': Field(lambda comment, context: comment.pub_time.isoformat(), only=('pub_time',)),
+    'content': Field(lambda comment, context: comment.content, only=('content',)),
+    'parent_id': Field(lambda comment, context: comment.parent_id),
+    'depth': Field(lambda comment, context: comment.depth, only=('depth',)),
+    'reply_count': Field(lambda comment, context: comment.reply_count, only=('reply_count',)),
+    'profile_pic': Field(lambda comment, context: profile_pic_url(comment.author),
+                         only=('author__backend_profile__profile_pic',), select_related=('author__backend_profile',)),
+}
+
 
 class Comments(APIView):
     @permission_classes([AllowAny])
-    def get(self, request, article_id):
-        comments = Comment.objects.filter(article_id=article_id)
-        comment_dict = [{
-            'id': comment.id,
-            'author_id': comment.author.id,
-            'author': comment.author.username,
-            'pub_time': comment.pub_time.isoformat(),
-            'content': comment.content,
-            'profile_pic': comment.author.backend_profile.profile_pic.url if comment.author.backend_profile.profile_pic else None,
-        } for comment in comments]
-        return Response(comment_dict)
+    def get(self, request, article_id, comment_id=None):
+        """
+        获取评论
+        默认按楼层先序返回全部评论；thread=true 时分页返回顶层评论及其前 replies 条回复；
+        指定评论id时返回该评论及其全部回复
+        """
+        fields, invalid = parse_fields(request, COMMENT_FIELDS)
+        if invalid:
+            return Response({
+                'errors': f'不支持的字段: {", ".join(invalid)}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        # 评论只会新增或删除，用数量和最大id即可判断是否变化
+        version = Comment.objects.filter(article_id=article_id).aggregate(count=Count('id'), last_id=Max('id'))
+        etag = make_etag('comments', request.get_full_path(), version['count'], version['last_id'])
+        # 最后修改时间在评论增删时记录，删除评论后也会前进（最大发布时间会倒退）
+        last_modified = get_modified(comments_modified_key(article_id))
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+
+        def render_comment(comment):
+            return render(comment, COMMENT_FIELDS, fields)
+
+        if comment_id is not None:
+            path = Comment.objects.filter(article_id=article_id, id=comment_id).values_list('path', flat=True).first()
+            if path is None:
+                return Response({
+                    'errors': '评论不存在'
+                }, status=status.HTTP_404_NOT_FOUND)
+            comments = project(subtree(article_id, path), COMMENT_FIELDS, fields, always=('parent',))
+            return set_validators(Response(build_tree(comments, render_comment)[0]), etag, last_modified)
+
+        if request.query_params.get('thread', '').lower() == 'true':
+            page = int(request.query_params.get('page', 1))
+            page_size = int(request.query_params.get('page_size', 20))
+            replies = min(int(request.query_params.get('replies', 3)), 20)
+            start = (page - 1) * page_size
+            comments, total_count = root_page(article_id, start, start + page_size, replies)
+            comments = project(comments, COMMENT_FIELDS, fields, always=('parent',))
+            return set_validators(Response({
+                'results': build_tree(comments, render_comment),
+                'count': total_count,
+                'page': page,
+                'page_size': page_size,
+                'total_pages': (total_count + page_size - 1) // page_size,
+            }), etag, last_modified)
+
+        comments = project(Comment.objects.filter(article_id=article_id).order_by('path'), COMMENT_FIELDS, fields)
+        comment_dict = [render_comment(comment) for comment in comments]
+        return set_validators(Response(comment_dict), etag, last_modified)
 
     @permission_classes([IsAuthenticated])
     def post(self, request, article_id):
+        # 已删除的文章在清理前仍在表中，需要通过默认管理器判断
+        if not Article.objects.filter(id=article_id).exists():
+            return Response({'errors': '文章不存在'}, status=status.HTTP_404_NOT_FOUND)
+
         serializer = CommentSerializer(data=request.data, context={'request': request, 'article_id': article_id})
 
         if serializer.is_valid():
@@ -35,6 +99,8 @@ class Comments(APIView):
                     'author': comment.author.username,
                     'pub_time': comment.pub_time.isoformat(),
                     'content': comment.content,
+                    'parent_id': comment.parent_id,
+                    'depth': comment.depth,
                 }
             }
 
@@ -0,0 +1,82 @@
+"""
+条件请求支持
+根据轻量的版本信息计算弱ETag，客户端数据未变化时直接返回304，
+无需查询和序列化完整数据
+"""
+import datetime
+import hashlib
+import uuid
+
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_vary_headers, quote_etag
+from django.utils.http import http_date
+
+FEED_GENERATION_KEY = 'generation:feed'
+
+
+def make_etag(*parts):
+    """由若干版本信息计算弱ETag"""
+    digest = hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+    return 'W/' + quote_etag(digest)
+
+
+def get_generation(key=FEED_GENERATION_KEY):
+    """获取缓存中的数据代数，不存在时初始化"""
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(key=FEED_GENERATION_KEY):
+    """数据变化后更新代数，使已有的ETag失效，并记录修改时间"""
+    cache.set(key, uuid.uuid4().hex, None)
+    touch_modified(modified_key(key))
+
+
+def modified_key(key):
+    return f'{key}:modified'
+
+
+def get_modified(key):
+    """
+    获取缓存中记录的修改时间，用作 Last-Modified；不存在时记为当前时间。
+    增删都会更新这个时间，不依赖数据中的最大时间（删除最新一条时最大时间会倒退）
+    """
+    modified = cache.get(key)
+    if modified is None:
+        cache.add(key, datetime.datetime.now().replace(microsecond=0), None)
+        modified = cache.get(key)
+    return modified
+
+
+def touch_modified(key):
+    cache.set(key, datetime.datetime.now().replace(microsecond=0), None)
+
+
+def _timestamp(last_modified):
+    return int(last_modified.timestamp()) if last_modified else None
+
+
+def set_validators(response, etag, last_modified=None, vary=None):
+    """为响应设置ETag、Last-Modified等协商缓存头"""
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(_timestamp(last_modified))
+    # 允许客户端缓存但每次使用前需重新验证
+    response['Cache-Control'] = 'no-cache'
+    if vary:
+        patch_vary_headers(response, vary)
+    return response
+
+
+def not_modified(request, etag, last_modified=None, vary=None):
+    """
+    检查 If-None-Match / If-Modified-Since 等条件请求头
+    满足条件时返回304（或412）响应，否则返回None
+    """
+    response = get_conditional_response(request, etag=etag, last_modified=_timestamp(last_modified))
+    if response is not None:
+        set_validators(response, etag, last_modified, vary)
+    return response
@@ -0,0 +1,129 @@
+"""
+文章计数更新与读取
+计数只写入 ArticleStats 窄表，通过 F() 表达式原子累加，不改写文章行。
+读取时优先使用缓存中的计数；浏览量先在缓存中累加，达到阈值后批量写入数据库。
+每次变化同时向文章的实时事件推送计数增量
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F
+
+from .analytics import record as record_analytics
+from .dirty import mark as mark_dirty
+from .events import publish, publish_on_commit
+from .models import ArticleStats, Comment
+
+COUNTER_FIELDS = ('views', 'like_count', 'dislike_count')
+COUNTS_TIMEOUT = 60 * 60
+VIEW_FLUSH_THRESHOLD = 20
+DIRTY_VIEWS = 'views'
+
+
+def counts_key(article_id):
+    return f'article:{article_id}:counts'
+
+
+def pending_views_key(article_id):
+    return f'article:{article_id}:pending_views'
+
+
+def increment(article_id, field, delta=1, notify=True):
+    """原子累加文章计数，文章不存在时返回False"""
+    updated = ArticleStats.objects.filter(article_id=article_id).update(**{field: F(field) + delta}) > 0
+    # 提交后再删除一次，避免事务提交前其他请求把旧计数重新写入缓存
+    key = counts_key(article_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+    if updated and notify:
+        publish_on_commit(article_id, 'counters', {field: delta})
+    return updated
+
+
+def get_count(article_id, field):
+    """读取文章的某个计数"""
+    return ArticleStats.objects.filter(article_id=article_id).values_list(field, flat=True).first()
+
+
+def get_counts(article_id):
+    """读取文章的全部计数（含尚未写入数据库的浏览量），文章不存在时返回None"""
+    counts = cache.get(counts_key(article_id))
+    if counts is None:
+        counts = ArticleStats.objects.filter(article_id=article_id).values(*COUNTER_FIELDS).first()
+        if counts is None:
+            return None
+        cache.set(counts_key(article_id), counts, COUNTS_TIMEOUT)
+    pending = cache.get(pending_views_key(article_id)) or 0
+    return {**counts, 'views': counts['views'] + pending}
+
+
+def get_counts_many(article_ids):
+    """批量读取多篇文章的计数，返回 {文章id: 计数}，缓存未命中的文章一次查询"""
+    cached = cache.get_many([counts_key(article_id) for article_id in article_ids])
+    counts = {
+        article_id: cached[counts_key(article_id)] for article_id in article_ids if counts_key(article_id) in cached
+    }
+    missing = [article_id for article_id in article_ids if article_id not in counts]
+    if missing:
+        loaded = {
+            row.pop('article_id'): row
+            for row in ArticleStats.objects.filter(article_id__in=missing).values('article_id', *COUNTER_FIELDS)
+        }
+        cache.set_many({counts_key(article_id): row for article_id, row in loaded.items()}, COUNTS_TIMEOUT)
+        counts.update(loaded)
+    pending = cache.get_many([pending_views_key(article_id) for article_id in counts])
+    return {
+        article_id: {**row, 'views': row['views'] + (pending.get(pending_views_key(article_id)) or 0)}
+        for article_id, row in counts.items()
+    }
+
+
+def get_comment_counts(article_ids):
+    """批量统计多篇文章的评论数，返回 {文章id: 评论数}"""
+    if not article_ids:
+        return {}
+    totals = dict(Comment.objects.filter(article_id__in=article_ids).values_list('article_id').annotate(
+        total=Count('id'),
+    ))
+    return {article_id: totals.get(article_id, 0) for article_id in article_ids}
+
+
+def record_view(article_id):
+    """记录一次浏览，先累加在缓存中，达到阈值后写入数据库"""
+    key = pending_views_key(article_id)
+    cache.add(key, 0, None)
+    try:
+        pending = cache.incr(key)
+    except ValueError:
+        # 缓存不可用时直接写数据库
+        increment(article_id, 'views')
+        return
+    publish(article_id, 'counters', {'views': 1})
+    if pending == 1:
+        # 从0开始累加时记录，定时任务只处理有待写入浏览量的文章
+        mark_dirty(DIRTY_VIEWS, article_id)
+    if pending >= VIEW_FLUSH_THRESHOLD:
+        flush_views(article_id)
+
+
+def flush_views(article_id):
+    """将缓存中累积的浏览量写入数据库"""
+    key = pending_views_key(article_id)
+    pending = cache.get(key) or 0
+    if pending <= 0:
+        return 0
+    # 先原子扣减，期间新增的浏览量会保留在缓存中；
+    # 扣减后为负说明其他调用方已取走同一批浏览量，加回后放弃本次写入，避免重复计数
+    try:
+        remaining = cache.decr(key, pending)
+    except ValueError:
+        return 0
+    if remaining < 0:
+        cache.incr(key, pending)
+        return 0
+    if remaining > 0:
+        # 扣减期间又有新的浏览，保留在待写入集合中
+        mark_dirty(DIRTY_VIEWS, article_id)
+    # 每次浏览已单独推送过增量
+    increment(article_id, 'views', pending, notify=False)
+    record_analytics(article_id, 'views', pending)
+    return pending
@@ -0,0 +1,203 @@
+"""
+软删除与后台清理
+删除文章或注销账号时只标记删除时间，文章的默认管理器会过滤掉已删除的行；
+不经过默认管理器直接读取的索引表（标签倒排、重复检测）同步清理。
+评论、点赞等关联数据在宽限期后由定时任务按主键分批硬删除，每批一个短事务并短暂停顿，
+避免一次级联删除长时间锁住热点表。清理期间跳过逐行的信号处理，回复数、计数、缓存和推送按文章统一处理
+"""
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.core.cache import cache
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .article_cache import invalidate_article
+from .comment_tree import comments_modified_key
+from .conditional import bump_generation, touch_modified
+from .counters import increment
+from .events import publish_on_commit
+from .models import (
+    Article, ArticleBand, ArticleDailyStats, ArticleSignature, ArticleTagIndex, ArticleTerm, Comment, Dislike, Follow,
+    Like, RelatedArticle, TimelineEntry, UserProfile,
+)
+from .scheduler import batched_ids
+from .suggest import publish as publish_suggestion
+from .syndication import remove_urls
+from .tagging import ArticleTag
+
+PURGE_LIMIT = 20  # 每次执行最多清理的文章数和账号数
+
+_purge_state = threading.local()
+
+
+def in_purge():
+    """当前线程是否正在清理，信号处理据此跳过逐行的统计、推送和缓存更新"""
+    return getattr(_purge_state, 'active', False)
+
+
+@contextmanager
+def purging():
+    previous = in_purge()
+    _purge_state.active = True
+    try:
+        yield
+    finally:
+        _purge_state.active = previous
+
+
+def soft_delete_articles(article_ids):
+    """标记文章为已删除，返回标记的数量"""
+    article_ids = list(article_ids)
+    if not article_ids:
+        return 0
+    with transaction.atomic():
+        count = Article.objects.filter(pk__in=article_ids).update(deleted_at=timezone.now())
+        ArticleTagIndex.objects.filter(article_id__in=article_ids).delete()
+        ArticleSignature.objects.filter(article_id__in=article_ids).delete()
+        ArticleBand.objects.filter(article_id__in=article_ids).delete()
+        ArticleTerm.objects.filter(article_id__in=article_ids).delete()
+    invalidate_article(*article_ids)
+    bump_generation()
+    transaction.on_commit(bump_generation)
+    for article_id in article_ids:
+        publish_suggestion('title', article_id)
+    transaction.on_commit(lambda: remove_urls(article_ids))
+    return count
+
+
+def soft_delete_user(user):
+    """注销账号：停用用户并标记其全部文章为已删除"""
+    with transaction.atomic():
+        User.objects.filter(pk=user.pk).update(is_active=False)
+        UserProfile.objects.filter(user_id=user.pk).update(deleted_at=timezone.now())
+    for ids in batched_ids(Article.objects.filter(author_id=user.pk)):
+        soft_delete_articles(ids)
+    publish_suggestion('author', user.pk)
+
+
+def delete_in_batches(queryset, batch_size=None, pause=None):
+    """
+    按主键倒序分批删除，返回删除的行数。
+    回复的id总是大于被回复的评论，倒序删除时先删回复，不会在一批中级联出整棵子树
+    """
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    pause = settings.PURGE_BATCH_PAUSE if pause is None else pause
+    manager = queryset.model._base_manager
+    deleted = 0
+    while True:
+        ids = list(queryset.order_by('-pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += manager.filter(pk__in=ids).delete()[0]
+        time.sleep(pause)
+
+
+def _delete_votes(model, field, user_id, batch_size=None, pause=None):
+    # 删除用户的点赞/踩，同时扣减对应文章的计数
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    pause = settings.PURGE_BATCH_PAUSE if pause is None else pause
+    while True:
+        rows = list(model.objects.filter(user_id=user_id).order_by('-pk').values_list('pk', 'article_id')[:batch_size])
+        if not rows:
+            return
+        with transaction.atomic():
+            model.objects.filter(pk__in=[pk for pk, _ in rows]).delete()
+            for article_id, count in Counter(article_id for _, article_id in rows).items():
+                increment(article_id, field, -count)
+        time.sleep(pause)
+
+
+def _delete_comments(user_id, batch_size=None, pause=None):
+    """
+    删除用户的评论（其他人的回复随之级联删除），扣减保留下来的父评论的回复数；
+    全部删除后每篇文章更新一次 Last-Modified 并推送一次删除事件
+    """
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    pause = settings.PURGE_BATCH_PAUSE if pause is None else pause
+    deleted = {}
+    while True:
+        rows = list(Comment.objects.filter(author_id=user_id).order_by('-pk').values_list(
+            'pk', 'article_id', 'parent_id',
+        )[:batch_size])
+        if not rows:
+            break
+        # 按扣减数量分组，每组一条更新语句；父评论已被删除时更新不到行
+        parents = {}
+        for parent_id, count in Counter(parent_id for _, _, parent_id in rows if parent_id).items():
+            parents.setdefault(count, []).append(parent_id)
+        with transaction.atomic():
+            Comment.objects.filter(pk__in=[pk for pk, _, _ in rows]).delete()
+            for count, parent_ids in parents.items():
+                Comment.objects.filter(pk__in=parent_ids).update(reply_count=F('reply_count') - count)
+        for pk, article_id, _ in rows:
+            deleted.setdefault(article_id, []).append(pk)
+        time.sleep(pause)
+    for article_id, comment_ids in deleted.items():
+        touch_modified(comments_modified_key(article_id))
+        publish_on_commit(article_id, 'comments_deleted', {'ids': comment_ids})
+
+
+def purge_article(article_id, batch_size=None, pause=None):
+    """分批硬删除文章的关联数据，最后删除文章本身"""
+    with purging():
+        _purge_article(article_id, batch_size, pause)
+    cache.delete(comments_modified_key(article_id))
+
+
+def _purge_article(article_id, batch_size, pause):
+    for queryset in (
+        Like.objects.filter(article_id=article_id),
+        Dislike.objects.filter(article_id=article_id),
+        Comment.objects.filter(article_id=article_id),
+        ArticleTag.objects.filter(article_id=article_id),
+        ArticleTagIndex.objects.filter(article_id=article_id),
+        RelatedArticle.objects.filter(Q(article_id=article_id) | Q(related_id=article_id)),
+        ArticleBand.objects.filter(article_id=article_id),
+        ArticleTerm.objects.filter(article_id=article_id),
+        ArticleDailyStats.objects.filter(article_id=article_id),
+        TimelineEntry.objects.filter(article_id=article_id),
+    ):
+        delete_in_batches(queryset, batch_size, pause)
+    # 剩下的一对一计数、签名等少量行随文章级联删除
+    Article.all_objects.filter(pk=article_id).delete()
+
+
+def purge_user(user_id, batch_size=None, pause=None):
+    """分批硬删除已注销用户的文章、点赞、评论、关注关系，最后删除用户本身"""
+    for article_id in Article.all_objects.filter(author_id=user_id).values_list('id', flat=True):
+        purge_article(article_id, batch_size, pause)
+    # 逐行的信号处理在清理期间跳过，计数、回复数和推送由下面的函数按文章处理；用户在注销时已从输入提示中移除
+    with purging():
+        _delete_votes(Like, 'like_count', user_id, batch_size, pause)
+        _delete_votes(Dislike, 'dislike_count', user_id, batch_size, pause)
+        _delete_comments(user_id, batch_size, pause)
+        for queryset in (
+            TimelineEntry.objects.filter(user_id=user_id),
+            Follow.objects.filter(follower_id=user_id),
+            Follow.objects.filter(followee_id=user_id),
+        ):
+            delete_in_batches(queryset, batch_size, pause)
+        User.objects.filter(pk=user_id).delete()
+
+
+def purge_deleted(grace_period=None, limit=PURGE_LIMIT, batch_size=None, pause=None):
+    """清理删除时间早于宽限期的文章和账号，返回清理的数量"""
+    grace_period = settings.SOFT_DELETE_GRACE_PERIOD if grace_period is None else grace_period
+    cutoff = timezone.now() - grace_period
+    article_ids = list(Article.all_objects.filter(deleted_at__lte=cutoff).order_by('deleted_at').values_list(
+        'id', flat=True,
+    )[:limit])
+    for article_id in article_ids:
+        purge_article(article_id, batch_size, pause)
+    user_ids = list(UserProfile.objects.filter(deleted_at__lte=cutoff).order_by('deleted_at').values_list(
+        'user_id', flat=True,
+    )[:limit])
+    for user_id in user_ids:
+        purge_user(user_id, batch_size, pause)
+    return len(article_ids) + len(user_ids)
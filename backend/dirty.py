@@ -0,0 +1,67 @@
+"""
+待写入的文章id集合
+浏览量、按天统计等先累加在缓存中的计数，记录时把文章id加入集合，定时任务取出集合只处理这些文章，
+不需要遍历全部文章。配置了 Redis 时使用 Redis 集合（多进程共享），
+否则（测试中的本地内存缓存、Redis 不可用时）使用进程内集合
+"""
+import logging
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_local = {}
+_local_lock = threading.Lock()
+
+
+def set_key(name):
+    return f'dirty:{name}'
+
+
+def _redis():
+    try:
+        from django_redis import get_redis_connection
+    except ImportError:
+        return None
+    try:
+        return get_redis_connection(settings.COUNTER_REDIS_ALIAS)
+    except Exception:
+        # 缓存别名不存在或不是 django_redis 后端（如测试环境）
+        return None
+
+
+def _mark_local(name, ids):
+    with _local_lock:
+        _local.setdefault(name, set()).update(ids)
+
+
+def mark(name, *article_ids):
+    """把文章id加入集合"""
+    if not article_ids:
+        return
+    connection = _redis()
+    if connection is not None:
+        try:
+            connection.sadd(set_key(name), *article_ids)
+            return
+        except Exception:
+            logger.warning('Redis 不可用，待写入的文章id暂存在进程内', exc_info=True)
+    _mark_local(name, article_ids)
+
+
+def drain(name):
+    """取出并清空集合，返回文章id的集合"""
+    with _local_lock:
+        ids = _local.pop(name, set())
+    connection = _redis()
+    if connection is not None:
+        try:
+            pipeline = connection.pipeline(transaction=True)
+            pipeline.smembers(set_key(name))
+            pipeline.delete(set_key(name))
+            members, _ = pipeline.execute()
+            ids.update(int(member) for member in members)
+        except Exception:
+            logger.warning('Redis 不可用，只处理进程内记录的文章id', exc_info=True)
+    return ids
@@ -0,0 +1,117 @@
+"""
+近似重复文章检测
+正文去掉空白和标点后切成5字片段，计算 MinHash 签名（估计两篇文章片段集合的 Jaccard 相似度）。
+签名分成 BANDS 段，每段哈希为一个桶写入 ArticleBand，只有至少一段完全相同的文章才作为候选，
+候选通过 bucket 索引一次查询取出，与文章总数无关
+"""
+import functools
+import hashlib
+import random
+import re
+import struct
+import zlib
+
+from django.db import transaction
+
+from .models import Article, ArticleBand, ArticleSignature
+
+SHINGLE_SIZE = 5
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+MAX_CHARS = 5000  # 只取正文开头计算
+MIN_CHARS = 50  # 过短的正文不做检测
+DUPLICATE_THRESHOLD = 0.8
+MAX_CANDIDATES = 50
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240601)
+# 固定种子，保证各进程和重新部署后签名一致
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_STRIP_RE = re.compile(r'[\W_]+')
+_SIGNATURE_FORMAT = f'<{NUM_PERM}I'
+
+
+def normalize(text):
+    return _STRIP_RE.sub('', text.lower())[:MAX_CHARS]
+
+
+@functools.lru_cache(maxsize=64)
+def compute_signature(content):
+    """返回正文的 MinHash 签名（NUM_PERM 个32位整数），正文过短时返回 None"""
+    text = normalize(content)
+    if len(text) < MIN_CHARS:
+        return None
+    hashes = list({zlib.crc32(text[i:i + SHINGLE_SIZE].encode('utf-8')) for i in range(len(text) - SHINGLE_SIZE + 1)})
+    return tuple(min([(a * x + b) % _PRIME for x in hashes]) & 0xffffffff for a, b in _PERMUTATIONS)
+
+
+def band_buckets(signature):
+    """每段签名哈希为一个64位有符号整数，段号参与哈希，不同段的桶互不冲突"""
+    buckets = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(struct.pack(f'<H{ROWS}I', band, *rows), digest_size=8).digest()
+        buckets.append(int.from_bytes(digest, 'little', signed=True))
+    return buckets
+
+
+def similarity(signature, other):
+    """签名中相同位置取值相等的比例，即 Jaccard 相似度的估计"""
+    return sum(a == b for a, b in zip(signature, other)) / NUM_PERM
+
+
+def pack(signature):
+    return struct.pack(_SIGNATURE_FORMAT, *signature)
+
+
+def unpack(data):
+    return struct.unpack(_SIGNATURE_FORMAT, bytes(data))
+
+
+def find_duplicate(content, exclude_id=None):
+    """返回与正文近似重复的 (文章id, 相似度)，没有时返回 None"""
+    signature = compute_signature(content)
+    if signature is None:
+        return None
+
+    candidates = ArticleBand.objects.filter(bucket__in=band_buckets(signature))
+    if exclude_id is not None:
+        candidates = candidates.exclude(article_id=exclude_id)
+    candidate_ids = candidates.values_list('article_id', flat=True).distinct()[:MAX_CANDIDATES]
+
+    best = None
+    for article_id, data in ArticleSignature.objects.filter(article_id__in=list(candidate_ids)).values_list(
+        'article_id', 'signature',
+    ):
+        score = similarity(signature, unpack(data))
+        if score >= DUPLICATE_THRESHOLD and (best is None or score > best[1]):
+            best = (article_id, score)
+    return best
+
+
+def index_articles(articles):
+    """为多篇文章写入签名和桶，articles 为 (文章id, 正文) 列表"""
+    signatures, bands, article_ids = [], [], []
+    for article_id, content in articles:
+        article_ids.append(article_id)
+        signature = compute_signature(content)
+        if signature is None:
+            continue
+        signatures.append(ArticleSignature(article_id=article_id, signature=pack(signature)))
+        bands.extend(ArticleBand(article_id=article_id, bucket=bucket) for bucket in band_buckets(signature))
+
+    with transaction.atomic():
+        ArticleSignature.objects.filter(article_id__in=article_ids).delete()
+        ArticleBand.objects.filter(article_id__in=article_ids).delete()
+        ArticleSignature.objects.bulk_create(signatures)
+        ArticleBand.objects.bulk_create(bands)
+    return len(signatures)
+
+
+def index_article(article_id, content):
+    index_articles([(article_id, content)])
+
+
+def unindexed_articles():
+    return Article.objects.filter(signature__isnull=True)
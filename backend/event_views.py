@@ -0,0 +1,31 @@
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from .events import TooManyConnections, broker, stream
+from .models import Article
+
+
+@require_GET
+async def article_events(request, pk):
+    """
+    文章实时事件（Server-Sent Events），推送新评论和点赞、浏览等计数增量。
+    长连接只能由 ASGI 服务器承载，WSGI 下直接拒绝，避免占满 worker 线程
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': '实时推送需要以 ASGI 方式部署'}, status=501)
+    if not await Article.objects.filter(pk=pk).aexists():
+        return JsonResponse({'error': '文章不存在'}, status=404)
+
+    try:
+        subscription = broker.subscribe(pk)
+    except TooManyConnections:
+        response = JsonResponse({'error': '连接数已达上限，请稍后重试'}, status=503)
+        response['Retry-After'] = '30'
+        return response
+
+    response = StreamingHttpResponse(stream(subscription), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # 关闭 nginx 的响应缓冲，事件立即送达
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,185 @@
+"""
+文章实时事件（新评论、计数变化）的发布/订阅
+每个进程内维护 文章id -> 订阅者 的映射，订阅者是运行在 ASGI 事件循环中的有界队列；
+发布方是同步代码（视图、信号），通过 call_soon_threadsafe 把事件交给订阅者所在的事件循环。
+配置了 Redis 时事件发布到 Redis 频道，由各进程的订阅线程转发给本进程的订阅者，多节点部署也能收到；
+Redis 不可用时只投递给本进程
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = 'events:article:'
+RETRY_INTERVAL = 5  # Redis 订阅断开后的重连间隔（秒）
+
+
+class TooManyConnections(Exception):
+    pass
+
+
+class Subscription:
+    def __init__(self, article_id, loop, maxsize):
+        self.article_id = article_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def deliver(self, event):
+        # 在订阅者的事件循环中执行；客户端读得太慢时丢弃新事件，不占用更多内存
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+
+class Broker:
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+        self._listener_pid = None
+        self.stats = Counter()
+
+    @property
+    def connection_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def subscribe(self, article_id):
+        """在事件循环中调用，超过连接数上限时抛出 TooManyConnections"""
+        subscription = Subscription(article_id, asyncio.get_running_loop(), settings.SSE_QUEUE_SIZE)
+        with self._lock:
+            total = sum(len(subscribers) for subscribers in self._subscribers.values())
+            if (total >= settings.SSE_MAX_CONNECTIONS
+                    or len(self._subscribers[article_id]) >= settings.SSE_MAX_CONNECTIONS_PER_ARTICLE):
+                if not self._subscribers[article_id]:
+                    del self._subscribers[article_id]
+                self.stats['rejected'] += 1
+                raise TooManyConnections()
+            self._subscribers[article_id].add(subscription)
+        self._ensure_listener()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.article_id)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.article_id]
+        self.stats['dropped'] += subscription.dropped
+
+    def dispatch(self, article_id, event):
+        """投递给本进程中订阅该文章的连接，可在任意线程调用"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(article_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # 事件循环已关闭，连接随之失效
+                self.unsubscribe(subscription)
+
+    def publish(self, article_id, event_type, data):
+        event = {'type': event_type, 'data': data}
+        connection = self._redis()
+        if connection is not None:
+            try:
+                connection.publish(f'{CHANNEL_PREFIX}{article_id}', json.dumps(event))
+                self.stats['published'] += 1
+                return
+            except Exception:
+                logger.warning('事件发布到 Redis 失败，只投递给本进程', exc_info=True)
+        self.stats['published'] += 1
+        self.dispatch(article_id, event)
+
+    def _redis(self):
+        if settings.SSE_BACKEND != 'redis':
+            return None
+        try:
+            from django_redis import get_redis_connection
+        except ImportError:
+            return None
+        try:
+            return get_redis_connection(settings.SSE_REDIS_ALIAS)
+        except Exception:
+            # 缓存别名不存在或不是 django_redis 后端（如测试环境）
+            return None
+
+    def _ensure_listener(self):
+        # 只有存在订阅者的进程才需要订阅线程；fork 后线程不会被继承，按进程启动
+        if self._listener_pid == os.getpid():
+            return
+        self._listener_pid = os.getpid()
+        if self._redis() is None:
+            return
+        threading.Thread(target=self._listen, name='article-events', daemon=True).start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self._redis().pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(f'{CHANNEL_PREFIX}*')
+                for message in pubsub.listen():
+                    article_id = int(message['channel'].decode()[len(CHANNEL_PREFIX):])
+                    self.dispatch(article_id, json.loads(message['data']))
+            except Exception:
+                logger.warning('文章事件订阅中断，稍后重连', exc_info=True)
+            time.sleep(RETRY_INTERVAL)
+
+
+broker = Broker()
+
+
+def publish(article_id, event_type, data):
+    broker.publish(article_id, event_type, data)
+
+
+def publish_on_commit(article_id, event_type, data):
+    """事务提交后再发布，避免客户端收到回滚的数据"""
+    transaction.on_commit(lambda: broker.publish(article_id, event_type, data))
+
+
+def coalesce(events):
+    """合并相邻的计数事件（增量相加），其余事件保持顺序"""
+    merged = []
+    for event in events:
+        if event['type'] == 'counters' and merged and merged[-1]['type'] == 'counters':
+            deltas = Counter(merged[-1]['data'])
+            deltas.update(event['data'])
+            merged[-1] = {'type': 'counters', 'data': dict(deltas)}
+        else:
+            merged.append(event)
+    return merged
+
+
+def format_event(event):
+    return f"event: {event['type']}\ndata: {json.dumps(event['data'], ensure_ascii=False)}\n\n"
+
+
+async def stream(subscription):
+    """SSE 响应体：推送事件，空闲时发送心跳注释，连接关闭时取消订阅"""
+    try:
+        yield f'retry: {settings.SSE_RETRY_MS}\n\n'
+        queue = subscription.queue
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), settings.SSE_HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ': heartbeat\n\n'
+                continue
+            events = [event]
+            while not queue.empty():
+                events.append(queue.get_nowait())
+            yield ''.join(format_event(item) for item in coalesce(events))
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,79 @@
+"""
+自定义模型字段
+CompressedTextField 对 Python 代码表现为普通文本字段，数据库中以二进制存储：
+首字节为格式标记，超过阈值的正文用 zlib 或 zstd（安装 zstandard 后）压缩
+"""
+import zlib
+
+from django.conf import settings
+from django.db import models
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - 可选依赖
+    zstandard = None
+
+# 格式标记；迁移前的旧数据没有标记，正文不会以这些控制字符开头
+PLAIN = b'\x00'
+ZLIB = b'\x01'
+ZSTD = b'\x02'
+
+
+def available_codecs():
+    return ['none', 'zlib'] + (['zstd'] if zstandard is not None else [])
+
+
+def encode_content(text, codec=None, min_size=None):
+    """按配置编码正文，压缩后没有变小时按原文存储"""
+    codec = codec or settings.ARTICLE_CONTENT_CODEC
+    min_size = settings.ARTICLE_CONTENT_COMPRESS_MIN_SIZE if min_size is None else min_size
+    raw = text.encode('utf-8')
+    if codec == 'none' or len(raw) < min_size:
+        return PLAIN + raw
+
+    if codec == 'zstd' and zstandard is not None:
+        encoded = ZSTD + zstandard.ZstdCompressor(level=settings.ARTICLE_CONTENT_ZSTD_LEVEL).compress(raw)
+    else:
+        encoded = ZLIB + zlib.compress(raw, settings.ARTICLE_CONTENT_ZLIB_LEVEL)
+    return encoded if len(encoded) < len(raw) + 1 else PLAIN + raw
+
+
+def decode_content(value):
+    """解码数据库中的正文，兼容未加标记的旧数据"""
+    if value is None or isinstance(value, str):
+        return value
+    value = bytes(value)
+    marker, payload = value[:1], value[1:]
+    if marker == ZLIB:
+        return zlib.decompress(payload).decode('utf-8')
+    if marker == ZSTD:
+        if zstandard is None:
+            raise RuntimeError('正文使用 zstd 压缩，需要安装 zstandard')
+        return zstandard.ZstdDecompressor().decompress(payload).decode('utf-8')
+    if marker == PLAIN:
+        return payload.decode('utf-8')
+    return value.decode('utf-8')
+
+
+def is_encoded(value, codec=None):
+    """数据库中的值是否已按当前配置编码，供批量重编码命令跳过"""
+    if value is None or isinstance(value, str):
+        return False
+    value = bytes(value)
+    return value[:1] in (PLAIN, ZLIB, ZSTD) and value == encode_content(decode_content(value), codec)
+
+
+class CompressedTextField(models.TextField):
+    """以压缩二进制存储的文本字段，序列化器和视图按普通文本使用"""
+
+    def get_internal_type(self):
+        return 'BinaryField'
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        value = super().get_db_prep_value(value, connection, prepared)
+        if value is None:
+            return None
+        return connection.Database.Binary(encode_content(value))
+
+    def from_db_value(self, value, expression, connection):
+        return decode_content(value)
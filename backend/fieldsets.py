@@ -0,0 +1,56 @@
+"""
+稀疏字段集
+列表接口支持 ?fields=id,title 只返回指定字段，查询也随之收窄：
+只加载需要的列，未请求的字段不做关联查询、预取和聚合
+"""
+from dataclasses import dataclass, field
+from typing import Callable
+
+
+@dataclass(frozen=True)
+class Field:
+    # 取值函数 value(对象, context)，context 为视图按页准备的数据（如点赞状态）
+    value: Callable
+    only: tuple = ()
+    select_related: tuple = ()
+    prefetch_related: tuple = ()
+    annotations: dict = field(default_factory=dict)
+
+
+def parse_fields(request, spec):
+    """
+    解析 fields 参数，返回 (字段列表, 无效字段列表)
+    未指定时返回全部字段，顺序与 spec 一致
+    """
+    raw = request.query_params.get('fields')
+    if not raw:
+        return list(spec), []
+    requested = [name.strip() for name in raw.split(',') if name.strip()]
+    invalid = [name for name in requested if name not in spec]
+    # 去重并按 spec 中的顺序输出
+    return [name for name in spec if name in requested], invalid
+
+
+def project(queryset, spec, fields, always=()):
+    """按请求的字段收窄查询，always 为视图自身需要的列"""
+    only, select_related, prefetch_related, annotations = ['id', *always], [], [], {}
+    for name in fields:
+        spec_field = spec[name]
+        only.extend(spec_field.only)
+        select_related.extend(spec_field.select_related)
+        prefetch_related.extend(spec_field.prefetch_related)
+        annotations.update(spec_field.annotations)
+
+    queryset = queryset.only(*dict.fromkeys(only))
+    if select_related:
+        queryset = queryset.select_related(*dict.fromkeys(select_related))
+    if prefetch_related:
+        queryset = queryset.prefetch_related(*dict.fromkeys(prefetch_related))
+    if annotations:
+        queryset = queryset.annotate(**annotations)
+    return queryset
+
+
+def render(obj, spec, fields, context=None):
+    """按请求的字段输出一条记录"""
+    return {name: spec[name].value(obj, context) for name in fields}
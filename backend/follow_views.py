@@ -0,0 +1,72 @@
+from django.contrib.auth.models import User
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
+from .article_views import ARTICLE_LIST_FIELDS
+from .fieldsets import parse_fields, project, render
+from .models import Article
+from .taxonomy import get_taxonomy
+from .timeline import follow, unfollow, read_timeline, make_cursor, parse_cursor
+from .viewer_state import get_viewer_states
+
+MAX_PAGE_SIZE = 50
+
+
+class FollowView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, user_id):
+        """关注用户"""
+        if user_id == request.user.id:
+            return Response({'errors': '不能关注自己'}, status=status.HTTP_400_BAD_REQUEST)
+        if not User.objects.filter(id=user_id, is_active=True).exists():
+            return Response({'errors': '用户不存在'}, status=status.HTTP_404_NOT_FOUND)
+
+        created = follow(request.user.id, user_id)
+        return Response({'following': True}, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+    def delete(self, request, user_id):
+        """取消关注"""
+        unfollow(request.user.id, user_id)
+        return Response({'following': False}, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def following_timeline(request):
+    """
+    关注的作者发布的文章，按发布时间倒序；翻页时传入上一页返回的 next
+    """
+    fields, invalid = parse_fields(request, ARTICLE_LIST_FIELDS)
+    if invalid:
+        return Response({
+            'errors': f'不支持的字段: {", ".join(invalid)}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    cursor = request.query_params.get('before')
+    try:
+        page_size = min(max(int(request.query_params.get('page_size', 16)), 1), MAX_PAGE_SIZE)
+        cursor = parse_cursor(cursor) if cursor else None
+    except ValueError:
+        return Response({'errors': '无效的分页参数'}, status=status.HTTP_400_BAD_REQUEST)
+
+    page = read_timeline(request.user.id, page_size, cursor)
+    article_ids = [article_id for _, article_id in page]
+    articles = {article.id: article for article in project(
+        Article.objects.filter(id__in=article_ids), ARTICLE_LIST_FIELDS, fields,
+    )}
+
+    context = {'category_names': get_taxonomy().category_names}
+    if 'liked' in fields or 'disliked' in fields:
+        context['viewer_states'] = get_viewer_states(article_ids, request.user)
+    results = [
+        render(articles[article_id], ARTICLE_LIST_FIELDS, fields, context)
+        for article_id in article_ids if article_id in articles
+    ]
+
+    return Response({
+        'results': results,
+        'next': make_cursor(*page[-1]) if len(page) == page_size else None,
+    }, status=status.HTTP_200_OK)
@@ -0,0 +1,102 @@
+"""
+定时维护任务
+"""
+import datetime
+
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+
+from .analytics import flush as flush_analytics
+from .article_cache import get_article_version, get_article_body
+from .counters import DIRTY_VIEWS, counts_key, flush_views
+from .deletion import purge_deleted
+from .dirty import drain as drain_dirty, mark as mark_dirty
+from .models import Article, ArticleStats, Captcha, Like, Dislike
+from .related import refresh_changed
+from .scheduler import periodic, batched_ids
+from .taxonomy import get_taxonomy
+from .timeline import fanout_pending
+
+# 验证码有效期，与注册和重置密码时的校验保持一致
+CAPTCHA_TTL = datetime.timedelta(minutes=10)
+
+
+@periodic(interval=10 * 60)
+def purge_expired_captchas():
+    """清理过期验证码"""
+    expired = Captcha.objects.filter(created_at__lt=timezone.now() - CAPTCHA_TTL)
+    purged = 0
+    for ids in batched_ids(expired):
+        purged += Captcha.objects.filter(pk__in=ids).delete()[0]
+    return purged
+
+
+@periodic(interval=10 * 60)
+def purge_deleted_records():
+    """分批清理已软删除的文章和已注销的账号"""
+    return purge_deleted()
+
+
+@periodic(interval=60)
+def flush_pending_views():
+    """将缓存中累积的浏览量写入数据库，只处理记录过浏览的文章"""
+    flushed = 0
+    article_ids = drain_dirty(DIRTY_VIEWS)
+    try:
+        for article_id in article_ids:
+            flushed += flush_views(article_id)
+    except Exception:
+        # 未处理完的文章留到下次
+        mark_dirty(DIRTY_VIEWS, *article_ids)
+        raise
+    return flushed
+
+
+@periodic(interval=5 * 60)
+def flush_daily_stats():
+    """将缓存中的按天统计写入数据库"""
+    return flush_analytics()
+
+
+@periodic(interval=60 * 60)
+def reconcile_counters():
+    """按点赞/踩记录校正计数，返回校正的文章数"""
+    fixed = 0
+    for ids in batched_ids(ArticleStats.objects.all()):
+        likes = dict(Like.objects.filter(article_id__in=ids).values_list('article_id').annotate(total=Count('id')))
+        dislikes = dict(Dislike.objects.filter(article_id__in=ids).values_list('article_id').annotate(total=Count('id')))
+        stats = ArticleStats.objects.filter(article_id__in=ids).values_list('article_id', 'like_count', 'dislike_count')
+        for article_id, like_count, dislike_count in stats:
+            expected = (likes.get(article_id, 0), dislikes.get(article_id, 0))
+            if (like_count, dislike_count) != expected:
+                ArticleStats.objects.filter(article_id=article_id).update(
+                    like_count=expected[0], dislike_count=expected[1],
+                )
+                cache.delete(counts_key(article_id))
+                fixed += 1
+    return fixed
+
+
+@periodic(interval=5 * 60)
+def warm_caches(recent=20):
+    """预热分类标签快照和最新文章的详情缓存"""
+    get_taxonomy()
+    article_ids = list(Article.objects.values_list('id', flat=True)[:recent])
+    for article_id in article_ids:
+        updated_time = get_article_version(article_id)
+        if updated_time is not None:
+            get_article_body(article_id, updated_time)
+    return len(article_ids)
+
+
+@periodic(interval=5 * 60)
+def refresh_related_articles():
+    """更新新增或修改文章的相关文章"""
+    return refresh_changed()
+
+
+@periodic(interval=10)
+def fanout_new_articles():
+    """把新发布的文章推送到粉丝的关注时间线"""
+    return fanout_pending()
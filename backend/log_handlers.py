@@ -0,0 +1,136 @@
+"""
+异步日志
+请求线程只把日志记录放入内存队列，由后台线程写入日志文件和控制台，
+磁盘或标准输出阻塞不会影响请求延迟；队列满时丢弃日志而不是阻塞，并计入丢弃数。
+多个 gunicorn worker 追加写同一个文件，不在进程内滚动（多进程各自改名会截断日志），
+由 logrotate 按大小或日期滚动，文件被移走后各进程自动重新打开
+"""
+import atexit
+import copy
+import datetime
+import json
+import logging
+import os
+import queue
+import sys
+from collections import Counter
+from logging.handlers import QueueHandler, QueueListener, WatchedFileHandler
+
+# LogRecord 的标准属性，其余属性视为 extra 字段写入JSON
+_RESERVED_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+_stats = Counter()
+
+
+class JSONFormatter(logging.Formatter):
+    """每条日志输出为一行JSON"""
+
+    def format(self, record):
+        data = {
+            'time': datetime.datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'process': record.process,
+            'thread': record.thread,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data['exc_info'] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class AsyncLogHandler(QueueHandler):
+    """
+    LOGGING 配置示例：
+        'async': {
+            'class': 'backend.log_handlers.AsyncLogHandler',
+            'filename': '/var/log/blog.log',
+            'console': True,
+        }
+    """
+
+    def __init__(self, filename=None, console=True, console_level=logging.DEBUG, queue_size=10000):
+        super().__init__(queue.Queue(queue_size))
+        self.dropped = 0
+        self._reported = 0
+        self.targets = []
+        if filename:
+            file_handler = WatchedFileHandler(filename, encoding='utf-8', delay=True)
+            file_handler.setFormatter(JSONFormatter())
+            self.targets.append(file_handler)
+        if console:
+            console_handler = logging.StreamHandler(sys.stderr)
+            console_handler.setLevel(console_level)
+            console_handler.setFormatter(logging.Formatter(
+                '{levelname} {asctime} {module} {process:d} {thread:d} {message}', style='{',
+            ))
+            self.targets.append(console_handler)
+        self._listener = None
+        self._listener_pid = None
+        atexit.register(self.stop)
+
+    def _ensure_listener(self):
+        # fork 后后台线程不会被继承，在子进程中重新启动；
+        # 队列的内部锁可能在 fork 时被父进程的后台线程持有，同时换用新队列
+        if self._listener_pid == os.getpid():
+            return
+        if self._listener_pid is not None:
+            self.queue = queue.Queue(self.queue.maxsize)
+        self._listener_pid = os.getpid()
+        self._listener = QueueListener(self.queue, *self.targets, respect_handler_level=True)
+        self._listener.start()
+
+    def prepare(self, record):
+        # 在请求线程中只合并消息参数，格式化交给后台线程
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        # emit 在处理器的锁内调用，计数不需要另外加锁
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            _stats['dropped'] += 1
+            return
+        if self.dropped > self._reported:
+            # 队列恢复后补记一条丢弃数量，写不进去时下次再记
+            notice = logging.makeLogRecord({
+                'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                'msg': f'日志队列已满，丢弃了 {self.dropped - self._reported} 条日志',
+            })
+            try:
+                self.queue.put_nowait(notice)
+            except queue.Full:
+                return
+            self._reported = self.dropped
+
+    def emit(self, record):
+        self._ensure_listener()
+        super().emit(record)
+
+    def stop(self):
+        """停止后台线程并写出队列中剩余的日志"""
+        if self._listener is not None and self._listener_pid == os.getpid():
+            self._listener.stop()
+            self._listener = None
+            self._listener_pid = None
+
+    def close(self):
+        self.stop()
+        for target in self.targets:
+            target.close()
+        super().close()
+
+
+def stats():
+    """当前进程丢弃的日志数"""
+    return dict(_stats)
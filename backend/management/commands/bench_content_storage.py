@@ -0,0 +1,74 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+from backend.fields import available_codecs, encode_content, decode_content
+from backend.models import Article, Category
+
+
+class Command(BaseCommand):
+    help = '对比不同压缩方式下文章正文的存储大小和读取延迟'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='500,2000,10000,50000', help='正文字数，逗号分隔')
+        parser.add_argument('--articles', type=int, default=50, help='每种字数写入的测试文章数')
+        parser.add_argument('--iterations', type=int, default=20, help='读取重复次数')
+
+    def handle(self, *args, **options):
+        user = User.objects.order_by('id').first()
+        category = Category.objects.order_by('id').first()
+        if user is None or category is None:
+            raise CommandError('需要至少一个用户和一个分类')
+
+        vocabulary = self.make_vocabulary()
+        self.stdout.write(f'{"字数":>8}{"方式":>8}{"原始(KB)":>12}{"存储(KB)":>12}{"比例":>8}{"解码(μs)":>12}{"读取(ms)":>12}')
+        for size in [int(size) for size in options['sizes'].split(',')]:
+            texts = [self.make_text(vocabulary, size) for _ in range(options['articles'])]
+            raw_size = sum(len(text.encode('utf-8')) for text in texts)
+            for codec in available_codecs():
+                stored = [encode_content(text, codec) for text in texts]
+                stored_size = sum(len(value) for value in stored)
+                decode_us = statistics.median(self.time_decode(value) for value in stored)
+                read_ms = self.time_read(codec, texts, user, category, options['iterations'])
+                self.stdout.write(
+                    f'{size:>8}{codec:>8}{raw_size / 1024:>12.1f}{stored_size / 1024:>12.1f}'
+                    f'{stored_size / raw_size:>8.2f}{decode_us:>12.1f}{read_ms:>12.2f}'
+                )
+
+    def make_vocabulary(self):
+        # 常用汉字组成的词表，压缩率接近真实中文正文
+        chars = [chr(code) for code in range(0x4e00, 0x4e00 + 3000)]
+        return [''.join(random.choices(chars, k=random.randint(1, 4))) for _ in range(5000)]
+
+    def make_text(self, vocabulary, size):
+        words = []
+        length = 0
+        while length < size:
+            word = random.choice(vocabulary) + random.choice('，。、 ')
+            words.append(word)
+            length += len(word)
+        return ''.join(words)[:size]
+
+    def time_decode(self, value):
+        start = time.perf_counter()
+        decode_content(value)
+        return (time.perf_counter() - start) * 1e6
+
+    def time_read(self, codec, texts, user, category, iterations):
+        """在事务中写入测试文章，测量整批读取正文的平均耗时后回滚"""
+        with transaction.atomic(), override_settings(ARTICLE_CONTENT_CODEC=codec):
+            ids = [
+                Article.objects.create(title=f'压缩测试{i}', content=text, author=user, category=category).id
+                for i, text in enumerate(texts)
+            ]
+            start = time.perf_counter()
+            for _ in range(iterations):
+                list(Article.objects.filter(id__in=ids).values_list('content', flat=True))
+            elapsed = (time.perf_counter() - start) / iterations * 1000
+            transaction.set_rollback(True)
+        return elapsed
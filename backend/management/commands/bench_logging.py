@@ -0,0 +1,70 @@
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from backend.article_views import ArticleList
+from backend.log_handlers import AsyncLogHandler
+
+
+class Command(BaseCommand):
+    help = '对比同步日志与异步队列日志下的请求延迟'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='每种配置的请求次数')
+        parser.add_argument('--console', action='store_true', help='同时输出到控制台（标准错误）')
+
+    def handle(self, *args, **options):
+        user = User.objects.order_by('id').first()
+        if user is None:
+            raise CommandError('没有用户，请先创建数据')
+        logger = logging.getLogger('backend.article_views')
+        factory = APIRequestFactory()
+        # 校验失败的发布请求会写一条警告日志
+        view = ArticleList.as_view()
+
+        self.stdout.write(f'{"配置":<8}{"p50(μs)":>12}{"p99(μs)":>12}{"最大(μs)":>12}')
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, handlers in (
+                ('同步', self.sync_handlers(os.path.join(tmp, 'sync.log'), options['console'])),
+                ('异步', [AsyncLogHandler(os.path.join(tmp, 'async.log'), console=options['console'])]),
+            ):
+                latencies = self.measure(logger, handlers, view, factory, user, options['requests'])
+                self.stdout.write(
+                    f'{name:<8}{statistics.median(latencies):>12.1f}'
+                    f'{latencies[int(len(latencies) * 0.99) - 1]:>12.1f}{latencies[-1]:>12.1f}'
+                )
+
+    def sync_handlers(self, filename, console):
+        formatter = logging.Formatter('{levelname} {asctime} {module} {process:d} {thread:d} {message}', style='{')
+        handlers = [logging.FileHandler(filename)]
+        if console:
+            handlers.append(logging.StreamHandler(sys.stderr))
+        for handler in handlers:
+            handler.setFormatter(formatter)
+        return handlers
+
+    def measure(self, logger, handlers, view, factory, user, count):
+        saved = (logger.handlers, logger.propagate, logger.level)
+        logger.handlers, logger.propagate = handlers, False
+        logger.setLevel(logging.INFO)
+        latencies = []
+        try:
+            for _ in range(count):
+                request = factory.post('/api/articles/', {'title': '', 'content': ''}, format='json')
+                force_authenticate(request, user=user)
+                start = time.perf_counter()
+                view(request)
+                latencies.append((time.perf_counter() - start) * 1e6)
+        finally:
+            for handler in handlers:
+                handler.close()
+            logger.handlers, logger.propagate = saved[0], saved[1]
+            logger.setLevel(saved[2])
+        return sorted(latencies)
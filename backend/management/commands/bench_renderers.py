@@ -0,0 +1,53 @@
+import gzip
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from backend.article_views import ArticleList, ArticleDetail
+from backend.comment_views import Comments
+from backend.middleware import brotli
+from backend.models import Article
+from backend.renderers import FastJSONRenderer, orjson
+
+
+class Command(BaseCommand):
+    help = '对比各接口的JSON编码耗时与压缩后的传输字节数'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200, help='每个接口的编码次数')
+        parser.add_argument('--page-size', type=int, default=16, help='文章列表每页数量')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        factory = APIRequestFactory()
+
+        article = Article.objects.order_by('-id').first()
+        if article is None:
+            self.stdout.write(self.style.WARNING('没有文章数据，无法测试'))
+            return
+
+        endpoints = [
+            ('文章列表', ArticleList.as_view(), factory.get('/api/articles/', {'page_size': options['page_size']}), {}),
+            ('文章详情', ArticleDetail.as_view(), factory.get(f'/api/articles/{article.id}/'), {'pk': article.id}),
+            ('文章评论', Comments.as_view(), factory.get(f'/api/articles/{article.id}/comments/'), {'article_id': article.id}),
+        ]
+        renderers = [('stdlib', JSONRenderer())]
+        if orjson is not None:
+            renderers.append(('orjson', FastJSONRenderer()))
+        else:
+            self.stdout.write(self.style.WARNING('未安装 orjson，仅测试标准库编码'))
+
+        self.stdout.write(f'{"接口":<8}{"编码器":<8}{"耗时(μs)":>12}{"原始字节":>10}{"gzip":>10}{"br":>10}')
+        for name, view, request, kwargs in endpoints:
+            data = view(request, **kwargs).data
+            for renderer_name, renderer in renderers:
+                start = time.perf_counter()
+                for _ in range(iterations):
+                    body = renderer.render(data)
+                elapsed = (time.perf_counter() - start) / iterations * 1e6
+
+                gzip_size = len(gzip.compress(body, compresslevel=6, mtime=0))
+                br_size = len(brotli.compress(body, quality=5)) if brotli is not None else '-'
+                self.stdout.write(f'{name:<8}{renderer_name:<8}{elapsed:>12.1f}{len(body):>10}{gzip_size:>10}{br_size:>10}')
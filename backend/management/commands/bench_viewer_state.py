@@ -0,0 +1,62 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+
+from backend.models import Article, Like, Dislike
+from backend.viewer_state import get_viewer_states
+
+
+class Command(BaseCommand):
+    help = '对比逐篇查询与批量查询获取用户点赞/踩状态的耗时和查询次数'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user-id', type=int, help='测试用户id，默认取点赞最多的用户')
+        parser.add_argument('--page-size', type=int, default=16, help='每页文章数量')
+        parser.add_argument('--iterations', type=int, default=50, help='重复次数')
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user_id'])
+        if user is None:
+            self.stdout.write(self.style.WARNING('没有用户数据，无法测试'))
+            return
+
+        article_ids = list(Article.objects.values_list('id', flat=True)[:options['page_size']])
+        iterations = options['iterations']
+
+        def per_article():
+            return {
+                article_id: {
+                    'liked': Like.objects.filter(article_id=article_id, user_id=user.id).exists(),
+                    'disliked': Dislike.objects.filter(article_id=article_id, user_id=user.id).exists(),
+                } for article_id in article_ids
+            }
+
+        def bulk():
+            return get_viewer_states(article_ids, user)
+
+        self.stdout.write(f'用户: {user.username}，每页 {len(article_ids)} 篇文章，重复 {iterations} 次')
+        self.stdout.write(f'{"方式":<10}{"查询次数":>10}{"平均耗时(ms)":>16}')
+        results = {}
+        for name, func in (('逐篇查询', per_article), ('批量查询', bulk)):
+            with CaptureQueriesContext(connection) as queries:
+                results[name] = func()
+            start = time.perf_counter()
+            for _ in range(iterations):
+                func()
+            elapsed = (time.perf_counter() - start) / iterations * 1000
+            self.stdout.write(f'{name:<10}{len(queries):>10}{elapsed:>16.2f}')
+
+        if results['逐篇查询'] != results['批量查询']:
+            self.stdout.write(self.style.ERROR('两种方式结果不一致'))
+
+    def get_user(self, user_id):
+        if user_id:
+            return User.objects.filter(id=user_id).first()
+        like = Like.objects.values('user_id').annotate(total=Count('id')).order_by('-total').first()
+        if like:
+            return User.objects.get(id=like['user_id'])
+        return User.objects.first()
@@ -0,0 +1,24 @@
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from backend.related import rebuild, REFRESH_WATERMARK_KEY
+
+
+class Command(BaseCommand):
+    help = '全量重建相关文章索引'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='每批写入的文章数')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        start = time.perf_counter()
+        count = rebuild(options['batch_size'])
+        # 之后由定时任务增量更新
+        cache.set(REFRESH_WATERMARK_KEY, now, None)
+        self.stdout.write(self.style.SUCCESS(
+            f'已重建 {count} 篇文章的相关文章，耗时 {time.perf_counter() - start:.2f}s'
+        ))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import Length
+
+from backend.models import Article
+from backend.scheduler import batched_ids
+
+
+class Command(BaseCommand):
+    help = '按当前配置分批重新编码文章正文（迁移后压缩已有数据或更换压缩算法时使用）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='每批文章数量')
+
+    def handle(self, *args, **options):
+        before = self.stored_size()
+        count = 0
+        for ids in batched_ids(Article.objects.all(), options['batch_size']):
+            # 读取时自动解码，写回时按当前配置编码；bulk_update 不会修改更新时间
+            with transaction.atomic():
+                articles = list(Article.objects.filter(pk__in=ids).only('id', 'content').select_for_update())
+                Article.objects.bulk_update(articles, ['content'])
+            count += len(articles)
+            self.stdout.write(f'已处理 {count} 篇')
+
+        after = self.stored_size()
+        self.stdout.write(self.style.SUCCESS(
+            f'完成：{count} 篇文章，正文存储 {before / 1024:.1f}KB -> {after / 1024:.1f}KB'
+        ))
+
+    def stored_size(self):
+        return Article.objects.aggregate(size=Sum(Length('content')))['size'] or 0
@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.scheduler import registered_jobs, run_job, get_metrics
+
+
+class Command(BaseCommand):
+    help = '运行定时维护任务'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--job', action='append', dest='jobs', help='只运行指定任务，可重复指定')
+        parser.add_argument('--once', action='store_true', help='每个任务执行一次后退出')
+        parser.add_argument('--force', action='store_true', help='忽略执行间隔锁，立即执行')
+        parser.add_argument('--tick', type=float, default=1.0, help='调度检查间隔（秒）')
+        parser.add_argument('--status', action='store_true', help='显示各任务的执行统计')
+
+    def handle(self, *args, **options):
+        jobs = registered_jobs()
+        if options['jobs']:
+            unknown = set(options['jobs']) - set(jobs)
+            if unknown:
+                raise CommandError(f'未知任务: {", ".join(sorted(unknown))}')
+            jobs = {name: jobs[name] for name in options['jobs']}
+
+        if options['status']:
+            self.show_status(jobs)
+            return
+
+        if options['once']:
+            for job in jobs.values():
+                self.run(job, options['force'])
+            return
+
+        self.stdout.write(f'调度器已启动，任务: {", ".join(jobs)}')
+        next_run = {name: 0 for name in jobs}
+        try:
+            while True:
+                now = time.monotonic()
+                for name, job in jobs.items():
+                    if now >= next_run[name]:
+                        self.run(job, options['force'])
+                        next_run[name] = now + job.interval
+                time.sleep(options['tick'])
+        except KeyboardInterrupt:
+            self.stdout.write('调度器已停止')
+
+    def run(self, job, force):
+        if run_job(job, force=force):
+            metrics = get_metrics(job.name)
+            self.stdout.write(f'{job.name}: 结果 {metrics["last_result"]}，耗时 {metrics["last_duration_ms"]}ms')
+        else:
+            self.stdout.write(f'{job.name}: 已由其他节点执行，跳过')
+
+    def show_status(self, jobs):
+        self.stdout.write(f'{"任务":<24}{"间隔(秒)":>10}{"次数":>8}{"失败":>8}{"上次耗时(ms)":>14}  上次执行')
+        for name, job in jobs.items():
+            metrics = get_metrics(name)
+            self.stdout.write(
+                f'{name:<24}{job.interval:>10}{metrics["runs"]:>8}{metrics["failures"]:>8}'
+                f'{str(metrics["last_duration_ms"]):>14}  {metrics["last_run"]}'
+            )
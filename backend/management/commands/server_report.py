@@ -0,0 +1,127 @@
+import gc
+import json
+import os
+import subprocess
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+# 在全新的解释器中测量冷启动耗时
+STARTUP_SCRIPT = '''
+import json, time
+start = time.perf_counter()
+import django
+django.setup()
+setup_ms = (time.perf_counter() - start) * 1000
+from backend.warmup import warmup
+timings = warmup(freeze=False)
+timings['django_setup'] = round(setup_ms, 2)
+timings['total'] = round((time.perf_counter() - start) * 1000, 2)
+print(json.dumps(timings))
+'''
+
+MEMORY_FIELDS = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty')
+
+
+def read_memory(pid):
+    """读取进程内存（KB），需要 Linux 的 /proc/<pid>/smaps_rollup"""
+    memory = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if key in MEMORY_FIELDS:
+                memory[key] = int(value.split()[0])
+    memory['Shared'] = memory.pop('Shared_Clean') + memory.pop('Shared_Dirty')
+    memory['Private'] = memory.pop('Private_Clean') + memory.pop('Private_Dirty')
+    return memory
+
+
+def child_pids(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(child) for child in f.read().split()]
+
+
+class Command(BaseCommand):
+    help = '报告应用冷启动耗时和每个 worker 的内存占用'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pid', help='gunicorn 主进程 pid 或 pidfile 路径，报告其 worker 的实际内存')
+        parser.add_argument('--workers', type=int, default=4, help='未指定 --pid 时模拟 fork 的 worker 数')
+
+    def handle(self, *args, **options):
+        if not os.path.exists('/proc/self/smaps_rollup'):
+            raise CommandError('内存报告需要 Linux 的 /proc/<pid>/smaps_rollup')
+
+        self.report_startup()
+        if options['pid']:
+            self.report_server(options['pid'])
+        else:
+            self.report_simulated(options['workers'])
+
+    def report_startup(self):
+        result = subprocess.run(
+            [sys.executable, '-c', STARTUP_SCRIPT],
+            capture_output=True, text=True, env=os.environ.copy(),
+        )
+        if result.returncode != 0:
+            raise CommandError(result.stderr)
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        self.stdout.write('冷启动耗时（毫秒）')
+        for name, value in timings.items():
+            self.stdout.write(f'  {name:<14}{value:>10.1f}')
+
+    def report_server(self, pid):
+        if not pid.isdigit():
+            with open(pid) as f:
+                pid = f.read().strip()
+        pid = int(pid)
+        self.write_memory_table('gunicorn 进程内存（KB）', [('master', read_memory(pid))] + [
+            (f'worker {child}', read_memory(child)) for child in child_pids(pid)
+        ])
+
+    def report_simulated(self, workers):
+        """在本进程预热后 fork 出 worker，对比 gc.freeze() 前后 worker 的私有内存"""
+        from backend.warmup import warmup
+        warmup(freeze=False)
+        gc.unfreeze()
+        self.write_memory_table('未冻结时 worker 内存（KB）', self.fork_workers(workers))
+        gc.collect()
+        gc.freeze()
+        try:
+            self.write_memory_table('gc.freeze() 后 worker 内存（KB）', self.fork_workers(workers))
+        finally:
+            gc.unfreeze()
+
+    def fork_workers(self, count):
+        children = []
+        for _ in range(count):
+            read_fd, write_fd = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                # worker 中的一次完整 GC 会改写被跟踪对象的头部，触发写时复制
+                os.close(read_fd)
+                gc.collect()
+                os.write(write_fd, b'1')
+                time.sleep(60)
+                os._exit(0)
+            os.close(write_fd)
+            os.read(read_fd, 1)
+            os.close(read_fd)
+            children.append(pid)
+
+        rows = []
+        for pid in children:
+            rows.append((f'worker {pid}', read_memory(pid)))
+            os.kill(pid, 9)
+            os.waitpid(pid, 0)
+        return rows
+
+    def write_memory_table(self, title, rows):
+        self.stdout.write(title)
+        self.stdout.write(f'  {"进程":<16}{"Rss":>10}{"Pss":>10}{"Shared":>10}{"Private":>10}')
+        for name, memory in rows:
+            self.stdout.write(
+                f'  {name:<16}{memory["Rss"]:>10}{memory["Pss"]:>10}'
+                f'{memory["Shared"]:>10}{memory["Private"]:>10}'
+            )
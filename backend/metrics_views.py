@@ -0,0 +1,22 @@
+from django.core.cache import cache
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+
+from .coalesce import stats as coalesce_stats
+from .log_handlers import stats as logging_stats
+from .ratelimit import stats as ratelimit_stats
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def cache_metrics(request):
+    """
+    当前进程的缓存命中、请求合并、限流和日志丢弃统计
+    """
+    metrics = cache.metrics() if hasattr(cache, 'metrics') else {}
+    metrics['coalesce'] = coalesce_stats()
+    metrics['ratelimit'] = ratelimit_stats()
+    metrics['logging'] = logging_stats()
+    return Response(metrics, status=status.HTTP_200_OK)
\ No newline at end of file
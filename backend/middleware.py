@@ -0,0 +1,99 @@
+"""
+中间件
+CompressionMiddleware：按 Accept-Encoding 协商使用 brotli（已安装时）或 gzip 压缩响应，
+小于阈值的响应不压缩
+RateLimitMiddleware：按 URL 名称对写请求限流
+"""
+import gzip
+import math
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - 可选依赖
+    brotli = None
+
+from .ratelimit import check as check_rate_limit
+
+
+def parse_accept_encoding(header):
+    """解析 Accept-Encoding，返回 {编码: q值}"""
+    encodings = {}
+    for item in header.split(','):
+        name, _, params = item.strip().partition(';')
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        encodings[name.strip().lower()] = q
+    return encodings
+
+
+def choose_encoding(header):
+    """选择客户端接受且服务端支持的最优压缩方式"""
+    encodings = parse_accept_encoding(header)
+    wildcard = encodings.get('*', 0)
+    if brotli is not None and encodings.get('br', wildcard) > 0:
+        return 'br'
+    if encodings.get('gzip', wildcard) > 0:
+        return 'gzip'
+    return None
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(content, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    def process_response(self, request, response):
+        # 流式响应（如SSE、订阅源）需要边生成边发送，不做压缩
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+
+        # 压缩后内容字节不同，强ETag需改为弱ETag
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+
+class RateLimitMiddleware(MiddlewareMixin):
+    """在进入视图（认证、数据库访问）之前检查限流，超出时返回429和 Retry-After"""
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        if match is None or not match.url_name:
+            return None
+        wait = check_rate_limit(request, match.url_name)
+        if not wait:
+            return None
+        response = JsonResponse({'errors': '请求过于频繁，请稍后再试'}, status=429)
+        response['Retry-After'] = str(math.ceil(wait))
+        return response
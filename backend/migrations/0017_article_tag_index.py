@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-19 23:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_tag_index(apps, schema_editor):
+    Article = apps.get_model('backend', 'Article')
+    ArticleTagIndex = apps.get_model('backend', 'ArticleTagIndex')
+    links = Article.tags.through.objects.values_list('tag_id', 'article_id', 'article__pub_time')
+    batch = []
+    for tag_id, article_id, pub_time in links.iterator(chunk_size=2000):
+        batch.append(ArticleTagIndex(tag_id=tag_id, article_id=article_id, pub_time=pub_time))
+        if len(batch) >= 2000:
+            ArticleTagIndex.objects.bulk_create(batch)
+            batch = []
+    ArticleTagIndex.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0016_alter_captcha_created_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleTagIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_time', models.DateTimeField()),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_index', to='backend.article')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='article_index', to='backend.tag')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tag', '-pub_time'], name='tag_index_tag_pub_time')],
+                'unique_together': {('tag', 'article')},
+            },
+        ),
+        migrations.RunPython(backfill_tag_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.8 on 2026-10-19 23:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_stats(apps, schema_editor):
+    Article = apps.get_model('backend', 'Article')
+    ArticleStats = apps.get_model('backend', 'ArticleStats')
+    rows = Article.objects.values_list('id', 'views', 'like_count', 'dislike_count')
+    batch = []
+    for article_id, views, like_count, dislike_count in rows.iterator(chunk_size=2000):
+        batch.append(ArticleStats(article_id=article_id, views=views, like_count=like_count, dislike_count=dislike_count))
+        if len(batch) >= 2000:
+            ArticleStats.objects.bulk_create(batch)
+            batch = []
+    ArticleStats.objects.bulk_create(batch)
+
+
+def restore_counters(apps, schema_editor):
+    Article = apps.get_model('backend', 'Article')
+    ArticleStats = apps.get_model('backend', 'ArticleStats')
+    for stats in ArticleStats.objects.iterator(chunk_size=2000):
+        Article.objects.filter(id=stats.article_id).update(
+            views=stats.views, like_count=stats.like_count, dislike_count=stats.dislike_count,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0017_article_tag_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleStats',
+            fields=[
+                ('article', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='backend.article')),
+                ('views', models.IntegerField(default=0)),
+                ('like_count', models.IntegerField(default=0)),
+                ('dislike_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_stats, restore_counters),
+        migrations.RemoveField(
+            model_name='article',
+            name='dislike_count',
+        ),
+        migrations.RemoveField(
+            model_name='article',
+            name='like_count',
+        ),
+        migrations.RemoveField(
+            model_name='article',
+            name='views',
+        ),
+    ]
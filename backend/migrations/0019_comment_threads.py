@@ -0,0 +1,69 @@
+# Generated by Django 5.2.8 on 2026-10-20 00:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+PATH_SEGMENT_WIDTH = 8
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def encode_segment(comment_id):
+    digits = []
+    while comment_id:
+        comment_id, remainder = divmod(comment_id, 36)
+        digits.append(DIGITS[remainder])
+    return ''.join(reversed(digits)).rjust(PATH_SEGMENT_WIDTH, '0')
+
+
+def backfill_paths(apps, schema_editor):
+    # 已有评论都是顶层评论，路径即自身id
+    Comment = apps.get_model('backend', 'Comment')
+    ids = Comment.objects.values_list('id', flat=True)
+    batch = []
+    for comment_id in ids.iterator(chunk_size=2000):
+        batch.append(Comment(id=comment_id, path=encode_segment(comment_id)))
+        if len(batch) >= 2000:
+            Comment.objects.bulk_update(batch, ['path'])
+            batch = []
+    Comment.objects.bulk_update(batch, ['path'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0018_article_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='backend.comment'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='reply_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['article', 'path'], name='comment_article_path'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['article', 'depth', 'path'], name='comment_article_depth_path'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-20 00:05
+
+import backend.fields
+from django.db import migrations, models
+
+EXCERPT_LENGTH = 151
+
+
+def backfill_excerpts(apps, schema_editor):
+    # 正文的重新编码较慢，由 compress_article_content 命令分批执行；这里只补写摘要
+    Article = apps.get_model('backend', 'Article')
+    batch = []
+    for article in Article.objects.only('id', 'content').iterator(chunk_size=500):
+        article.excerpt = article.content[:EXCERPT_LENGTH]
+        batch.append(article)
+        if len(batch) >= 500:
+            Article.objects.bulk_update(batch, ['excerpt'])
+            batch = []
+    Article.objects.bulk_update(batch, ['excerpt'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0019_comment_threads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='excerpt',
+            field=models.CharField(default='', editable=False, max_length=151),
+        ),
+        migrations.AlterField(
+            model_name='article',
+            name='content',
+            field=backend.fields.CompressedTextField(),
+        ),
+        migrations.RunPython(backfill_excerpts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-20 00:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0020_article_content_compression'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedArticle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_index', to='backend.article')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='backend.article')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['article', 'rank'], name='related_article_rank')],
+                'unique_together': {('article', 'related')},
+            },
+        ),
+    ]
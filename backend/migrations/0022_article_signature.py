@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-20 00:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0021_related_article'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleSignature',
+            fields=[
+                ('article', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='backend.article')),
+                ('signature', models.BinaryField()),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='article',
+            name='title',
+            field=models.CharField(db_index=True, max_length=30),
+        ),
+        migrations.CreateModel(
+            name='ArticleBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.BigIntegerField()),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bands', to='backend.article')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket'], name='article_band_bucket')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-20 00:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0025_follow_timeline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TermFrequency',
+            fields=[
+                ('term', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('document_frequency', models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArticleTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=32)),
+                ('weight', models.FloatField()),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='backend.article')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term'], name='article_term_term')],
+                'unique_together': {('article', 'term')},
+            },
+        ),
+    ]
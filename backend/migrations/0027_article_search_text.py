@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-20 00:53
+
+from django.db import migrations, models
+
+
+def backfill_search_text(apps, schema_editor):
+    Article = apps.get_model('backend', 'Article')
+    batch = []
+    for article in Article.objects.only('id', 'content').iterator(chunk_size=500):
+        article.search_text = article.content
+        batch.append(article)
+        if len(batch) >= 500:
+            Article.objects.bulk_update(batch, ['search_text'])
+            batch = []
+    Article.objects.bulk_update(batch, ['search_text'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0026_related_terms'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='search_text',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.RunPython(backfill_search_text, migrations.RunPython.noop),
+    ]
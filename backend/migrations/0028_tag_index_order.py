@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-20 00:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0027_article_search_text'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='articletagindex',
+            name='tag_index_tag_pub_time',
+        ),
+        migrations.AddIndex(
+            model_name='articletagindex',
+            index=models.Index(fields=['tag', '-pub_time', '-article'], name='tag_index_tag_pub_time_id'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-20 01:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def move_search_text(apps, schema_editor):
+    Article = apps.get_model('backend', 'Article')
+    ArticleSearchText = apps.get_model('backend', 'ArticleSearchText')
+    batch = []
+    for article_id, text in Article.objects.values_list('id', 'search_text').iterator(chunk_size=500):
+        batch.append(ArticleSearchText(article_id=article_id, text=text))
+        if len(batch) >= 500:
+            ArticleSearchText.objects.bulk_create(batch)
+            batch = []
+    ArticleSearchText.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0028_tag_index_order'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleSearchText',
+            fields=[
+                ('article', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search', serialize=False, to='backend.article')),
+                ('text', models.TextField()),
+            ],
+        ),
+        migrations.RunPython(move_search_text, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='article',
+            name='search_text',
+        ),
+    ]
@@ -2,7 +2,15 @@ import datetime
 from django.db import models
 from django.contrib.auth.models import User
 
+from .fields import CompressedTextField
+
 # Create your models here.
+class LiveManager(models.Manager):
+    """默认管理器，过滤已软删除（deleted_at 非空）的记录"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
 # 用户信息
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='backend_profile')
@@ -10,25 +18,58 @@ class UserProfile(models.Model):
     birthday = models.DateField(default=datetime.date.today)
     created_at = models.DateTimeField(auto_now_add=True)
     profile_pic = models.ImageField(default='default.png', upload_to='profile_pics')
+    deleted_at = models.DateTimeField(null=True, blank=True, db_index=True)  # 注销时间，账号由后台任务清理
+    follower_count = models.IntegerField(default=0)  # 粉丝数，决定发文时是否推送到粉丝的时间线
 
     def __str__(self):
         return f"{self.user.username}的资料"
 
+# 文章列表摘要为正文前150字，多存一个字用于判断是否截断
+EXCERPT_LENGTH = 151
+
 # 文章
 class Article(models.Model):
-    title = models.CharField(max_length=30) # 标题
-    content = models.TextField() # 内容
+    title = models.CharField(max_length=30, db_index=True) # 标题
+    content = CompressedTextField() # 内容，超过阈值时压缩存储
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, default='', editable=False) # 正文开头，用于列表摘要
     author = models.ForeignKey(User, related_name='articles', on_delete=models.CASCADE) # 作者
     category = models.ForeignKey('Category', on_delete=models.CASCADE) # 分类
     pub_time = models.DateTimeField(auto_now_add=True) # 发布时间
     updated_time = models.DateTimeField(auto_now=True) # 更新时间
-    views = models.IntegerField(default=0)
-    like_count = models.IntegerField(default=0)
-    dislike_count = models.IntegerField(default=0)
     tags = models.ManyToManyField('Tag', related_name='articles')
+    deleted_at = models.DateTimeField(null=True, blank=True, db_index=True) # 软删除时间，关联数据由后台任务分批清理
+
+    objects = LiveManager() # 默认不包含已删除的文章
+    all_objects = models.Manager()
 
     class Meta:
         ordering = ['-pub_time']
+        indexes = [
+            models.Index(fields=['author', '-pub_time'], name='article_author_pub_time'),
+        ]
+
+# 文章计数，与文章正文分表存放，计数更新不会改写文章行和更新时间
+class ArticleStats(models.Model):
+    article = models.OneToOneField(Article, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    views = models.IntegerField(default=0) # 浏览量
+    like_count = models.IntegerField(default=0) # 点赞数
+    dislike_count = models.IntegerField(default=0) # 踩数
+
+# 文章正文的明文，压缩存储的正文无法在数据库中匹配，单独存放仅用于搜索，读取文章时不会带出
+class ArticleSearchText(models.Model):
+    article = models.OneToOneField(Article, on_delete=models.CASCADE, primary_key=True, related_name='search')
+    text = models.TextField()
+
+# 文章按天的浏览、点赞、评论数，由 analytics 模块定时从缓存批量写入，每篇文章每天一行
+class ArticleDailyStats(models.Model):
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='daily_stats')
+    day = models.DateField()
+    views = models.IntegerField(default=0)
+    likes = models.IntegerField(default=0) # 当天点赞的净增量，取消点赞时减少
+    comments = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = (('article', 'day'),)
 
 class Tag(models.Model):
     tag = models.CharField(max_length=10, unique=True)
@@ -40,10 +81,65 @@ class Tag(models.Model):
     @property
     def categories(self):
         """获取该标签所属的所有分类"""
-        try:
-            return [ct.category for ct in self.category_tags.all()]
-        except:
-            return []
+        from .taxonomy import get_taxonomy
+        return [Category(id=pk, category=name) for pk, name in get_taxonomy().categories_of(self.id)]
+
+# 标签-文章倒排索引，冗余发布时间以便按标签分页时直接走 (tag, pub_time) 索引
+class ArticleTagIndex(models.Model):
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='article_index')
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='tag_index')
+    pub_time = models.DateTimeField()
+
+    class Meta:
+        unique_together = (('tag', 'article'),)
+        indexes = [
+            models.Index(fields=['tag', '-pub_time', '-article'], name='tag_index_tag_pub_time_id'),
+        ]
+
+# 相关文章，由 related 模块离线计算，每篇文章保存得分最高的若干篇
+class RelatedArticle(models.Model):
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='related_index')
+    related = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        unique_together = (('article', 'related'),)
+        indexes = [
+            models.Index(fields=['article', 'rank'], name='related_article_rank'),
+        ]
+
+# 文章的 TF-IDF 向量（归一化后权重最高的词），按词查询即为倒排表，增量计算相关文章时使用
+class ArticleTerm(models.Model):
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='terms')
+    term = models.CharField(max_length=32)
+    weight = models.FloatField()
+
+    class Meta:
+        unique_together = (('article', 'term'),)
+        indexes = [
+            models.Index(fields=['term'], name='article_term_term'),
+        ]
+
+# 全量计算相关文章时各词的文档频率，只保存出现在两篇及以上文章中的词
+class TermFrequency(models.Model):
+    term = models.CharField(max_length=32, primary_key=True)
+    document_frequency = models.PositiveIntegerField()
+
+# 文章正文的 MinHash 签名，用于近似重复检测
+class ArticleSignature(models.Model):
+    article = models.OneToOneField(Article, on_delete=models.CASCADE, primary_key=True, related_name='signature')
+    signature = models.BinaryField()
+
+# MinHash 签名分段后的哈希桶，同一个桶中的文章为近似重复候选
+class ArticleBand(models.Model):
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='bands')
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['bucket'], name='article_band_bucket'),
+        ]
 
 # 点赞情况
 class Like(models.Model):
@@ -63,12 +159,46 @@ class Dislike(models.Model):
     class Meta:
         unique_together = (('user', 'article'),)
 
+# 关注关系
+class Follow(models.Model):
+    follower = models.ForeignKey(User, related_name='following', on_delete=models.CASCADE)
+    followee = models.ForeignKey(User, related_name='followers', on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = (('follower', 'followee'),)
+
+# 关注时间线，作者发文时推送给每个粉丝一行（粉丝过多的作者改为读取时合并，不写入这里）
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(User, related_name='timeline', on_delete=models.CASCADE)
+    article = models.ForeignKey(Article, related_name='timeline_entries', on_delete=models.CASCADE)
+    author = models.ForeignKey(User, related_name='+', on_delete=models.CASCADE)
+    pub_time = models.DateTimeField()
+
+    class Meta:
+        unique_together = (('user', 'article'),)
+        indexes = [
+            models.Index(fields=['user', '-pub_time', '-article'], name='timeline_user_pub_time'),
+        ]
+
 # 评论
+# path 为物化路径：祖先到自身的id依次编码为定长段拼接，
+# 按 path 排序即为楼层的先序遍历，子树对应一段连续的 path 范围
 class Comment(models.Model):
     article = models.ForeignKey(Article, related_name='comments', on_delete=models.CASCADE)
     author = models.ForeignKey(User, related_name='comments', on_delete=models.CASCADE)
     content = models.TextField()
     pub_time = models.DateTimeField(auto_now_add=True)
+    parent = models.ForeignKey('self', related_name='replies', null=True, blank=True, on_delete=models.CASCADE)
+    path = models.CharField(max_length=255, default='')
+    depth = models.PositiveSmallIntegerField(default=0)
+    reply_count = models.PositiveIntegerField(default=0)  # 直接回复数
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['article', 'path'], name='comment_article_path'),
+            models.Index(fields=['article', 'depth', 'path'], name='comment_article_depth_path'),
+        ]
 
 # 分类
 class Category(models.Model):
@@ -82,7 +212,8 @@ class Category(models.Model):
     @property
     def tags(self):
         """获取该分类下的所有标签"""
-        return [ct.tag for ct in self.category_tags.all()]
+        from .taxonomy import get_taxonomy
+        return [Tag(id=pk, tag=name) for pk, name in get_taxonomy().tags_of(self.id)]
     
     def add_tag(self, tag_name):
         """为分类添加标签"""
@@ -4,11 +4,27 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.views import APIView
+from .article_views import ARTICLE_LIST_FIELDS
+from .deletion import soft_delete_user
+from .fieldsets import parse_fields, project, render
 from .models import UserProfile, Article
 from .serializers import UserProfileSerializer
+from .viewer_state import get_viewer_states
+
+# 个人主页文章列表可通过 ?fields= 选择的字段
+PROFILE_ARTICLE_FIELDS = {
+    name: ARTICLE_LIST_FIELDS[name]
+    for name in ('id', 'title', 'pub_time', 'views', 'like_count', 'dislike_count', 'liked', 'disliked')
+}
 
 class UserProfilesView(APIView):
     def get(self, request, user_id=None):
+        fields, invalid = parse_fields(request, PROFILE_ARTICLE_FIELDS)
+        if invalid:
+            return Response({
+                'errors': f'不支持的字段: {", ".join(invalid)}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
         if user_id is None:
             if not request.user.is_authenticated:
                 return Response({
@@ -18,7 +34,8 @@ class UserProfilesView(APIView):
             is_owner = True
         else:
             try:
-                user = User.objects.get(id=user_id)
+                # 已注销的账号在清理前也不再展示
+                user = User.objects.get(id=user_id, backend_profile__deleted_at__isnull=True)
                 is_owner = request.user.is_authenticated and request.user.id == int(user_id)
             except User.DoesNotExist:
                 return Response({
@@ -32,6 +49,7 @@ class UserProfilesView(APIView):
             'introduction':user.backend_profile.introduction if user.backend_profile.introduction else '',
             'birthday': user.backend_profile.birthday,
             'created_at': user.backend_profile.created_at,
+            'follower_count': user.backend_profile.follower_count,
             'is_owner': is_owner,
         }
 
@@ -40,15 +58,11 @@ class UserProfilesView(APIView):
         start = (page - 1) * page_size
         end = start + page_size
 
-        articles = Article.objects.filter(author_id=user.id)[start:end]
-        article_list = [{
-            'id': article.id,
-            'title': article.title,
-            'pub_time': article.pub_time.isoformat(),
-            'views': article.views,
-            'like_count': article.like_count,
-            'dislike_count': article.dislike_count,
-        } for article in articles]
+        articles = project(Article.objects.filter(author_id=user.id), PROFILE_ARTICLE_FIELDS, fields)[start:end]
+        context = {}
+        if 'liked' in fields or 'disliked' in fields:
+            context['viewer_states'] = get_viewer_states([article.id for article in articles], request.user)
+        article_list = [render(article, PROFILE_ARTICLE_FIELDS, fields, context) for article in articles]
 
         total_count = Article.objects.filter(author_id=user.id).count()
 
@@ -76,3 +90,15 @@ class UserProfilesView(APIView):
             return Response({}, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @permission_classes([IsAuthenticated])
+    def delete(self, request):
+        """注销账号，文章立即隐藏，账号数据由后台任务清理"""
+        if not request.user.is_authenticated:
+            return Response({
+                'errors':'未登录'
+            }, status=status.HTTP_401_UNAUTHORIZED)
+
+        soft_delete_user(request.user)
+        return Response({
+            'success': True
+        }, status=status.HTTP_200_OK)
@@ -0,0 +1,177 @@
+"""
+令牌桶限流
+每条规则对应一个令牌桶：容量为速率中的次数，按速率匀速补充。一个接口的全部桶一起检查，
+都有令牌时各消耗一个；任一桶没有令牌时拒绝并给出需要等待的秒数，其他桶不扣减。
+配置了 Redis 时由 Lua 脚本在 Redis 中原子地补充和扣减（时间取 Redis 服务器时间，多节点共享同一个桶）；
+否则（测试中的本地内存缓存、Redis 不可用时）在进程内加锁后读写默认缓存
+"""
+import logging
+import math
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+TOKEN_BUCKET_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local buckets = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i])
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    if tokens < 1 then
+        wait = math.max(wait, (1 - tokens) / rate)
+    end
+    buckets[i] = {tokens, capacity, rate}
+end
+-- 任一规则拒绝时不扣减任何桶，避免被拒绝的请求消耗其他桶（如全局桶）的令牌
+if wait > 0 then
+    return tostring(wait)
+end
+for i, key in ipairs(KEYS) do
+    local tokens, capacity, rate = unpack(buckets[i])
+    redis.call('HSET', key, 'tokens', tostring(tokens - 1), 'ts', tostring(now))
+    redis.call('EXPIRE', key, math.ceil(capacity / rate) + 1)
+end
+return '0'
+"""
+
+_local_lock = threading.Lock()
+_script = None
+_stats = Counter()
+
+
+@dataclass(frozen=True)
+class Rule:
+    scope: str  # ip / user（未登录时按ip）/ global（整个接口共享）
+    capacity: int
+    rate: float  # 每秒补充的令牌数
+
+
+def parse_rate(rate):
+    """'5/m' -> (5, 5/60)"""
+    count, _, period = rate.partition('/')
+    count = int(count)
+    return count, count / PERIODS[period]
+
+
+def get_rules(url_name):
+    return [Rule(scope, *parse_rate(rate)) for scope, rate in settings.RATE_LIMITS.get(url_name, ())]
+
+
+def client_ip(request):
+    """经过 RATE_LIMIT_PROXY_COUNT 层反向代理时，取 X-Forwarded-For 中由最外层代理追加的地址"""
+    proxies = settings.RATE_LIMIT_PROXY_COUNT
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if proxies and forwarded:
+        addresses = [address.strip() for address in forwarded.split(',')]
+        return addresses[-min(proxies, len(addresses))]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def request_user_id(request):
+    """从 JWT 中取用户id，只校验签名，不查询数据库"""
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else None
+    if raw_token is None:
+        return None
+    try:
+        return authentication.get_validated_token(raw_token).get('user_id')
+    except (InvalidToken, TokenError):
+        return None
+
+
+def bucket_key(url_name, rule, request):
+    if rule.scope == 'global':
+        identity = '*'
+    elif rule.scope == 'user' and (user_id := request_user_id(request)) is not None:
+        identity = f'user:{user_id}'
+    else:
+        identity = f'ip:{client_ip(request)}'
+    # 容量相同、周期不同的规则（如 5/m 和 5/h）使用不同的桶
+    return f'ratelimit:{url_name}:{rule.scope}:{rule.capacity}:{rule.rate:g}:{identity}'
+
+
+def _redis():
+    try:
+        from django_redis import get_redis_connection
+    except ImportError:
+        return None
+    try:
+        return get_redis_connection(settings.RATE_LIMIT_REDIS_ALIAS)
+    except Exception:
+        # 缓存别名不存在或不是 django_redis 后端（如测试环境）
+        return None
+
+
+def _take_redis(connection, buckets):
+    global _script
+    if _script is None:
+        _script = connection.register_script(TOKEN_BUCKET_SCRIPT)
+    args = [value for _, rule in buckets for value in (rule.capacity, rule.rate)]
+    return float(_script(keys=[key for key, _ in buckets], args=args, client=connection))
+
+
+def _take_local(buckets):
+    with _local_lock:
+        now = time.time()
+        stored = cache.get_many([key for key, _ in buckets])
+        refilled, wait = {}, 0.0
+        for key, rule in buckets:
+            tokens, ts = stored.get(key) or (rule.capacity, now)
+            tokens = min(rule.capacity, tokens + max(0.0, now - ts) * rule.rate)
+            if tokens < 1:
+                wait = max(wait, (1 - tokens) / rule.rate)
+            refilled[key] = tokens
+        if wait:
+            return wait
+        for key, rule in buckets:
+            cache.set(key, (refilled[key] - 1, now), math.ceil(rule.capacity / rule.rate) + 1)
+    return 0.0
+
+
+def take(buckets):
+    """
+    buckets 为 [(键, 规则)]：全部桶都有令牌时各取一个并返回0，
+    否则不扣减任何桶，返回需要等待的秒数
+    """
+    connection = _redis()
+    if connection is not None:
+        try:
+            return _take_redis(connection, buckets)
+        except Exception:
+            logger.warning('Redis 限流不可用，改为进程内限流', exc_info=True)
+    return _take_local(buckets)
+
+
+def check(request, url_name):
+    """按接口的全部规则检查写请求，返回需要等待的秒数（0 表示放行）"""
+    if not settings.RATE_LIMIT_ENABLED or request.method in SAFE_METHODS:
+        return 0
+    rules = get_rules(url_name)
+    if not rules:
+        return 0
+    wait = take([(bucket_key(url_name, rule, request), rule) for rule in rules])
+    _stats['rejected' if wait else 'allowed'] += 1
+    return wait
+
+
+def stats():
+    """当前进程的限流统计"""
+    return dict(_stats)
@@ -0,0 +1,271 @@
+"""
+相关文章
+相似度 = 标签 Jaccard 系数 * TAG_WEIGHT + 标题和正文 TF-IDF 余弦相似度 * (1 - TAG_WEIGHT)。
+文章向量为稀疏的 {词: 权重}，通过词和标签的倒排表只与有共同词或标签的文章累加得分，
+相当于稀疏矩阵乘法，不需要两两比较。结果写入 RelatedArticle，接口只做一次索引查询。
+全量重建时把文章向量（ArticleTerm）和文档频率（TermFrequency）写入数据库，增量更新只读取变化的文章，
+按保存的文档频率计算向量，再从 ArticleTerm 和标签中找出有共同词或标签的候选文章；
+文档频率在两次全量重建之间不变，定期全量重建消除偏差
+"""
+import datetime
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Article, ArticleTerm, RelatedArticle, TermFrequency
+from .tagging import ArticleTag
+
+TOP_K = 10
+TAG_WEIGHT = 0.4
+TITLE_WEIGHT = 3  # 标题中的词按出现3次计
+CONTENT_CHARS = 2000  # 只取正文开头参与计算
+MAX_TERMS = 64  # 每篇文章只保留权重最高的词
+MAX_DF_RATIO = 0.5  # 出现在一半以上文章中的词视为停用词
+MAX_TERM_LENGTH = 32
+WRITE_BATCH_SIZE = 2000
+REBUILD_INTERVAL = datetime.timedelta(days=1)
+REFRESH_WATERMARK_KEY = 'related:refreshed_at'
+CORPUS_KEY = 'related:corpus'  # 最近一次全量重建的 {'size': 文章数, 'rebuilt_at': 时间}
+
+# 英文和数字按单词切分，中文按相邻两字切分
+TOKEN_RE = re.compile(r'[a-z0-9]+|[一-鿿]+')
+
+
+def tokenize(text):
+    for run in TOKEN_RE.findall(text.lower()):
+        if run[0] >= '一':
+            if len(run) == 1:
+                yield run
+            else:
+                for i in range(len(run) - 1):
+                    yield run[i:i + 2]
+        elif len(run) > 1:
+            yield run[:MAX_TERM_LENGTH]
+
+
+@dataclass
+class Corpus:
+    vectors: dict  # 文章id -> {词: 权重}，已归一化
+    tags: dict  # 文章id -> frozenset(标签id)
+    term_postings: dict  # 词 -> [(文章id, 权重)]
+    tag_postings: dict  # 标签id -> [文章id]
+
+
+def article_terms(article):
+    terms = Counter(tokenize(article.content[:CONTENT_CHARS]))
+    for term in tokenize(article.title):
+        terms[term] += TITLE_WEIGHT
+    return terms
+
+
+def vectorize(terms, document_frequency, total):
+    """按文档频率计算归一化的 TF-IDF 向量；没有记录的词按只出现在本文中计"""
+    max_df = max(2, total * MAX_DF_RATIO)
+    weights = {}
+    for term, count in terms.items():
+        df = document_frequency.get(term, 1)
+        if df <= max_df:
+            weights[term] = (1 + math.log(count)) * math.log((total + 1) / (df + 1))
+    top = heapq.nlargest(MAX_TERMS, weights.items(), key=lambda item: item[1])
+    norm = math.sqrt(sum(weight * weight for _, weight in top)) or 1.0
+    return {term: weight / norm for term, weight in top}
+
+
+def load_corpus():
+    """读取全部文章，计算 TF-IDF 向量并建立倒排表"""
+    counts = {}
+    document_frequency = Counter()
+    for article in Article.objects.only('id', 'title', 'content').iterator(chunk_size=200):
+        counts[article.id] = article_terms(article)
+        document_frequency.update(counts[article.id].keys())
+
+    total = len(counts)
+    vectors, term_postings = {}, defaultdict(list)
+    for article_id, terms in counts.items():
+        vectors[article_id] = vectorize(terms, document_frequency, total)
+        for term, weight in vectors[article_id].items():
+            term_postings[term].append((article_id, weight))
+
+    tags, tag_postings = defaultdict(set), defaultdict(list)
+    for article_id, tag_id in ArticleTag.objects.values_list('article_id', 'tag_id'):
+        if article_id in vectors:
+            tags[article_id].add(tag_id)
+            tag_postings[tag_id].append(article_id)
+    tags = {article_id: frozenset(tags.get(article_id, ())) for article_id in vectors}
+    return Corpus(vectors, tags, term_postings, tag_postings), document_frequency
+
+
+def load_neighbourhood(vectors):
+    """
+    只加载与指定文章有共同词或标签的文章，组成计算这些文章得分所需的部分语料；
+    vectors 为指定文章的新向量
+    """
+    term_postings = defaultdict(list)
+    terms = {term for vector in vectors.values() for term in vector}
+    for article_id, term, weight in ArticleTerm.objects.filter(term__in=terms).values_list(
+        'article_id', 'term', 'weight',
+    ).iterator(chunk_size=WRITE_BATCH_SIZE):
+        term_postings[term].append((article_id, weight))
+
+    live_tags = ArticleTag.objects.filter(article__deleted_at__isnull=True)
+    own_tags = set(live_tags.filter(article_id__in=vectors).values_list('tag_id', flat=True))
+    tag_postings = defaultdict(list)
+    for article_id, tag_id in live_tags.filter(tag_id__in=own_tags).values_list('article_id', 'tag_id'):
+        tag_postings[tag_id].append(article_id)
+
+    candidates = set(vectors)
+    candidates.update(article_id for postings in term_postings.values() for article_id, _ in postings)
+    candidates.update(article_id for postings in tag_postings.values() for article_id in postings)
+    tags = defaultdict(set)
+    for article_id, tag_id in live_tags.filter(article_id__in=candidates).values_list('article_id', 'tag_id'):
+        tags[article_id].add(tag_id)
+    tags = {article_id: frozenset(tags.get(article_id, ())) for article_id in candidates}
+    return Corpus(vectors, tags, term_postings, tag_postings)
+
+
+def _save_terms(vectors):
+    """替换文章的向量，vectors 为 {文章id: {词: 权重}}"""
+    rows = [
+        ArticleTerm(article_id=article_id, term=term, weight=weight)
+        for article_id, vector in vectors.items() for term, weight in vector.items()
+    ]
+    with transaction.atomic():
+        ArticleTerm.objects.filter(article_id__in=list(vectors)).delete()
+        ArticleTerm.objects.bulk_create(rows, batch_size=WRITE_BATCH_SIZE)
+
+
+def similarities(article_id, corpus):
+    """返回与该文章有共同词或标签的全部文章的得分 {文章id: 得分}"""
+    cosine = defaultdict(float)
+    for term, weight in corpus.vectors.get(article_id, {}).items():
+        for other_id, other_weight in corpus.term_postings[term]:
+            cosine[other_id] += weight * other_weight
+
+    own_tags = corpus.tags.get(article_id, frozenset())
+    shared = Counter()
+    for tag_id in own_tags:
+        shared.update(corpus.tag_postings[tag_id])
+
+    scores = {}
+    for other_id in cosine.keys() | shared.keys():
+        if other_id == article_id:
+            continue
+        union = len(own_tags) + len(corpus.tags[other_id]) - shared[other_id]
+        jaccard = shared[other_id] / union if union else 0.0
+        scores[other_id] = TAG_WEIGHT * jaccard + (1 - TAG_WEIGHT) * cosine[other_id]
+    return scores
+
+
+def top_k(scores):
+    return heapq.nlargest(TOP_K, ((score, other_id) for other_id, score in scores.items() if score > 0))
+
+
+def _write(neighbours):
+    """替换文章的相关文章列表，neighbours 为 {文章id: [(得分, 相关文章id)]}"""
+    with transaction.atomic():
+        RelatedArticle.objects.filter(article_id__in=neighbours).delete()
+        RelatedArticle.objects.bulk_create([
+            RelatedArticle(article_id=article_id, related_id=other_id, score=round(score, 6), rank=rank)
+            for article_id, items in neighbours.items()
+            for rank, (score, other_id) in enumerate(items)
+        ])
+
+
+def rebuild(batch_size=500):
+    """全量重建，按批写入，同时保存文章向量和文档频率，返回处理的文章数"""
+    corpus, document_frequency = load_corpus()
+    article_ids = sorted(corpus.vectors)
+    for i in range(0, len(article_ids), batch_size):
+        _write({article_id: top_k(similarities(article_id, corpus)) for article_id in article_ids[i:i + batch_size]})
+
+    with transaction.atomic():
+        ArticleTerm.objects.all().delete()
+        TermFrequency.objects.all().delete()
+        ArticleTerm.objects.bulk_create([
+            ArticleTerm(article_id=article_id, term=term, weight=weight)
+            for article_id, vector in corpus.vectors.items() for term, weight in vector.items()
+        ], batch_size=WRITE_BATCH_SIZE)
+        TermFrequency.objects.bulk_create([
+            TermFrequency(term=term, document_frequency=df) for term, df in document_frequency.items() if df > 1
+        ], batch_size=WRITE_BATCH_SIZE)
+    cache.set(CORPUS_KEY, {'size': len(article_ids), 'rebuilt_at': timezone.now()}, None)
+    return len(article_ids)
+
+
+def refresh(article_ids):
+    """
+    增量更新：重新计算指定文章的相关列表，
+    并把它们与其他文章的新得分合并进对方的列表（替换旧得分，保留前 TOP_K）
+    """
+    article_ids = set(article_ids)
+    if not article_ids:
+        return 0
+    articles = list(Article.objects.filter(id__in=article_ids).only('id', 'title', 'content'))
+    if not articles:
+        return 0
+
+    counts = {article.id: article_terms(article) for article in articles}
+    corpus_info = cache.get(CORPUS_KEY)
+    total = corpus_info['size'] if corpus_info else Article.objects.count()
+    document_frequency = dict(TermFrequency.objects.filter(
+        term__in={term for terms in counts.values() for term in terms},
+    ).values_list('term', 'document_frequency'))
+    vectors = {article_id: vectorize(terms, document_frequency, total) for article_id, terms in counts.items()}
+    _save_terms(vectors)
+    corpus = load_neighbourhood(vectors)
+    article_ids = list(vectors)
+
+    changed = set(article_ids)
+    neighbours = {}
+    incoming = defaultdict(dict)  # 其他文章 -> {变化的文章: 新得分}
+    for article_id in article_ids:
+        scores = similarities(article_id, corpus)
+        neighbours[article_id] = top_k(scores)
+        for other_id, score in scores.items():
+            if other_id not in changed:
+                incoming[other_id][article_id] = score
+
+    # 原列表中包含变化文章但已没有共同词和标签的，需要移除
+    listing = RelatedArticle.objects.filter(related_id__in=changed).exclude(article_id__in=changed)
+    for other_id, related_id in listing.values_list('article_id', 'related_id'):
+        incoming[other_id].setdefault(related_id, 0.0)
+
+    current = defaultdict(dict)
+    rows = RelatedArticle.objects.filter(article_id__in=incoming).values_list('article_id', 'related_id', 'score')
+    for other_id, related_id, score in rows:
+        current[other_id][related_id] = score
+    for other_id, scores in incoming.items():
+        items = top_k({**current[other_id], **scores})
+        # 变化的文章进入或离开了对方的列表时才需要改写
+        if any(related_id in scores for _, related_id in items) or scores.keys() & current[other_id].keys():
+            neighbours[other_id] = items
+
+    _write(neighbours)
+    return len(article_ids)
+
+
+def refresh_changed():
+    """更新上次执行以来新增或修改的文章；首次执行或距上次全量重建超过 REBUILD_INTERVAL 时全量重建"""
+    now = timezone.now()
+    refreshed_at = cache.get(REFRESH_WATERMARK_KEY)
+    corpus_info = cache.get(CORPUS_KEY)
+    if refreshed_at is None or corpus_info is None or now - corpus_info['rebuilt_at'] > REBUILD_INTERVAL:
+        count = rebuild()
+    else:
+        count = refresh(Article.objects.filter(updated_time__gt=refreshed_at).values_list('id', flat=True))
+    cache.set(REFRESH_WATERMARK_KEY, now, None)
+    return count
+
+
+def get_related(article_id, limit=TOP_K):
+    """读取相关文章，只查询一次 (article, rank) 索引"""
+    related = RelatedArticle.objects.filter(article_id=article_id, related__deleted_at__isnull=True)
+    return related.select_related('related').only(
+        'score', 'related__id', 'related__title', 'related__pub_time',
+    ).order_by('rank')[:limit]
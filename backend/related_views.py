@@ -0,0 +1,23 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import AllowAny
+
+from .related import get_related, TOP_K
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def related_articles(request, pk):
+    """
+    相关文章，读取离线计算好的结果
+    """
+    limit = min(int(request.query_params.get('limit', TOP_K)), TOP_K)
+    related_list = [{
+        'id': item.related.id,
+        'title': item.related.title,
+        'pub_time': item.related.pub_time.isoformat(),
+        'score': item.score,
+    } for item in get_related(pk, limit)]
+
+    return Response({'results': related_list}, status=status.HTTP_200_OK)
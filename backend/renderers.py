@@ -0,0 +1,27 @@
+"""
+高性能JSON渲染器
+安装了 orjson 时使用其编码，否则回退到 DRF 默认的标准库实现
+"""
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    # 日期时间交给 DRF 的编码器处理，保证与标准库输出格式一致（毫秒精度）
+    orjson_options = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # 需要缩进输出（如浏览器调试）时仍使用标准库
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=self.encoder_class().default, option=self.orjson_options)
+        # 与 DRF 保持一致，转义 JavaScript 中非法的行分隔符
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
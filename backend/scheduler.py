@@ -0,0 +1,90 @@
+"""
+轻量级定时任务调度
+任务通过 @periodic 注册，由 run_scheduler 命令周期执行。
+每个任务在执行前通过缓存加锁（锁的有效期即执行间隔），多节点部署时同一周期内只有一个节点执行
+"""
+import logging
+import os
+import socket
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from django.core.cache import cache
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+NODE_ID = f'{socket.gethostname()}:{os.getpid()}'
+
+_jobs = {}
+
+
+@dataclass(frozen=True)
+class Job:
+    name: str
+    func: Callable
+    interval: int  # 执行间隔（秒）
+
+
+def periodic(interval, name=None):
+    """注册定时任务"""
+    def decorator(func):
+        job = Job(name or func.__name__, func, interval)
+        _jobs[job.name] = job
+        return func
+    return decorator
+
+
+def registered_jobs():
+    """返回全部已注册任务"""
+    from . import jobs  # noqa: F401  导入以完成注册
+    return dict(_jobs)
+
+
+def batched_ids(queryset, batch_size=1000):
+    """按主键分批返回id列表，避免一次加载或锁定大量行"""
+    last_id = 0
+    while True:
+        ids = list(queryset.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def metrics_key(name):
+    return f'scheduler:metrics:{name}'
+
+
+def get_metrics(name):
+    """获取任务的执行统计"""
+    return cache.get(metrics_key(name)) or {
+        'runs': 0, 'failures': 0, 'last_run': None, 'last_duration_ms': None, 'last_result': None,
+    }
+
+
+def run_job(job, force=False):
+    """
+    执行任务并记录耗时；force 为 False 时需先获取锁，未获取到返回 False
+    """
+    if not force and not cache.add(f'scheduler:lock:{job.name}', NODE_ID, job.interval):
+        return False
+
+    start = time.perf_counter()
+    metrics = get_metrics(job.name)
+    try:
+        result = job.func()
+        metrics['last_result'] = result
+    except Exception:
+        metrics['failures'] += 1
+        metrics['last_result'] = 'error'
+        logger.exception('定时任务 %s 执行失败', job.name)
+    duration = (time.perf_counter() - start) * 1000
+
+    metrics['runs'] += 1
+    metrics['last_run'] = timezone.now().isoformat()
+    metrics['last_duration_ms'] = round(duration, 2)
+    cache.set(metrics_key(job.name), metrics, None)
+    logger.info('定时任务 %s 执行完成，耗时 %.2fms，结果 %s', job.name, duration, metrics['last_result'])
+    return True
@@ -1,9 +1,14 @@
 from django.utils import timezone
 import datetime
+from django.db import transaction
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
-from .models import UserProfile, Article, Category, Comment, Captcha
+from .comment_tree import MAX_DEPTH
+from .duplicates import find_duplicate
+from .models import UserProfile, Article, Comment, Captcha
+from .taxonomy import get_taxonomy
+from .tagging import resolve_tags, apply_article_tags
 
 class LoginSerializer(serializers.Serializer):
     email = serializers.EmailField()
@@ -78,15 +83,26 @@ class ArticleSerializer(serializers.ModelSerializer):
     title = serializers.CharField(min_length=5, max_length=30)
     content = serializers.CharField(min_length=5)
     category = serializers.CharField()
-    tags = serializers.StringRelatedField(many=True, read_only=True)
+    tags = serializers.SerializerMethodField()
     tag_ids = serializers.ListField(child=serializers.IntegerField(), write_only=True, required=False)
+    tag_names = serializers.ListField(child=serializers.CharField(max_length=10), write_only=True, required=False)
 
     class Meta:
         model = Article
-        fields = ['title', 'content', 'category','tags', 'tag_ids']
+        fields = ['title', 'content', 'category','tags', 'tag_ids', 'tag_names']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # 保存时解析出的标签名，避免返回结果时再次查询
+        self.resolved_tag_names = None
+
+    def get_tags(self, obj):
+        if self.resolved_tag_names is not None:
+            return self.resolved_tag_names
+        return [tag.tag for tag in obj.tags.all()]
 
     def validate_category(self, value):
-        if not Category.objects.filter(category=value).exists():
+        if value not in get_taxonomy().category_ids:
             raise serializers.ValidationError(f"分类 '{value}' 不存在")
         return value
 
@@ -103,35 +119,52 @@ class ArticleSerializer(serializers.ModelSerializer):
         if queryset.exists():
             raise serializers.ValidationError('文章已存在')
 
+        # 检查正文是否与已有文章近似重复
+        if 'content' in data:
+            duplicate = find_duplicate(data['content'], exclude_id=instance.pk if instance else None)
+            if duplicate is not None:
+                raise serializers.ValidationError({'content': f'内容与已有文章（id: {duplicate[0]}）高度相似'})
+
+        # 标签id和标签名统一解析为当前分类下的标签id
+        if 'tag_ids' in data or 'tag_names' in data:
+            if 'category' in data:
+                category_id = get_taxonomy().category_ids[data['category']]
+            else:
+                category_id = instance.category_id
+            tag_ids, invalid = resolve_tags(category_id, data.get('tag_ids'), data.pop('tag_names', None))
+            if invalid:
+                raise serializers.ValidationError({'tag_ids': f"标签 {', '.join(invalid)} 不存在或不属于该分类"})
+            data['tag_ids'] = tag_ids
+
         return data
 
+    @transaction.atomic
     def create(self, validated_data):
         # 提取tag_ids，然后从validated_data中移除
         tag_ids = validated_data.pop('tag_ids', [])
         category_name = validated_data.pop('category')
 
-        category_id = Category.objects.get(category=category_name)
+        category_id = get_taxonomy().category_ids[category_name]
 
         article = Article.objects.create(
             author=self.context['request'].user,
-            category=category_id,
+            category_id=category_id,
             **validated_data
         )
 
         # 设置tags关联关系
-        if tag_ids:
-            article.tags.set(tag_ids)
+        self.resolved_tag_names = apply_article_tags(article, tag_ids, created=True)
 
         return article
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         # 提取tag_ids，然后从validated_data中移除
         tag_ids = validated_data.pop('tag_ids', None)
 
         if 'category' in validated_data:
             category_name = validated_data.pop('category')
-            category_id = Category.objects.get(category=category_name)
-            validated_data['category'] = category_id
+            validated_data['category_id'] = get_taxonomy().category_ids[category_name]
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
@@ -139,22 +172,36 @@ class ArticleSerializer(serializers.ModelSerializer):
         instance.save()
 
         if tag_ids is not None:
-            instance.tags.set(tag_ids)
+            self.resolved_tag_names = apply_article_tags(instance, tag_ids)
         return instance
 
 class CommentSerializer(serializers.ModelSerializer):
     content = serializers.CharField(min_length=5, max_length=300)
+    parent_id = serializers.IntegerField(required=False, allow_null=True, write_only=True)
 
     class Meta:
         model = Comment
-        fields = ['content']
+        fields = ['content', 'parent_id']
+
+    def validate_parent_id(self, value):
+        if value is None:
+            return None
+        parent = Comment.objects.filter(id=value, article_id=self.context.get('article_id')).first()
+        if parent is None:
+            raise serializers.ValidationError("回复的评论不存在")
+        if parent.depth >= MAX_DEPTH:
+            raise serializers.ValidationError("回复层级过深")
+        self.parent_comment = parent
+        return value
 
     def create(self, validated_data):
         article_id = self.context.get('article_id')
+        # path、depth 和父评论的回复数由 post_save 信号维护
         comment_obj = Comment.objects.create(
             author=self.context['request'].user,
             content=validated_data['content'],
-            article_id=article_id
+            article_id=article_id,
+            parent=getattr(self, 'parent_comment', None),
         )
 
         return comment_obj
@@ -0,0 +1,210 @@
+"""
+模型信号处理
+"""
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from .analytics import record as record_analytics
+from .article_cache import invalidate_article
+from .comment_tree import comments_modified_key, encode_segment
+from .comment_views import COMMENT_FIELDS
+from .conditional import bump_generation, touch_modified
+from .deletion import in_purge
+from .duplicates import index_article
+from .events import publish_on_commit
+from .fieldsets import render
+from .models import EXCERPT_LENGTH, Article, ArticleSearchText, ArticleStats, ArticleTagIndex, Category, Tag, CategoryTag, Comment, Like, Dislike, UserProfile, Follow
+from .suggest import publish as publish_suggestion
+from .syndication import remove_urls, update_url
+from .tagging import sync_tag_index
+from .timeline import enqueue_fanout
+from .taxonomy import bump_taxonomy_version
+
+
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Tag)
+@receiver([post_save, post_delete], sender=CategoryTag)
+def taxonomy_changed(sender, **kwargs):
+    # 立即更新版本号使本进程马上可见；事务提交后再更新一次，
+    # 避免其他进程在提交前重建出旧数据的快照
+    bump_taxonomy_version()
+    transaction.on_commit(bump_taxonomy_version)
+
+
+@receiver(m2m_changed, sender=Article.tags.through)
+def article_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # 通过 article.tags / tag.articles 直接修改关联时同步倒排索引
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        sync_tag_index(instance.pk)
+        invalidate_article(instance.pk)
+    elif action == 'post_clear':
+        ArticleTagIndex.objects.filter(tag_id=instance.pk).delete()
+    else:
+        for article_id in pk_set:
+            sync_tag_index(article_id)
+        invalidate_article(*pk_set)
+    # 列表中包含文章的标签
+    bump_generation()
+    transaction.on_commit(bump_generation)
+
+
+
+@receiver([post_save, post_delete], sender=Article)
+@receiver(post_save, sender=UserProfile)
+def feed_changed(sender, **kwargs):
+    # 文章列表缓存的内容变化（文章、头像），使列表缓存和ETag失效；
+    # 点赞数、评论数等计数每次请求单独读取，不更新代数
+    bump_generation()
+    transaction.on_commit(bump_generation)
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def comments_changed(sender, instance, **kwargs):
+    if in_purge():
+        return
+    # 评论的 Last-Modified 使用记录的修改时间，删除评论时也会前进
+    key = comments_modified_key(instance.article_id)
+    touch_modified(key)
+    transaction.on_commit(lambda: touch_modified(key))
+
+
+
+@receiver(post_save, sender=Comment)
+def assign_comment_path(sender, instance, created, **kwargs):
+    # 新评论的物化路径依赖自身id，插入后补写，并增加父评论的回复数
+    if not created or instance.path:
+        return
+    parent = instance.parent
+    instance.path = (parent.path if parent else '') + encode_segment(instance.pk)
+    instance.depth = parent.depth + 1 if parent else 0
+    Comment.objects.filter(pk=instance.pk).update(path=instance.path, depth=instance.depth)
+    if parent:
+        Comment.objects.filter(pk=parent.pk).update(reply_count=F('reply_count') + 1)
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_reply_count(sender, instance, **kwargs):
+    if instance.parent_id and not in_purge():
+        Comment.objects.filter(pk=instance.parent_id).update(reply_count=F('reply_count') - 1)
+
+
+@receiver(post_save, sender=Comment)
+def push_comment(sender, instance, created, **kwargs):
+    # 推送给正在阅读该文章的客户端，格式与评论接口一致
+    if created:
+        publish_on_commit(instance.article_id, 'comment', render(instance, COMMENT_FIELDS, COMMENT_FIELDS))
+
+
+@receiver(post_delete, sender=Comment)
+def push_comment_deleted(sender, instance, **kwargs):
+    if in_purge():
+        return
+    publish_on_commit(instance.article_id, 'comment_deleted', {'id': instance.pk})
+
+
+@receiver([post_save, post_delete], sender=Like)
+@receiver(post_save, sender=Comment)
+def record_engagement(sender, instance, signal, created=False, **kwargs):
+    # 按天统计当天新增的点赞（取消点赞时扣减）和评论；清理时删除的点赞不扣减
+    if signal is post_delete:
+        if not in_purge():
+            record_analytics(instance.article_id, 'likes', -1)
+    elif created:
+        record_analytics(instance.article_id, 'likes' if sender is Like else 'comments')
+
+
+@receiver(pre_save, sender=Article)
+def update_excerpt(sender, instance, **kwargs):
+    # 正文压缩存储后无法在数据库中截取，保存时同步列表摘要
+    instance.excerpt = instance.content[:EXCERPT_LENGTH]
+
+
+@receiver(post_save, sender=Article)
+def create_article_stats(sender, instance, created, **kwargs):
+    if created:
+        ArticleStats.objects.create(article=instance)
+
+
+@receiver(post_save, sender=Article)
+def update_search_text(sender, instance, created, update_fields=None, **kwargs):
+    # 搜索用的正文明文存放在单独的表中，只在正文变化时写入
+    if created:
+        ArticleSearchText.objects.create(article=instance, text=instance.content)
+    elif update_fields is None or 'content' in update_fields:
+        ArticleSearchText.objects.update_or_create(article=instance, defaults={'text': instance.content})
+
+
+@receiver(post_save, sender=Article)
+def push_to_timelines(sender, instance, created, **kwargs):
+    # 提交后再记入待推送集合，由定时任务推送，发布请求不等待写入粉丝时间线
+    if created:
+        article_id = instance.pk
+        transaction.on_commit(lambda: enqueue_fanout(article_id))
+
+
+@receiver([post_save, post_delete], sender=Follow)
+def update_follower_count(sender, instance, signal, created=False, **kwargs):
+    if signal is post_delete:
+        UserProfile.objects.filter(user_id=instance.followee_id).update(follower_count=F('follower_count') - 1)
+    elif created:
+        UserProfile.objects.filter(user_id=instance.followee_id).update(follower_count=F('follower_count') + 1)
+
+
+@receiver(post_save, sender=Article)
+def update_article_signature(sender, instance, **kwargs):
+    # 校验时已计算过的签名会命中 compute_signature 的缓存
+    index_article(instance.pk, instance.content)
+
+
+
+@receiver([post_save, post_delete], sender=Article)
+def article_changed(sender, instance, **kwargs):
+    invalidate_article(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Article)
+def sitemap_changed(sender, instance, signal, **kwargs):
+    # 提交后再修改站点地图分段，与 soft_delete_articles 一样只改文章所在的段
+    # 删除后 instance.pk 会被置空，先取出
+    article_id = instance.pk
+    if signal is post_delete or instance.deleted_at is not None:
+        transaction.on_commit(lambda: remove_urls([article_id]))
+    else:
+        transaction.on_commit(lambda: update_url(article_id, instance.updated_time))
+
+
+@receiver(post_save, sender=UserProfile)
+def profile_changed(sender, instance, **kwargs):
+    # 头像包含在文章详情缓存中
+    article_ids = list(Article.objects.filter(author_id=instance.user_id).values_list('id', flat=True))
+    if article_ids:
+        invalidate_article(*article_ids)
+
+
+# 输入提示的类型和对应的文本字段
+SUGGESTION_FIELDS = {
+    Article: ('title', 'title'),
+    Tag: ('tag', 'tag'),
+    User: ('author', 'username'),
+}
+
+
+@receiver([post_save, post_delete], sender=Article)
+@receiver([post_save, post_delete], sender=Tag)
+@receiver([post_save, post_delete], sender=User)
+def suggestion_changed(sender, instance, signal, update_fields=None, **kwargs):
+    # 标题、标签名或用户名变化时写入输入提示的变更日志，各进程增量更新
+    kind, field = SUGGESTION_FIELDS[sender]
+    if signal is post_delete:
+        if in_purge():
+            # 软删除时已经移除
+            return
+        publish_suggestion(kind, instance.pk)
+    elif update_fields is None or field in update_fields:
+        # 登录时只更新 last_login，不需要记录
+        publish_suggestion(kind, instance.pk, getattr(instance, field))
@@ -0,0 +1,202 @@
+"""
+输入提示
+文章标题、标签名和作者用户名的前缀匹配，数据放在每个进程内存中的有序数组里，用二分查找定位前缀。
+模型变化在事务提交后写入共享缓存中的变更日志（递增序号 + 事件），各进程在请求时按序号增量应用。
+日志过期缺失时在后台线程重新全量加载，加载完成前继续使用旧索引；各进程通过缓存锁错开加载，避免同时扫描全表
+"""
+import bisect
+import logging
+import threading
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Article, Tag
+
+logger = logging.getLogger(__name__)
+
+SEQUENCE_KEY = 'suggest:sequence'
+REBUILD_LOCK_KEY = 'suggest:rebuild:lock'
+REBUILD_LOCK_TIMEOUT = 60
+EVENT_TIMEOUT = 60 * 60
+MAX_PENDING_EVENTS = 1000  # 落后太多时直接重建
+MAX_ENTRIES = {'title': 50000, 'tag': 10000, 'author': 50000}
+MAX_KEY_LENGTH = 30
+
+_index = None
+_lock = threading.Lock()
+_rebuilding = False
+
+
+def event_key(sequence):
+    return f'suggest:event:{sequence}'
+
+
+def normalize(text):
+    return text.strip().casefold()[:MAX_KEY_LENGTH]
+
+
+def title_keys(title):
+    """标题整体和其中每个单词开头的后缀都可作为前缀匹配"""
+    words = title.split()
+    return {normalize(' '.join(words[i:])) for i in range(len(words))} or {normalize(title)}
+
+
+class PrefixIndex:
+    """按 (键, id) 排序的数组，支持前缀查找和按id增删"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.items = []  # [(键, id)]
+        self.keys_of = {}  # id -> (展示文本, 键元组)，插入顺序即新旧顺序
+
+    def add(self, item_id, text, keys):
+        self.remove(item_id)
+        keys = tuple(keys)
+        self.keys_of[item_id] = (text, keys)
+        for key in keys:
+            bisect.insort(self.items, (key, item_id))
+        if len(self.keys_of) > self.max_entries:
+            # 超出上限时淘汰最早加入的条目
+            self.remove(next(iter(self.keys_of)))
+
+    def load(self, entries):
+        """全量加载 [(id, 展示文本, 键)]（按新旧顺序），最后排序一次"""
+        for item_id, text, keys in entries:
+            keys = tuple(keys)
+            self.keys_of[item_id] = (text, keys)
+            self.items.extend((key, item_id) for key in keys)
+        self.items.sort()
+
+    def remove(self, item_id):
+        entry = self.keys_of.pop(item_id, None)
+        if entry is None:
+            return
+        for key in entry[1]:
+            i = bisect.bisect_left(self.items, (key, item_id))
+            if i < len(self.items) and self.items[i] == (key, item_id):
+                del self.items[i]
+
+    def search(self, prefix, limit):
+        results, seen = [], set()
+        i = bisect.bisect_left(self.items, (prefix,))
+        while i < len(self.items) and len(results) < limit:
+            key, item_id = self.items[i]
+            if not key.startswith(prefix):
+                break
+            if item_id not in seen:
+                seen.add(item_id)
+                results.append((item_id, self.keys_of[item_id][0]))
+            i += 1
+        return results
+
+
+class SuggestionIndex:
+    def __init__(self, sequence):
+        self.sequence = sequence
+        self.indexes = {kind: PrefixIndex(size) for kind, size in MAX_ENTRIES.items()}
+
+    def apply(self, kind, item_id, text):
+        if text is None:
+            self.indexes[kind].remove(item_id)
+        else:
+            self.indexes[kind].add(item_id, text, keys_of(kind, text))
+
+
+def keys_of(kind, text):
+    return title_keys(text) if kind == 'title' else [normalize(text)]
+
+
+def _build(sequence):
+    index = SuggestionIndex(sequence)
+    # 按id升序加入，超出上限时保留最新的条目
+    titles = Article.objects.order_by('-id').values_list('id', 'title')[:MAX_ENTRIES['title']]
+    tags = Tag.objects.order_by('id').values_list('id', 'tag')[:MAX_ENTRIES['tag']]
+    # 已注销的账号在清理前仍在表中
+    users = User.objects.exclude(backend_profile__deleted_at__isnull=False)
+    users = users.order_by('-id').values_list('id', 'username')[:MAX_ENTRIES['author']]
+    for kind, rows in (('title', reversed(list(titles))), ('tag', tags), ('author', reversed(list(users)))):
+        index.indexes[kind].load((item_id, text, keys_of(kind, text)) for item_id, text in rows)
+    return index
+
+
+def get_index():
+    """返回与变更日志同步后的本进程索引"""
+    global _index
+    sequence = cache.get(SEQUENCE_KEY) or 0
+    index = _index
+    if index is not None and index.sequence == sequence:
+        return index
+
+    with _lock:
+        if _index is not None and _index.sequence < sequence <= _index.sequence + MAX_PENDING_EVENTS:
+            keys = [event_key(n) for n in range(_index.sequence + 1, sequence + 1)]
+            events = cache.get_many(keys)
+            if len(events) == len(keys):
+                for key in keys:
+                    _index.apply(*events[key])
+                _index.sequence = sequence
+                return _index
+        if _index is None:
+            # 首次加载时没有可用的旧索引，只能在请求中加载
+            _index = _build(sequence)
+        elif _index.sequence != sequence:
+            # 缓存被清空或日志已过期，后台重新加载，期间使用旧索引
+            _start_rebuild(sequence)
+        return _index
+
+
+def _start_rebuild(sequence):
+    # 在 _lock 内调用；本进程已在加载或其他进程持有锁时跳过，之后的请求再尝试
+    global _rebuilding
+    if _rebuilding or not cache.add(REBUILD_LOCK_KEY, 1, REBUILD_LOCK_TIMEOUT):
+        return
+    _rebuilding = True
+    threading.Thread(target=_rebuild, args=(sequence,), name='suggest-rebuild', daemon=True).start()
+
+
+def _rebuild(sequence):
+    global _index, _rebuilding
+    try:
+        index = _build(sequence)
+        # 加载期间产生的变更由之后的请求按日志增量应用
+        with _lock:
+            _index = index
+    except Exception:
+        logger.warning('输入提示索引重新加载失败，继续使用旧索引', exc_info=True)
+    finally:
+        _rebuilding = False
+        cache.delete(REBUILD_LOCK_KEY)
+
+
+def publish(kind, item_id, text=None):
+    """事务提交后记录一条变更，text 为 None 表示删除；回滚的修改不会进入索引"""
+    transaction.on_commit(lambda: _publish(kind, item_id, text))
+
+
+def _publish(kind, item_id, text):
+    cache.add(SEQUENCE_KEY, 0, None)
+    try:
+        sequence = cache.incr(SEQUENCE_KEY)
+    except ValueError:
+        # 缓存不可用时无法写入变更日志，只更新本进程的索引，不影响保存数据
+        with _lock:
+            if _index is not None:
+                _index.apply(kind, item_id, text)
+        return
+    cache.set(event_key(sequence), (kind, item_id, text), EVENT_TIMEOUT)
+
+
+def suggest(query, limit=5):
+    """按前缀返回 {'titles': [(id, 标题)], 'tags': [...], 'authors': [...]}"""
+    prefix = normalize(query)
+    if not prefix:
+        return {'titles': [], 'tags': [], 'authors': []}
+    index = get_index()
+    with _lock:
+        return {
+            'titles': index.indexes['title'].search(prefix, limit),
+            'tags': index.indexes['tag'].search(prefix, limit),
+            'authors': index.indexes['author'].search(prefix, limit),
+        }
@@ -0,0 +1,22 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import AllowAny
+
+from .suggest import suggest
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def suggestions(request):
+    """
+    搜索输入提示，按前缀匹配文章标题、标签和作者
+    """
+    limit = min(int(request.query_params.get('limit', 5)), 10)
+    result = suggest(request.query_params.get('q', ''), limit)
+
+    return Response({
+        'titles': [{'id': pk, 'title': title} for pk, title in result['titles']],
+        'tags': [{'id': pk, 'tag': tag} for pk, tag in result['tags']],
+        'authors': [{'id': pk, 'username': username} for pk, username in result['authors']],
+    }, status=status.HTTP_200_OK)
@@ -0,0 +1,266 @@
+"""
+订阅源与站点地图
+RSS/Atom 和站点地图都由生成器边查询边输出，查询用 iterator(chunk_size=...) 分块读取，不一次加载全部文章。
+站点地图按文章id区间分段，每段最多 SITEMAP_SEGMENT_SIZE 个地址，段内容 {文章id: 最后修改日期} 和
+索引 {段号: 最后修改日期} 缓存在共享缓存中；文章发布、编辑或删除时只修改所在的段和索引，不重建整个站点地图。
+重建与修改同时发生时，重建开始后修改过站点地图的结果不写入缓存，避免旧数据覆盖修改；
+索引未缓存时通过缓存锁只由一个请求扫描全表，其余请求等待结果
+"""
+import time
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.feedgenerator import rfc2822_date, rfc3339_date
+
+from .models import Article
+
+CHUNK_SIZE = 2000  # 每次从数据库读取的行数
+WRITE_BUFFER = 100  # 每次输出的条目数
+VERSION_KEY = 'sitemap:version'
+INDEX_KEY = 'sitemap:index'
+PATCH_LOCK_TIMEOUT = 5
+BUILD_LOCK_TIMEOUT = 60
+POLL_INTERVAL = 0.05
+
+FEED_FIELDS = ('id', 'title', 'excerpt', 'pub_time', 'updated_time', 'author__username', 'category__category')
+
+
+def segment_key(segment):
+    return f'sitemap:segment:{segment}'
+
+
+def lastmod_of(moment):
+    """站点地图的最后修改日期，文章的更新时间和删除时的当前时间统一在这里转换"""
+    return moment.date().isoformat()
+
+
+def segment_of(article_id):
+    return (article_id - 1) // settings.SITEMAP_SEGMENT_SIZE
+
+
+def article_url(article_id):
+    return f'{settings.SITE_URL}/posts/{article_id}'
+
+
+def buffered(parts, size=WRITE_BUFFER):
+    """合并若干小片段后再输出，减少写入次数"""
+    buffer = []
+    for part in parts:
+        buffer.append(part)
+        if len(buffer) >= size:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+
+# ---------- 订阅源 ----------
+
+def latest_articles():
+    return Article.objects.order_by('-pub_time', '-id').values_list(*FEED_FIELDS)[:settings.FEED_ITEMS].iterator(
+        chunk_size=CHUNK_SIZE,
+    )
+
+
+def rss_items():
+    rows = latest_articles()
+    first = next(rows, None)
+    yield '<?xml version="1.0" encoding="utf-8"?>\n<rss version="2.0"><channel>'
+    yield f'<title>{escape(settings.SITE_NAME)}</title><link>{escape(settings.SITE_URL)}/</link>'
+    yield f'<description>{escape(settings.SITE_NAME)}的最新文章</description>'
+    if first is not None:
+        yield f'<lastBuildDate>{rfc2822_date(first[3])}</lastBuildDate>'
+        yield _rss_item(*first)
+    for row in rows:
+        yield _rss_item(*row)
+    yield '</channel></rss>\n'
+
+
+def _rss_item(article_id, title, excerpt, pub_time, updated_time, author, category):
+    url = escape(article_url(article_id))
+    return (
+        f'<item><title>{escape(title)}</title><link>{url}</link><guid isPermaLink="true">{url}</guid>'
+        f'<description>{escape(excerpt)}</description><pubDate>{rfc2822_date(pub_time)}</pubDate>'
+        f'<author>{escape(author)}</author><category>{escape(category)}</category></item>'
+    )
+
+
+def atom_entries():
+    rows = latest_articles()
+    first = next(rows, None)
+    yield '<?xml version="1.0" encoding="utf-8"?>\n<feed xmlns="http://www.w3.org/2005/Atom">'
+    yield f'<title>{escape(settings.SITE_NAME)}</title><id>{escape(settings.SITE_URL)}/</id>'
+    yield f'<link href="{escape(settings.SITE_URL)}/" rel="alternate"/>'
+    if first is not None:
+        yield f'<updated>{rfc3339_date(first[3])}</updated>'
+        yield _atom_entry(*first)
+    for row in rows:
+        yield _atom_entry(*row)
+    yield '</feed>\n'
+
+
+def _atom_entry(article_id, title, excerpt, pub_time, updated_time, author, category):
+    url = escape(article_url(article_id))
+    return (
+        f'<entry><title>{escape(title)}</title><link href="{url}" rel="alternate"/><id>{url}</id>'
+        f'<published>{rfc3339_date(pub_time)}</published><updated>{rfc3339_date(updated_time)}</updated>'
+        f'<author><name>{escape(author)}</name></author><category term="{escape(category)}"/>'
+        f'<summary>{escape(excerpt)}</summary></entry>'
+    )
+
+
+# ---------- 站点地图 ----------
+
+def get_version():
+    return cache.get(VERSION_KEY, 0)
+
+
+def _store_if_unchanged(key, value, version):
+    # 重建期间有修改时放弃写入，下次请求重新构建
+    if get_version() == version:
+        cache.set(key, value, settings.SITEMAP_CACHE_TIMEOUT)
+
+
+def get_index():
+    """返回 {段号: 最后修改日期}，缓存未命中时扫描全部文章的id和更新时间"""
+    index = cache.get(INDEX_KEY)
+    if index is None:
+        index = _build_once(INDEX_KEY, _build_index)
+    return index
+
+
+def _build_index():
+    version = get_version()
+    index = {}
+    rows = Article.objects.order_by().values_list('id', 'updated_time').iterator(chunk_size=CHUNK_SIZE)
+    for article_id, updated_time in rows:
+        segment, lastmod = segment_of(article_id), lastmod_of(updated_time)
+        if lastmod > index.get(segment, ''):
+            index[segment] = lastmod
+    _store_if_unchanged(INDEX_KEY, index, version)
+    return index
+
+
+def _build_once(key, build):
+    """
+    与 _patch 一样用 cache.add 加锁，同一时间只有一个请求执行 build；
+    其余请求轮询缓存等待结果，等待超时（持锁方异常退出或结果因修改未写入）后自行执行
+    """
+    lock = f'{key}:build'
+    if cache.add(lock, 1, BUILD_LOCK_TIMEOUT):
+        try:
+            return build()
+        finally:
+            cache.delete(lock)
+    deadline = time.monotonic() + settings.COALESCE_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        value = cache.get(key)
+        if value is not None:
+            return value
+    return build()
+
+
+def segment_entries(segment):
+    """
+    逐个返回段内的 (文章id, 最后修改日期)；缓存未命中时边查询边返回，读完后写入缓存
+    """
+    entries = cache.get(segment_key(segment))
+    if entries is not None:
+        yield from sorted(entries.items())
+        return
+
+    version = get_version()
+    size = settings.SITEMAP_SEGMENT_SIZE
+    entries = {}
+    rows = Article.objects.filter(id__gt=segment * size, id__lte=(segment + 1) * size).order_by('id').values_list(
+        'id', 'updated_time',
+    ).iterator(chunk_size=CHUNK_SIZE)
+    for article_id, updated_time in rows:
+        entries[article_id] = lastmod_of(updated_time)
+        yield article_id, entries[article_id]
+    _store_if_unchanged(segment_key(segment), entries, version)
+
+
+def sitemap_index(segment_url):
+    yield '<?xml version="1.0" encoding="utf-8"?>\n'
+    yield '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+    for segment, lastmod in sorted(get_index().items()):
+        yield f'<sitemap><loc>{escape(segment_url(segment))}</loc><lastmod>{lastmod}</lastmod></sitemap>'
+    yield '</sitemapindex>\n'
+
+
+def sitemap_urls(segment):
+    yield '<?xml version="1.0" encoding="utf-8"?>\n'
+    yield '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+    for article_id, lastmod in segment_entries(segment):
+        yield f'<url><loc>{escape(article_url(article_id))}</loc><lastmod>{lastmod}</lastmod></url>'
+    yield '</urlset>\n'
+
+
+def _patch(key, change):
+    """
+    修改缓存中的段或索引（未缓存时不处理，下次请求时重建）；
+    其他进程正在修改同一个键时直接删除，由下次请求重建
+    """
+    lock = f'{key}:lock'
+    if not cache.add(lock, 1, PATCH_LOCK_TIMEOUT):
+        cache.delete(key)
+        return
+    try:
+        value = cache.get(key)
+        if value is not None:
+            # 缓存中的对象可能被进程内缓存共享，复制后再修改
+            value = dict(value)
+            change(value)
+            cache.set(key, value, settings.SITEMAP_CACHE_TIMEOUT)
+    finally:
+        cache.delete(lock)
+
+
+def _bump_version():
+    cache.add(VERSION_KEY, 0, None)
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        pass
+
+
+def update_url(article_id, updated_time):
+    """文章发布或编辑后更新所在的段和索引"""
+    _bump_version()
+    segment, lastmod = segment_of(article_id), lastmod_of(updated_time)
+
+    def update_segment(entries):
+        entries[article_id] = lastmod
+
+    def update_index(index):
+        index[segment] = max(index.get(segment, ''), lastmod)
+
+    _patch(segment_key(segment), update_segment)
+    _patch(INDEX_KEY, update_index)
+
+
+def remove_urls(article_ids):
+    """文章删除后从所在的段中移除，段的最后修改日期记为今天"""
+    _bump_version()
+    today = lastmod_of(timezone.now())
+    segments = {}
+    for article_id in article_ids:
+        segments.setdefault(segment_of(article_id), []).append(article_id)
+
+    for segment, ids in segments.items():
+        def remove_entries(entries):
+            for article_id in ids:
+                entries.pop(article_id, None)
+
+        _patch(segment_key(segment), remove_entries)
+
+    def update_index(index):
+        for segment in segments:
+            if segment in index:
+                index[segment] = today
+
+    _patch(INDEX_KEY, update_index)
@@ -0,0 +1,50 @@
+from django.http import JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.http import require_GET
+
+from .conditional import make_etag, get_generation, not_modified, set_validators
+from .syndication import atom_entries, buffered, get_index, get_version, rss_items, sitemap_index, sitemap_urls
+
+RSS_CONTENT_TYPE = 'application/rss+xml; charset=utf-8'
+ATOM_CONTENT_TYPE = 'application/atom+xml; charset=utf-8'
+SITEMAP_CONTENT_TYPE = 'application/xml; charset=utf-8'
+
+
+def streaming_xml(request, parts, content_type, etag):
+    """未变化时返回304，否则边生成边发送"""
+    response = not_modified(request, etag)
+    if response is not None:
+        return response
+    return set_validators(StreamingHttpResponse(buffered(parts), content_type=content_type), etag)
+
+
+@require_GET
+def rss_feed(request):
+    """最新文章的 RSS 2.0 订阅源"""
+    return streaming_xml(request, rss_items(), RSS_CONTENT_TYPE, make_etag('rss', get_generation()))
+
+
+@require_GET
+def atom_feed(request):
+    """最新文章的 Atom 订阅源"""
+    return streaming_xml(request, atom_entries(), ATOM_CONTENT_TYPE, make_etag('atom', get_generation()))
+
+
+@require_GET
+def sitemap(request):
+    """站点地图索引，列出各分段及其最后修改日期"""
+    def segment_url(segment):
+        return request.build_absolute_uri(reverse('sitemap-segment', args=[segment]))
+
+    etag = make_etag('sitemap', get_version(), sorted(get_index().items()))
+    return streaming_xml(request, sitemap_index(segment_url), SITEMAP_CONTENT_TYPE, etag)
+
+
+@require_GET
+def sitemap_segment(request, segment):
+    """站点地图分段，每段最多 SITEMAP_SEGMENT_SIZE 篇文章"""
+    index = get_index()
+    if segment not in index:
+        return JsonResponse({'error': '站点地图分段不存在'}, status=404)
+    etag = make_etag('sitemap', get_version(), segment, index[segment])
+    return streaming_xml(request, sitemap_urls(segment), SITEMAP_CONTENT_TYPE, etag)
@@ -0,0 +1,87 @@
+"""
+文章标签写入与按标签查询
+标签校验基于内存中的分类/标签快照完成，关联关系按差异批量增删，
+同时维护 ArticleTagIndex 倒排索引供按标签分页使用
+"""
+from django.db.models import Count, Max
+
+from .models import Article, ArticleTagIndex
+from .taxonomy import get_taxonomy
+
+ArticleTag = Article.tags.through
+
+
+def resolve_tags(category_id, tag_ids=None, tag_names=None):
+    """
+    将标签id和标签名解析为该分类允许的标签id列表（保持顺序并去重）
+    返回 (标签id列表, 无效标签列表)
+    """
+    taxonomy = get_taxonomy()
+    allowed = set(taxonomy.category_tags.get(category_id, ()))
+
+    resolved = []
+    invalid = []
+    candidates = [(tag_id, tag_id) for tag_id in tag_ids or []]
+    candidates += [(taxonomy.tag_ids.get(name), name) for name in tag_names or []]
+    for tag_id, raw in candidates:
+        if tag_id not in allowed:
+            invalid.append(str(raw))
+        elif tag_id not in resolved:
+            resolved.append(tag_id)
+
+    return resolved, invalid
+
+
+def apply_article_tags(article, tag_ids, created=False):
+    """
+    按差异更新文章标签：一次查询现有关联，一次批量删除，一次批量插入
+    返回标签名列表
+    """
+    wanted = set(tag_ids)
+    current = set() if created else set(
+        ArticleTag.objects.filter(article_id=article.id).values_list('tag_id', flat=True)
+    )
+
+    to_remove = current - wanted
+    to_add = wanted - current
+    if to_remove:
+        ArticleTag.objects.filter(article_id=article.id, tag_id__in=to_remove).delete()
+        ArticleTagIndex.objects.filter(article_id=article.id, tag_id__in=to_remove).delete()
+    if to_add:
+        ArticleTag.objects.bulk_create([ArticleTag(article_id=article.id, tag_id=tag_id) for tag_id in to_add])
+        ArticleTagIndex.objects.bulk_create([
+            ArticleTagIndex(article_id=article.id, tag_id=tag_id, pub_time=article.pub_time) for tag_id in to_add
+        ])
+
+    tag_names = get_taxonomy().tag_names
+    return [tag_names[tag_id] for tag_id in tag_ids]
+
+
+def sync_tag_index(article_id):
+    """
+    按文章当前标签重建倒排索引，用于绕过 apply_article_tags 的写入（如后台直接修改）
+    """
+    ArticleTagIndex.objects.filter(article_id=article_id).delete()
+    article = Article.objects.only('pub_time').get(id=article_id)
+    tag_ids = ArticleTag.objects.filter(article_id=article_id).values_list('tag_id', flat=True)
+    ArticleTagIndex.objects.bulk_create([
+        ArticleTagIndex(article_id=article_id, tag_id=tag_id, pub_time=article.pub_time) for tag_id in tag_ids
+    ])
+
+
+def tagged_article_ids(tag_ids, match_all=False):
+    """
+    按标签查询文章id，按发布时间倒序
+    match_all 为 True 时要求文章包含全部标签（AND），否则包含任一标签即可（OR）。
+    单个标签和 OR 直接按 (tag, -pub_time, -article) 索引顺序读取，只有多个标签的 AND 需要分组计数
+    """
+    tag_ids = set(tag_ids)
+    postings = ArticleTagIndex.objects.filter(tag_id__in=tag_ids)
+    if match_all and len(tag_ids) > 1:
+        return postings.values('article_id').annotate(
+            matched=Count('tag_id'),
+            latest=Max('pub_time'),
+        ).filter(matched=len(tag_ids)).order_by('-latest', '-article_id').values_list('article_id', flat=True)
+    postings = postings.order_by('-pub_time', '-article_id').values_list('article_id', flat=True)
+    # 同一篇文章在各个标签下的发布时间相同，多个标签时按 (文章, 发布时间) 去重即可
+    return postings.distinct() if len(tag_ids) > 1 else postings
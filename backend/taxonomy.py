@@ -0,0 +1,87 @@
+"""
+分类/标签快照
+分类、标签及其关联数据量很小且极少变化，每个进程在内存中保存一份不可变快照，
+通过共享缓存中的版本号判断是否需要重建
+"""
+import threading
+import uuid
+from dataclasses import dataclass
+from types import MappingProxyType
+
+from django.core.cache import cache
+
+from .models import Category, Tag, CategoryTag
+
+TAXONOMY_VERSION_KEY = 'taxonomy:version'
+
+_snapshot = None
+_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class TaxonomySnapshot:
+    version: str
+    category_names: MappingProxyType  # 分类id -> 分类名
+    category_ids: MappingProxyType  # 分类名 -> 分类id
+    tag_names: MappingProxyType  # 标签id -> 标签名
+    tag_ids: MappingProxyType  # 标签名 -> 标签id
+    category_tags: MappingProxyType  # 分类id -> 标签id元组
+    tag_categories: MappingProxyType  # 标签id -> 分类id元组
+
+    def tags_of(self, category_id):
+        """按创建顺序返回分类下的 (标签id, 标签名) 列表"""
+        return [(tag_id, self.tag_names[tag_id]) for tag_id in self.category_tags.get(category_id, ())]
+
+    def categories_of(self, tag_id):
+        """返回标签所属的 (分类id, 分类名) 列表"""
+        return [(category_id, self.category_names[category_id]) for category_id in self.tag_categories.get(tag_id, ())]
+
+
+def _current_version():
+    version = cache.get(TAXONOMY_VERSION_KEY)
+    if version is None:
+        # 缓存被清空或首次启动时写入一个新版本，并以最终写入的值为准
+        cache.add(TAXONOMY_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(TAXONOMY_VERSION_KEY)
+    return version
+
+
+def _build(version):
+    categories = list(Category.objects.order_by('id').values_list('id', 'category'))
+    tags = list(Tag.objects.order_by('id').values_list('id', 'tag'))
+    links = list(CategoryTag.objects.order_by('id').values_list('category_id', 'tag_id'))
+
+    category_tags = {}
+    tag_categories = {}
+    for category_id, tag_id in links:
+        category_tags.setdefault(category_id, []).append(tag_id)
+        tag_categories.setdefault(tag_id, []).append(category_id)
+
+    return TaxonomySnapshot(
+        version=version,
+        category_names=MappingProxyType(dict(categories)),
+        category_ids=MappingProxyType({name: pk for pk, name in categories}),
+        tag_names=MappingProxyType(dict(tags)),
+        tag_ids=MappingProxyType({name: pk for pk, name in tags}),
+        category_tags=MappingProxyType({k: tuple(v) for k, v in category_tags.items()}),
+        tag_categories=MappingProxyType({k: tuple(v) for k, v in tag_categories.items()}),
+    )
+
+
+def get_taxonomy():
+    """获取当前进程的分类/标签快照，版本号变化时重建"""
+    global _snapshot
+    version = _current_version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+
+    with _lock:
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = _build(version)
+        return _snapshot
+
+
+def bump_taxonomy_version():
+    """分类或标签发生变化后调用，通知所有进程重建快照"""
+    cache.set(TAXONOMY_VERSION_KEY, uuid.uuid4().hex, None)
@@ -6,13 +6,14 @@ import json
 import random
 import string
 from datetime import datetime, timedelta
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.contrib.auth.models import User
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
-from .models import UserProfile, Article, Category, Comment, Like, Dislike, Captcha
+from .models import UserProfile, Article, ArticleStats, Category, Comment, Like, Dislike, Captcha
 from .serializers import UserRegistrationSerializer, ArticleSerializer
+from .counters import get_counts, flush_views
 
 
 class BaseTestCase(APITestCase):
@@ -26,6 +27,9 @@ class BaseTestCase(APITestCase):
         from django.conf import settings
         if 'testserver' not in settings.ALLOWED_HOSTS:
             settings.ALLOWED_HOSTS.append('testserver')
+        # 清空缓存，避免不同测试间复用的主键命中旧缓存
+        from django.core.cache import cache
+        cache.clear()
         # 创建测试分类
         self.category1 = Category.objects.create(
             category="技术",
@@ -439,6 +443,1370 @@ class ErrorHandlingTestCase(BaseTestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
 
+
+class TaxonomyTestCase(BaseTestCase):
+    """分类标签快照测试"""
+
+    def test_snapshot_maps(self):
+        """测试快照中的名称与id映射"""
+        from .taxonomy import get_taxonomy
+        tag = self.category1.add_tag('Python')
+        taxonomy = get_taxonomy()
+        self.assertEqual(taxonomy.category_ids['技术'], self.category1.id)
+        self.assertEqual(taxonomy.category_names[self.category2.id], '生活')
+        self.assertEqual(taxonomy.tags_of(self.category1.id), [(tag.id, 'Python')])
+        self.assertEqual(taxonomy.categories_of(tag.id), [(self.category1.id, '技术')])
+
+    def test_snapshot_refresh_on_change(self):
+        """测试分类标签变化后快照自动刷新"""
+        self.category1.add_tag('Django')
+        self.assertEqual([t.tag for t in self.category1.tags], ['Django'])
+        self.category1.remove_tag('Django')
+        self.assertEqual(self.category1.tags, [])
+
+    def test_tags_view_without_queries(self):
+        """测试快照建立后获取标签不再查询数据库"""
+        self.category1.add_tag('Vue.js')
+        self.client.get('/api/tags/技术/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/tags/技术/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['tags'][0]['tag'], 'Vue.js')
+
+
+
+class ArticleTagWriteTestCase(BaseTestCase):
+    """文章标签写入测试"""
+
+    def setUp(self):
+        super().setUp()
+        self.python = self.category1.add_tag('Python')
+        self.django = self.category1.add_tag('Django')
+        self.travel = self.category2.add_tag('旅行')
+        self.authenticate_user(self.user1)
+
+    def test_create_with_tag_ids_and_names(self):
+        """测试同时使用标签id和标签名发布文章"""
+        response = self.client.post('/api/articles/', {
+            'title': '标签测试文章',
+            'content': '标签测试内容',
+            'category': '技术',
+            'tag_ids': [self.python.id],
+            'tag_names': ['Django', 'Python'],
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['article']['tags'], ['Python', 'Django'])
+        article = Article.objects.get(title='标签测试文章')
+        self.assertEqual(set(article.tags.values_list('tag', flat=True)), {'Python', 'Django'})
+
+    def test_reject_tag_outside_category(self):
+        """测试拒绝不属于分类或不存在的标签"""
+        response = self.client.post('/api/articles/', {
+            'title': '标签测试文章',
+            'content': '标签测试内容',
+            'category': '技术',
+            'tag_ids': [self.travel.id, 99999],
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tag_ids', response.data['errors'])
+        self.assertFalse(Article.objects.filter(title='标签测试文章').exists())
+
+    def test_update_applies_diff(self):
+        """测试更新文章时只增删变化的标签"""
+        self.article1.tags.set([self.python, self.django])
+        response = self.client.put(f'/api/articles/{self.article1.id}/', {
+            'tag_names': ['Django'],
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['tags'], ['Django'])
+        self.assertEqual(list(self.article1.tags.values_list('tag', flat=True)), ['Django'])
+
+
+
+class TagFeedTestCase(BaseTestCase):
+    """按标签筛选文章测试"""
+
+    def setUp(self):
+        super().setUp()
+        self.python = self.category1.add_tag('Python')
+        self.django = self.category1.add_tag('Django')
+        self.article1.tags.set([self.python, self.django])
+        self.article2.tags.set([self.python])
+
+    def test_filter_any_tag(self):
+        """测试包含任一标签（OR）"""
+        response = self.client.get('/api/articles/', {'tags': 'Python,Django'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual([a['id'] for a in response.data['results']], [self.article2.id, self.article1.id])
+
+    def test_filter_all_tags(self):
+        """测试包含全部标签（AND）"""
+        response = self.client.get('/api/articles/', {'tags': 'Python,Django', 'tag_mode': 'and'})
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results'][0]['id'], self.article1.id)
+        self.assertEqual(response.data['total_pages'], 1)
+
+    def test_filter_tags_with_other_filters(self):
+        """测试标签与作者筛选组合"""
+        response = self.client.get('/api/articles/', {'tags': 'Python', 'author_id': self.user1.id})
+        self.assertEqual([a['id'] for a in response.data['results']], [self.article1.id])
+
+    def test_index_follows_tag_changes(self):
+        """测试修改文章标签后索引同步"""
+        self.article1.tags.remove(self.django)
+        response = self.client.get('/api/articles/', {'tags': 'Django'})
+        self.assertEqual(response.data['count'], 0)
+
+    def test_single_tag_reads_index_in_order(self):
+        """测试单个标签直接按索引顺序读取，不分组"""
+        from .tagging import tagged_article_ids
+        postings = tagged_article_ids([self.python.id])
+        self.assertNotIn('GROUP BY', str(postings.query))
+        self.assertEqual(list(postings), [self.article2.id, self.article1.id])
+        self.assertIn('GROUP BY', str(tagged_article_ids([self.python.id, self.django.id], match_all=True).query))
+
+
+
+class ConditionalRequestTestCase(BaseTestCase):
+    """条件请求（ETag）测试"""
+
+    def test_article_detail_not_modified(self):
+        """测试文章未变化时返回304，但仍然计入浏览量"""
+        url = f'/api/articles/{self.article1.id}/'
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/'))
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(get_counts(self.article1.id)['views'], 2)
+
+        self.authenticate_user(self.user2)
+        self.client.post(f'/api/articles/{self.article1.id}/likes/')
+        self.client.defaults.pop('HTTP_AUTHORIZATION')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_article_list_not_modified(self):
+        """测试文章列表未变化时返回304，新文章发布后失效"""
+        response = self.client.get('/api/articles/')
+        etag = response['ETag']
+        response = self.client.get('/api/articles/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Article.objects.create(title='新的测试文章', content='新的内容', author=self.user1, category=self.category1)
+        response = self.client.get('/api/articles/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_comments_not_modified(self):
+        """测试评论未变化时返回304"""
+        url = f'/api/articles/{self.article1.id}/comments/'
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Comment.objects.create(article=self.article1, author=self.user2, content='新的评论内容')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+
+    def test_like_only_changes_pages_with_the_article(self):
+        """测试点赞不使整个列表失效，只有包含该文章的页返回新的计数"""
+        from .counters import increment
+        first_page, second_page = '/api/articles/?page=1&page_size=1', '/api/articles/?page=2&page_size=1'
+        first_etag = self.client.get(first_page)['ETag']
+        response = self.client.get(second_page)
+        liked_id, second_etag = response.data['results'][0]['id'], response['ETag']
+
+        Like.objects.create(article_id=liked_id, user=self.user2)
+        increment(liked_id, 'like_count')
+        response = self.client.get(first_page, HTTP_IF_NONE_MATCH=first_etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(second_page, HTTP_IF_NONE_MATCH=second_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['like_count'], 1)
+
+    def test_comment_delete_advances_last_modified(self):
+        """测试删除评论后评论列表的 Last-Modified 前进"""
+        from django.core.cache import cache
+        from .comment_tree import comments_modified_key
+        url = f'/api/articles/{self.article1.id}/comments/'
+        comment = Comment.objects.create(article=self.article1, author=self.user2, content='将被删除的评论')
+        cache.set(comments_modified_key(self.article1.id), datetime(2020, 1, 1))
+        last_modified = self.client.get(url)['Last-Modified']
+
+        comment.delete()
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['Last-Modified'], last_modified)
+
+
+
+class RenderingTestCase(BaseTestCase):
+    """JSON渲染与响应压缩测试"""
+
+    def test_fast_renderer_matches_stdlib(self):
+        """测试快速渲染器输出与DRF默认渲染器一致"""
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import FastJSONRenderer
+        data = {'title': '测试\u2028文章', 'pub_time': datetime(2025, 1, 1, 8, 30, 0, 123456), 'tags': ['Python']}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_gzip_compression(self):
+        """测试大响应按Accept-Encoding压缩"""
+        import gzip
+        for i in range(20):
+            Article.objects.create(title=f'压缩测试文章{i}', content='内容' * 100, author=self.user1, category=self.category1)
+        response = self.client.get('/api/articles/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        body = json.loads(gzip.decompress(response.content))
+        self.assertEqual(body['count'], 22)
+
+    def test_small_response_not_compressed(self):
+        """测试小于阈值的响应不压缩"""
+        response = self.client.get('/api/categories/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+
+class ArticleStatsTestCase(BaseTestCase):
+    """文章计数表测试"""
+
+    def test_stats_created_with_article(self):
+        """测试发布文章时创建计数行"""
+        self.assertTrue(ArticleStats.objects.filter(article=self.article1).exists())
+
+    def test_view_does_not_touch_article_row(self):
+        """测试浏览文章不改变更新时间"""
+        updated_time = self.article1.updated_time
+        self.client.get(f'/api/articles/{self.article1.id}/')
+        self.article1.refresh_from_db()
+        self.assertEqual(self.article1.updated_time, updated_time)
+        self.assertEqual(get_counts(self.article1.id)['views'], 1)
+
+    def test_like_counts_once(self):
+        """测试重复点赞只计数一次，取消点赞后回退"""
+        self.authenticate_user(self.user2)
+        url = f'/api/articles/{self.article1.id}/likes/'
+        self.client.post(url)
+        response = self.client.post(url)
+        self.assertEqual(response.data['likes'], 1)
+        response = self.client.delete(url)
+        self.assertEqual(response.data['likes'], 0)
+
+    def test_order_by_views(self):
+        """测试按浏览量排序"""
+        ArticleStats.objects.filter(article=self.article1).update(views=10)
+        response = self.client.get('/api/articles/', {'ordering': '-views'})
+        self.assertEqual(response.data['results'][0]['id'], self.article1.id)
+        self.assertEqual(response.data['results'][0]['views'], 10)
+
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'l2': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'l2'},
+})
+class TieredCacheTestCase(TestCase):
+    """两级缓存测试"""
+
+    def setUp(self):
+        from django.core.cache import caches
+        from .cache import TieredCache
+        self.l2 = caches['l2']
+        self.l2.clear()
+        self.cache = TieredCache('l2', {'OPTIONS': {'L1_MAX_ENTRIES': 2, 'L1_TIMEOUT': 60}})
+
+    def test_l1_serves_repeated_reads(self):
+        """测试重复读取由L1命中"""
+        self.l2.set('key', 'value')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertEqual(self.cache.get('key'), 'value')
+        metrics = self.cache.metrics()
+        self.assertEqual(metrics['l1']['hits'], 1)
+        self.assertEqual(metrics['l2']['hits'], 1)
+
+    def test_write_invalidates_l1(self):
+        """测试写入和删除同步更新L1"""
+        self.cache.set('key', 1)
+        self.cache.set('key', 2)
+        self.assertEqual(self.cache.get('key'), 2)
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_l1_is_bounded(self):
+        """测试L1按LRU淘汰"""
+        for key in ('a', 'b', 'c'):
+            self.cache.set(key, key)
+        self.assertEqual(self.cache.metrics()['l1']['size'], 2)
+        self.assertEqual(self.cache.get('a'), 'a')  # 从L2读回
+
+    def test_degrade_when_l2_down(self):
+        """测试L2不可用时退化为仅使用L1"""
+        from unittest import mock
+        self.cache.set('key', 'value')
+        with mock.patch.object(self.l2, 'get', side_effect=ConnectionError), \
+                mock.patch.object(self.l2, 'set', side_effect=ConnectionError):
+            self.assertEqual(self.cache.get('key'), 'value')
+            self.assertIsNone(self.cache.get('missing'))
+            self.cache.set('other', 'local')
+            self.assertEqual(self.cache.get('other'), 'local')
+            metrics = self.cache.metrics()
+        self.assertFalse(metrics['l2']['available'])
+        self.assertGreaterEqual(metrics['l2']['errors'], 1)
+
+    def test_missing_key_incr_is_not_an_outage(self):
+        """测试 incr 不存在的键抛出 ValueError，不会把L2标记为不可用"""
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.assertTrue(self.cache.add('lock', 1))
+        self.assertFalse(self.cache.add('lock', 1))
+        metrics = self.cache.metrics()
+        self.assertTrue(metrics['l2']['available'])
+        self.assertEqual(metrics['l2']['errors'], 0)
+
+    def test_batch_operations_call_l2_once(self):
+        """测试批量读写删除对L2只发一次请求"""
+        from unittest import mock
+        cache = type(self.cache)('l2', {'OPTIONS': {'L1_MAX_ENTRIES': 10}})
+        with mock.patch.object(self.l2, 'set_many', wraps=self.l2.set_many) as set_many, \
+                mock.patch.object(self.l2, 'get_many', wraps=self.l2.get_many) as get_many, \
+                mock.patch.object(self.l2, 'delete_many', wraps=self.l2.delete_many) as delete_many:
+            cache.set_many({'a': 1, 'b': 2})
+            self.l2.set('c', 3)
+            self.assertEqual(cache.get_many(['a', 'b', 'c', 'd']), {'a': 1, 'b': 2, 'c': 3})
+            cache.delete_many(['a', 'b', 'c'])
+            self.assertEqual(cache.get_many(['a', 'b', 'c']), {})
+        self.assertEqual(set_many.call_count, 1)
+        self.assertEqual(get_many.call_count, 2)
+        self.assertEqual(delete_many.call_count, 1)
+        # 第一次批量读取中 a、b 由L1命中，只向L2请求 c、d
+        self.assertEqual(sorted(get_many.call_args_list[0].args[0]), ['c', 'd'])
+
+
+
+class ArticleDetailCacheTestCase(BaseTestCase):
+    """文章详情缓存测试"""
+
+    def test_cached_detail_without_queries(self):
+        """测试匿名用户命中缓存时不查询数据库"""
+        url = f'/api/articles/{self.article1.id}/'
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data['title'], self.article1.title)
+        self.assertEqual(response.data['views'], 2)
+
+    def test_logged_in_viewer_state_single_query(self):
+        """测试登录用户只需一次查询获取点赞状态"""
+        Like.objects.create(user=self.user2, article=self.article1)
+        self.authenticate_user(self.user2)
+        url = f'/api/articles/{self.article1.id}/'
+        self.client.get(url)
+        with self.assertNumQueries(2):  # JWT认证查询用户 + 点赞状态
+            response = self.client.get(url)
+        self.assertTrue(response.data['liked'])
+        self.assertFalse(response.data['disliked'])
+
+    def test_edit_invalidates_cache(self):
+        """测试编辑文章后详情缓存失效"""
+        url = f'/api/articles/{self.article1.id}/'
+        self.client.get(url)
+        self.article1.title = '修改后的标题'
+        self.article1.save()
+        response = self.client.get(url)
+        self.assertEqual(response.data['title'], '修改后的标题')
+
+    def test_pending_views_flushed(self):
+        """测试缓存中的浏览量写入数据库"""
+        url = f'/api/articles/{self.article1.id}/'
+        for _ in range(3):
+            self.client.get(url)
+        self.assertEqual(flush_views(self.article1.id), 3)
+        self.assertEqual(ArticleStats.objects.get(article=self.article1).views, 3)
+        self.assertEqual(get_counts(self.article1.id)['views'], 3)
+
+    def test_concurrent_flush_not_double_counted(self):
+        """测试两个调用方读到同一个待写入值时只写入一次"""
+        from unittest import mock
+        from django.core.cache import cache
+        from .counters import pending_views_key
+        key = pending_views_key(self.article1.id)
+        cache.set(key, 3, None)
+        self.assertEqual(flush_views(self.article1.id), 3)
+        # 模拟另一个调用方在扣减前读到了同样的值
+        with mock.patch.object(cache, 'get', return_value=3):
+            self.assertEqual(flush_views(self.article1.id), 0)
+        self.assertEqual(cache.get(key), 0)
+        self.assertEqual(ArticleStats.objects.get(article=self.article1).views, 3)
+
+    def test_counts_invalidated_after_commit(self):
+        """测试事务中读取并缓存的旧计数在提交后失效"""
+        from django.core.cache import cache
+        from django.db import transaction
+        from .counters import counts_key, increment
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                increment(self.article1.id, 'like_count')
+                # 模拟并发请求在提交前重新缓存了计数
+                cache.set(counts_key(self.article1.id), {'views': 0, 'like_count': 0, 'dislike_count': 0})
+        self.assertEqual(get_counts(self.article1.id)['like_count'], 1)
+
+
+
+class ViewerStateTestCase(BaseTestCase):
+    """列表中的用户点赞状态测试"""
+
+    def test_feed_viewer_state(self):
+        """测试文章列表返回当前用户的点赞/踩状态"""
+        Like.objects.create(user=self.user1, article=self.article1)
+        Dislike.objects.create(user=self.user1, article=self.article2)
+        self.authenticate_user(self.user1)
+        response = self.client.get('/api/articles/')
+        states = {a['id']: (a['liked'], a['disliked']) for a in response.data['results']}
+        self.assertEqual(states[self.article1.id], (True, False))
+        self.assertEqual(states[self.article2.id], (False, True))
+
+    def test_bulk_lookup_single_query(self):
+        """测试整页状态只需一次查询"""
+        from .viewer_state import get_viewer_states
+        Like.objects.create(user=self.user2, article=self.article1)
+        with self.assertNumQueries(1):
+            states = get_viewer_states([self.article1.id, self.article2.id], self.user2)
+        self.assertTrue(states[self.article1.id]['liked'])
+        self.assertFalse(states[self.article2.id]['liked'])
+
+    def test_anonymous_without_queries(self):
+        """测试匿名用户不查询点赞状态"""
+        from django.contrib.auth.models import AnonymousUser
+        from .viewer_state import get_viewer_states
+        with self.assertNumQueries(0):
+            states = get_viewer_states([self.article1.id], AnonymousUser())
+        self.assertEqual(states[self.article1.id], {'liked': False, 'disliked': False})
+
+    def test_profile_feed_viewer_state(self):
+        """测试用户主页文章列表返回点赞状态"""
+        Like.objects.create(user=self.user2, article=self.article1)
+        self.authenticate_user(self.user2)
+        response = self.client.get(f'/api/users/{self.user1.id}/profile/')
+        self.assertTrue(response.data['results'][0]['liked'])
+
+
+
+class SchedulerTestCase(BaseTestCase):
+    """定时任务测试"""
+
+    def setUp(self):
+        super().setUp()
+        from .scheduler import registered_jobs
+        self.jobs = registered_jobs()
+
+    def test_purge_expired_captchas(self):
+        """测试清理过期验证码"""
+        from django.utils import timezone
+        Captcha.objects.create(email='old@example.com', captcha='123456')
+        Captcha.objects.create(email='new@example.com', captcha='654321')
+        Captcha.objects.filter(email='old@example.com').update(created_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(self.jobs['purge_expired_captchas'].func(), 1)
+        self.assertEqual(list(Captcha.objects.values_list('email', flat=True)), ['new@example.com'])
+
+    def test_lock_runs_job_once_per_interval(self):
+        """测试同一周期内任务只执行一次，并记录统计"""
+        from .scheduler import run_job, get_metrics
+        job = self.jobs['purge_expired_captchas']
+        self.assertTrue(run_job(job))
+        self.assertFalse(run_job(job))
+        self.assertTrue(run_job(job, force=True))
+        metrics = get_metrics(job.name)
+        self.assertEqual(metrics['runs'], 2)
+        self.assertIsNotNone(metrics['last_duration_ms'])
+
+    def test_reconcile_counters(self):
+        """测试按点赞记录校正计数"""
+        Like.objects.create(user=self.user1, article=self.article1)
+        ArticleStats.objects.filter(article=self.article1).update(like_count=5, dislike_count=2)
+        self.assertEqual(self.jobs['reconcile_counters'].func(), 1)
+        self.assertEqual(get_counts(self.article1.id)['like_count'], 1)
+        self.assertEqual(get_counts(self.article1.id)['dislike_count'], 0)
+
+    def test_flush_pending_views(self):
+        """测试批量写入缓存中的浏览量"""
+        self.client.get(f'/api/articles/{self.article1.id}/')
+        self.client.get(f'/api/articles/{self.article2.id}/')
+        self.assertEqual(self.jobs['flush_pending_views'].func(), 2)
+        self.assertEqual(ArticleStats.objects.get(article=self.article2).views, 1)
+        # 没有新的浏览时不遍历文章
+        with self.assertNumQueries(0):
+            self.assertEqual(self.jobs['flush_pending_views'].func(), 0)
+
+
+class AsyncLoggingTestCase(TestCase):
+    """异步日志测试"""
+
+    def make_record(self, msg, *args, **extra):
+        import logging
+        record = logging.LogRecord('backend.test', logging.WARNING, __file__, 1, msg, args, None)
+        record.__dict__.update(extra)
+        return record
+
+    def test_json_formatter(self):
+        """测试日志格式化为单行JSON并包含extra字段"""
+        import json
+        from .log_handlers import JSONFormatter
+        line = JSONFormatter().format(self.make_record('文章 %s 校验失败', 1, email='a@example.com'))
+        data = json.loads(line)
+        self.assertEqual(data['message'], '文章 1 校验失败')
+        self.assertEqual(data['level'], 'WARNING')
+        self.assertEqual(data['email'], 'a@example.com')
+
+    def test_records_written_by_listener(self):
+        """测试后台线程写入日志文件"""
+        import json
+        import os
+        import tempfile
+        from .log_handlers import AsyncLogHandler
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, 'blog.log')
+            handler = AsyncLogHandler(filename, console=False)
+            handler.handle(self.make_record('第 %d 条', 1))
+            handler.close()
+            with open(filename, encoding='utf-8') as f:
+                self.assertEqual(json.loads(f.readline())['message'], '第 1 条')
+
+    def test_full_queue_drops_records(self):
+        """测试队列满时丢弃日志而不阻塞"""
+        from .log_handlers import AsyncLogHandler
+        handler = AsyncLogHandler(console=False, queue_size=1)
+        handler.enqueue(self.make_record('a'))
+        handler.enqueue(self.make_record('b'))
+        self.assertEqual(handler.dropped, 1)
+        # 队列恢复后补记一条丢弃数量
+        handler.queue.get_nowait()
+        handler.queue.maxsize = 2
+        handler.enqueue(self.make_record('c'))
+        self.assertEqual(handler.queue.qsize(), 2)
+        self.assertIn('丢弃了 1 条日志', handler.queue.queue[-1].getMessage())
+        handler.close()
+
+    def test_reopens_rotated_file(self):
+        """测试日志文件被 logrotate 移走后重新打开"""
+        import os
+        import tempfile
+        from .log_handlers import AsyncLogHandler
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, 'blog.log')
+            handler = AsyncLogHandler(filename, console=False)
+            handler.handle(self.make_record('滚动前'))
+            handler.stop()
+            os.rename(filename, filename + '.1')
+            handler.handle(self.make_record('滚动后'))
+            handler.close()
+            with open(filename, encoding='utf-8') as f:
+                self.assertIn('滚动后', f.read())
+
+
+class WarmupTestCase(BaseTestCase):
+    """启动预热测试"""
+
+    def test_warmup_stages(self):
+        """测试预热加载分类快照并返回各阶段耗时"""
+        from unittest import mock
+        from . import taxonomy
+        from .warmup import warmup, WARMUP_STAGES
+        taxonomy._snapshot = None
+        with mock.patch('backend.warmup.connections'):
+            timings = warmup(freeze=False)
+        self.assertEqual(list(timings), [name for name, _ in WARMUP_STAGES])
+        self.assertIsNotNone(taxonomy._snapshot)
+
+
+class SparseFieldsTestCase(BaseTestCase):
+    """稀疏字段集测试"""
+
+    def test_article_list_fields(self):
+        """测试文章列表只返回请求的字段，且不查询作者、资料和标签"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/articles/?fields=title,id')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.data['results'][0]), ['id', 'title'])
+        sql = ' '.join(query['sql'] for query in queries.captured_queries)
+        self.assertNotIn('auth_user', sql)
+        self.assertNotIn('backend_userprofile', sql)
+        self.assertNotIn('backend_article_tags', sql)
+        self.assertNotIn('"content"', sql)
+
+    def test_article_list_default_fields(self):
+        """测试未指定字段时返回全部字段"""
+        response = self.client.get('/api/articles/')
+        item = response.data['results'][0]
+        self.assertEqual(len(item), 15)
+        self.assertEqual(item['comments_count'], 0)
+        self.assertEqual(item['profile_pic'], '/media/default.png')
+
+    def test_invalid_fields(self):
+        """测试请求不支持的字段返回400"""
+        response = self.client.get('/api/articles/?fields=id,password')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('password', response.data['errors'])
+
+    def test_comment_and_profile_fields(self):
+        """测试评论和个人主页的稀疏字段集"""
+        Comment.objects.create(article=self.article1, author=self.user2, content='评论内容')
+        response = self.client.get(f'/api/articles/{self.article1.id}/comments/?fields=author_id,content')
+        self.assertEqual(response.data, [{'author_id': self.user2.id, 'content': '评论内容'}])
+
+        response = self.client.get(f'/api/users/{self.user1.id}/profile/?fields=id,views')
+        self.assertEqual(response.data['results'], [{'id': self.article1.id, 'views': 0}])
+
+
+class CommentThreadTestCase(BaseTestCase):
+    """楼中楼评论测试"""
+
+    def setUp(self):
+        super().setUp()
+        self.root1 = Comment.objects.create(article=self.article1, author=self.user1, content='第一条顶层评论')
+        self.root2 = Comment.objects.create(article=self.article1, author=self.user2, content='第二条顶层评论')
+        self.reply = Comment.objects.create(article=self.article1, author=self.user2, content='回复第一条', parent=self.root1)
+        self.nested = Comment.objects.create(article=self.article1, author=self.user1, content='回复回复', parent=self.reply)
+        Comment.objects.create(article=self.article1, author=self.user2, content='再回复第一条', parent=self.root1)
+
+    def test_path_and_reply_count(self):
+        """测试物化路径、层级和回复数"""
+        self.nested.refresh_from_db()
+        self.root1.refresh_from_db()
+        self.assertEqual(self.nested.depth, 2)
+        self.assertTrue(self.nested.path.startswith(self.root1.path))
+        self.assertEqual(self.root1.reply_count, 2)
+
+        self.reply.delete()
+        self.root1.refresh_from_db()
+        self.assertEqual(self.root1.reply_count, 1)
+        self.assertFalse(Comment.objects.filter(id=self.nested.id).exists())
+
+    def test_subtree(self):
+        """测试获取单个评论的整棵回复树"""
+        url = f'/api/articles/{self.article1.id}/comments/{self.root1.id}/'
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.data['id'], self.root1.id)
+        self.assertEqual([reply['content'] for reply in response.data['replies']], ['回复第一条', '再回复第一条'])
+        self.assertEqual(response.data['replies'][0]['replies'][0]['id'], self.nested.id)
+
+    def test_root_page_with_first_replies(self):
+        """测试分页获取顶层评论及其前K条回复"""
+        url = f'/api/articles/{self.article1.id}/comments/?thread=true&replies=1'
+        response = self.client.get(url)
+        self.assertEqual(response.data['count'], 2)
+        first, second = response.data['results']
+        self.assertEqual(first['reply_count'], 2)
+        self.assertEqual([reply['id'] for reply in first['replies']], [self.reply.id])
+        self.assertEqual(second['replies'], [])
+
+        response = self.client.get(f'/api/articles/{self.article1.id}/comments/?thread=true&page=2&page_size=1')
+        self.assertEqual([comment['id'] for comment in response.data['results']], [self.root2.id])
+
+    def test_post_reply(self):
+        """测试发表回复"""
+        self.authenticate_user(self.user2)
+        url = f'/api/articles/{self.article1.id}/comments/'
+        response = self.client.post(url, {'content': '这是一条新的回复', 'parent_id': self.root2.id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['comment']['depth'], 1)
+        self.root2.refresh_from_db()
+        self.assertEqual(self.root2.reply_count, 1)
+
+        response = self.client.post(url, {'content': '回复不存在的评论', 'parent_id': 999999})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CompressedContentTestCase(BaseTestCase):
+    """文章正文压缩存储测试"""
+
+    def stored_content(self, article_id):
+        from django.db import connection
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT content FROM backend_article WHERE id = %s', [article_id])
+            return bytes(cursor.fetchone()[0])
+
+    def test_large_content_compressed(self):
+        """测试超过阈值的正文压缩存储，读取时透明解码"""
+        from .fields import ZLIB, PLAIN
+        content = '这是一段很长的文章正文。' * 500
+        article = Article.objects.create(title='长文章', content=content, author=self.user1, category=self.category1)
+        stored = self.stored_content(article.id)
+        self.assertEqual(stored[:1], ZLIB)
+        self.assertLess(len(stored), len(content.encode('utf-8')))
+        self.assertEqual(Article.objects.get(id=article.id).content, content)
+        self.assertEqual(self.stored_content(self.article1.id)[:1], PLAIN)
+
+        response = self.client.get(f'/api/articles/{article.id}/')
+        self.assertEqual(response.data['content'], content)
+
+    def test_legacy_values_decoded(self):
+        """测试兼容迁移前未加标记的旧数据"""
+        from .fields import decode_content
+        self.assertEqual(decode_content('旧的文本'), '旧的文本')
+        self.assertEqual(decode_content('旧的文本'.encode('utf-8')), '旧的文本')
+
+    def test_excerpt_for_list_and_search(self):
+        """测试列表摘要和搜索使用正文开头"""
+        content = '开头关键字' + '正文内容' * 100
+        Article.objects.create(title='摘要文章', content=content, author=self.user1, category=self.category1)
+        response = self.client.get('/api/articles/?search=开头关键字&fields=title,content')
+        self.assertEqual(response.data['results'], [{'title': '摘要文章', 'content': content[:150] + '...'}])
+
+    def test_search_matches_full_compressed_body(self):
+        """测试搜索能匹配压缩存储的正文中摘要之后的内容"""
+        content = '这是一段很长的文章正文。' * 500 + '结尾关键字'
+        Article.objects.create(title='长文章', content=content, author=self.user1, category=self.category1)
+        response = self.client.get('/api/articles/?search=结尾关键字&fields=title')
+        self.assertEqual(response.data['results'], [{'title': '长文章'}])
+        # 明文存放在单独的表中，文章行只有压缩后的正文
+        self.assertNotIn('search_text', [field.name for field in Article._meta.concrete_fields])
+
+
+class RelatedArticlesTestCase(BaseTestCase):
+    """相关文章测试"""
+
+    def setUp(self):
+        super().setUp()
+        from .models import Tag
+        self.python = Tag.objects.create(tag='python')
+        self.django = Tag.objects.create(tag='django')
+        self.article1.tags.add(self.python, self.django)
+        self.similar = Article.objects.create(
+            title='Django 性能优化', content='Django 查询优化与缓存', author=self.user2, category=self.category1,
+        )
+        self.similar.tags.add(self.python, self.django)
+        self.other = Article.objects.create(
+            title='周末去爬山', content='天气很好，适合户外运动', author=self.user2, category=self.category2,
+        )
+
+    def test_rebuild_and_serve(self):
+        """测试全量计算后按得分返回相关文章，且只查询一次"""
+        from .related import rebuild
+        rebuild()
+        url = f'/api/articles/{self.article1.id}/related/'
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        ids = [item['id'] for item in response.data['results']]
+        self.assertIn(self.similar.id, ids)
+        self.assertNotIn(self.other.id, ids)
+
+    def test_incremental_refresh(self):
+        """测试新文章增量加入其他文章的相关列表"""
+        from .models import RelatedArticle
+        from .related import rebuild, refresh
+        rebuild()
+        article = Article.objects.create(
+            title='Django 缓存实践', content='Django 缓存与查询优化', author=self.user1, category=self.category1,
+        )
+        article.tags.add(self.python, self.django)
+        self.assertEqual(refresh([article.id]), 1)
+        self.assertTrue(RelatedArticle.objects.filter(article=article, related=self.similar).exists())
+        self.assertTrue(RelatedArticle.objects.filter(article=self.similar, related=article).exists())
+
+        article.delete()
+        self.assertFalse(RelatedArticle.objects.filter(related_id=article.id).exists())
+
+    def test_refresh_only_loads_changed_articles(self):
+        """测试增量更新不重新读取全部文章，没有变化时直接返回"""
+        from unittest import mock
+        from .models import RelatedArticle
+        from .related import refresh_changed
+        refresh_changed()
+        with mock.patch('backend.related.load_corpus') as load_corpus:
+            self.assertEqual(refresh_changed(), 0)
+            article = Article.objects.create(
+                title='Django 查询优化', content='Django 查询与缓存优化', author=self.user1, category=self.category1,
+            )
+            article.tags.add(self.python)
+            self.assertEqual(refresh_changed(), 1)
+            load_corpus.assert_not_called()
+        self.assertTrue(RelatedArticle.objects.filter(article=article, related=self.similar).exists())
+
+
+class SuggestionTestCase(BaseTestCase):
+    """搜索输入提示测试"""
+
+    def setUp(self):
+        super().setUp()
+        from . import suggest
+        # 索引保存在进程内，各测试从头加载
+        suggest._index = None
+
+    def test_prefix_suggestions(self):
+        """测试按前缀匹配标题、标签和作者"""
+        from .models import Tag
+        Tag.objects.create(tag='testing')
+        Article.objects.create(title='Django 入门', content='内容', author=self.user1, category=self.category1)
+        response = self.client.get('/api/suggestions/?q=TEST')
+        self.assertEqual(response.data['titles'], [])
+        self.assertEqual([item['tag'] for item in response.data['tags']], ['testing'])
+        self.assertEqual([item['username'] for item in response.data['authors']], ['testuser1', 'testuser2'])
+
+        response = self.client.get('/api/suggestions/?q=入门')
+        self.assertEqual(response.data['titles'][0]['title'], 'Django 入门')
+        response = self.client.get('/api/suggestions/?q=测试文章')
+        self.assertEqual(len(response.data['titles']), 2)
+
+    def test_incremental_update(self):
+        """测试通过变更日志增量更新，而不是重新加载"""
+        from unittest import mock
+        from .suggest import suggest, get_index
+        get_index()
+        with mock.patch('backend.suggest._build') as build:
+            with self.captureOnCommitCallbacks(execute=True):
+                article = Article.objects.create(title='新文章标题', content='内容', author=self.user1,
+                                                 category=self.category1)
+            self.assertEqual(suggest('新文章'), {'titles': [(article.id, '新文章标题')], 'tags': [], 'authors': []})
+            article.title = '改过的标题'
+            with self.captureOnCommitCallbacks(execute=True):
+                article.save()
+            self.assertEqual(suggest('新文章')['titles'], [])
+            with self.captureOnCommitCallbacks(execute=True):
+                article.delete()
+            self.assertEqual(suggest('改过')['titles'], [])
+            build.assert_not_called()
+
+    def test_rolled_back_change_not_published(self):
+        """测试事务回滚的修改不进入索引"""
+        from django.db import transaction
+        from .suggest import suggest, get_index
+        get_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Article.objects.create(title='回滚的标题', content='内容', author=self.user1, category=self.category1)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(suggest('回滚')['titles'], [])
+
+    def test_rebuild_when_log_missing(self):
+        """测试变更日志缺失时在后台重新加载，加载完成前使用旧索引"""
+        from unittest import mock
+        from django.core.cache import cache
+        from .suggest import suggest, get_index, event_key, SEQUENCE_KEY
+        get_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            article = Article.objects.create(title='日志缺失', content='内容', author=self.user1,
+                                             category=self.category1)
+        cache.delete(event_key(cache.get(SEQUENCE_KEY)))
+        with mock.patch('backend.suggest.threading.Thread') as thread:
+            self.assertEqual(suggest('日志')['titles'], [])
+            self.assertEqual(suggest('日志')['titles'], [])
+        # 只启动一次后台加载
+        self.assertEqual(thread.call_count, 1)
+        kwargs = thread.call_args.kwargs
+        kwargs['target'](*kwargs['args'])
+        self.assertEqual(suggest('日志')['titles'], [(article.id, '日志缺失')])
+
+    def test_publish_without_cache(self):
+        """测试缓存不可用时保存文章不报错，本进程索引仍然更新"""
+        from unittest import mock
+        from django.core.cache import cache
+        from .suggest import suggest, get_index
+        get_index()
+        with mock.patch.object(cache, 'incr', side_effect=ValueError), self.captureOnCommitCallbacks(execute=True):
+            article = Article.objects.create(title='缓存故障', content='内容', author=self.user1,
+                                             category=self.category1)
+        self.assertEqual(suggest('缓存故障')['titles'], [(article.id, '缓存故障')])
+
+
+class DuplicateDetectionTestCase(BaseTestCase):
+    """近似重复文章检测测试"""
+
+    def setUp(self):
+        super().setUp()
+        self.content = ''.join(
+            f'第{i}段：这篇文章介绍了缓存、索引和查询优化在博客系统中的具体实践方法。' for i in range(20)
+        )
+        self.original = Article.objects.create(
+            title='原创文章', content=self.content, author=self.user1, category=self.category1,
+        )
+        self.authenticate_user(self.user2)
+
+    def post_article(self, title, content):
+        return self.client.post('/api/articles/', {
+            'title': title, 'content': content, 'category': '技术',
+        }, content_type='application/json')
+
+    def test_reject_near_duplicate(self):
+        """测试拒绝稍作修改的转载内容"""
+        response = self.post_article('换一个新的标题', self.content.replace('第3段', '第三段') + '转载')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('content', response.data['errors'])
+
+        response = self.post_article('一篇不同的文章', '完全不同的内容，讲述了周末去山里徒步的经历。' * 5)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_update_own_article_not_duplicate(self):
+        """测试修改文章时不与自身比较"""
+        from .serializers import ArticleSerializer
+        serializer = ArticleSerializer(self.original, data={'content': self.content + '补充'}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+    def test_build_command(self):
+        """测试批量命令为缺少签名的文章补写签名"""
+        from django.core.management import call_command
+        from io import StringIO
+        from .models import ArticleSignature, ArticleBand
+        from .duplicates import BANDS
+        ArticleSignature.objects.all().delete()
+        ArticleBand.objects.all().delete()
+        call_command('build_article_signatures', stdout=StringIO())
+        self.assertTrue(ArticleSignature.objects.filter(article=self.original).exists())
+        self.assertEqual(ArticleBand.objects.filter(article=self.original).count(), BANDS)
+
+
+class ArticleEventsTestCase(BaseTestCase):
+    """文章实时推送测试"""
+
+    @override_settings(SSE_BACKEND='local', SSE_HEARTBEAT_INTERVAL=0.05)
+    async def test_stream_coalesces_counters(self):
+        """测试事件按顺序推送，相邻计数增量合并，空闲时发送心跳"""
+        import asyncio
+        from .events import broker, publish, stream
+        subscription = broker.subscribe(self.article1.id)
+        events = stream(subscription)
+        self.assertTrue((await anext(events)).startswith('retry:'))
+
+        publish(self.article1.id, 'counters', {'like_count': 1})
+        publish(self.article1.id, 'counters', {'like_count': 1, 'views': 1})
+        publish(self.article1.id, 'comment', {'id': 1})
+        publish(self.article2.id, 'comment', {'id': 2})
+        await asyncio.sleep(0)
+        chunk = await asyncio.wait_for(anext(events), 1)
+        self.assertEqual(chunk, (
+            'event: counters\ndata: {"like_count": 2, "views": 1}\n\n'
+            'event: comment\ndata: {"id": 1}\n\n'
+        ))
+        self.assertEqual(await asyncio.wait_for(anext(events), 1), ': heartbeat\n\n')
+
+        await events.aclose()
+        self.assertEqual(broker.connection_count, 0)
+
+    @override_settings(SSE_BACKEND='local', SSE_MAX_CONNECTIONS_PER_ARTICLE=1)
+    async def test_connection_limit(self):
+        """测试超过单篇文章连接数上限时返回503"""
+        from django.test import AsyncClient
+        from .events import broker
+        subscription = broker.subscribe(self.article1.id)
+        try:
+            response = await AsyncClient().get(f'/api/articles/{self.article1.id}/events/')
+            self.assertEqual(response.status_code, 503)
+            self.assertIn('Retry-After', response)
+            response = await AsyncClient().get('/api/articles/99999/events/')
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        finally:
+            broker.unsubscribe(subscription)
+
+    def test_publish_on_comment_and_like(self):
+        """测试新评论和点赞在事务提交后发布，WSGI 下拒绝长连接"""
+        from unittest import mock
+        from .events import broker
+        self.authenticate_user(self.user2)
+        with mock.patch.object(broker, 'publish') as publish, self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/articles/{self.article1.id}/comments/', {'content': '这是一条实时推送的评论'})
+            self.client.post(f'/api/articles/{self.article1.id}/likes/')
+        calls = [(call.args[1], call.args[2]) for call in publish.call_args_list]
+        self.assertEqual(calls[0][0], 'comment')
+        self.assertEqual(calls[0][1]['content'], '这是一条实时推送的评论')
+        self.assertIn(('counters', {'like_count': 1}), calls)
+
+        response = self.client.get(f'/api/articles/{self.article1.id}/events/')
+        self.assertEqual(response.status_code, 501)
+
+
+class SoftDeleteTestCase(BaseTestCase):
+    """软删除与后台清理测试"""
+
+    def setUp(self):
+        super().setUp()
+        self.comment = Comment.objects.create(article=self.article1, author=self.user2, content='一条将被清理的评论')
+        Comment.objects.create(article=self.article1, author=self.user1, content='一条回复', parent=self.comment)
+        Like.objects.create(article=self.article1, user=self.user2)
+
+    def test_delete_article_hides_it(self):
+        """测试删除文章只做标记，文章从列表和详情中隐藏"""
+        self.authenticate_user(self.user1)
+        response = self.client.delete(f'/api/articles/{self.article1.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertFalse(Article.objects.filter(id=self.article1.id).exists())
+        self.assertTrue(Article.all_objects.filter(id=self.article1.id).exists())
+        self.assertEqual(Comment.objects.filter(article_id=self.article1.id).count(), 2)
+        self.assertEqual(self.client.get(f'/api/articles/{self.article1.id}/').status_code, status.HTTP_404_NOT_FOUND)
+        ids = [item['id'] for item in self.client.get('/api/articles/').data['results']]
+        self.assertNotIn(self.article1.id, ids)
+
+    def test_purge_article(self):
+        """测试宽限期后分批硬删除文章及其关联数据"""
+        from datetime import timedelta
+        from .deletion import purge_deleted, soft_delete_articles
+        soft_delete_articles([self.article1.id])
+        self.assertEqual(purge_deleted(grace_period=timedelta(hours=1), pause=0), 0)
+        self.assertEqual(purge_deleted(grace_period=timedelta(0), batch_size=1, pause=0), 1)
+
+        self.assertFalse(Article.all_objects.filter(id=self.article1.id).exists())
+        self.assertFalse(Comment.objects.filter(article_id=self.article1.id).exists())
+        self.assertFalse(Like.objects.filter(article_id=self.article1.id).exists())
+        self.assertTrue(Article.objects.filter(id=self.article2.id).exists())
+
+    def test_delete_account(self):
+        """测试注销账号后无法登录、主页隐藏，清理时扣减点赞数"""
+        from datetime import timedelta
+        from django.contrib.auth.models import User
+        from .counters import increment
+        from .deletion import purge_deleted
+        increment(self.article1.id, 'like_count')
+        self.authenticate_user(self.user2)
+        response = self.client.delete('/api/users/profile/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertFalse(Article.objects.filter(author=self.user2).exists())
+        self.client.defaults.pop('HTTP_AUTHORIZATION')
+        response = self.client.post('/api/auth/login/', {'email': self.user2.email, 'password': 'testpass123'})
+        self.assertNotEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(f'/api/users/{self.user2.id}/profile/').status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+        purge_deleted(grace_period=timedelta(0), pause=0)
+        self.assertFalse(User.objects.filter(id=self.user2.id).exists())
+        self.assertFalse(Comment.objects.filter(author_id=self.user2.id).exists())
+        self.assertEqual(ArticleStats.objects.get(article=self.article1).like_count, 0)
+
+    def test_purge_skips_row_signals(self):
+        """测试清理文章时不逐行记录统计、推送删除事件"""
+        from datetime import timedelta
+        from unittest import mock
+        from .deletion import purge_deleted, soft_delete_articles
+        soft_delete_articles([self.article1.id])
+        with mock.patch('backend.signals.record_analytics') as record, \
+                mock.patch('backend.signals.publish_on_commit') as publish:
+            purge_deleted(grace_period=timedelta(0), pause=0)
+        record.assert_not_called()
+        publish.assert_not_called()
+        self.assertFalse(Article.all_objects.filter(id=self.article1.id).exists())
+
+    def test_purge_user_updates_reply_counts(self):
+        """测试清理用户评论时扣减保留下来的父评论的回复数"""
+        from datetime import timedelta
+        from .deletion import purge_deleted, soft_delete_user
+        parent = Comment.objects.create(article=self.article1, author=self.user1, content='保留的评论')
+        Comment.objects.create(article=self.article1, author=self.user2, content='将被清理的回复', parent=parent)
+        soft_delete_user(self.user2)
+        purge_deleted(grace_period=timedelta(0), batch_size=1, pause=0)
+        parent.refresh_from_db()
+        self.assertEqual(parent.reply_count, 0)
+        self.assertFalse(Comment.objects.filter(author_id=self.user2.id).exists())
+
+
+class RequestCoalescingTestCase(BaseTestCase):
+    """请求合并测试"""
+
+    def test_concurrent_calls_share_result(self):
+        """测试并发的相同键只计算一次"""
+        import threading
+        import time
+        from . import coalesce
+        release, calls, results = threading.Event(), [], []
+
+        def compute():
+            calls.append(1)
+            release.wait(1)
+            return {'value': 42}
+
+        threads = [threading.Thread(target=lambda: results.append(coalesce.coalesce('test:key', compute)))
+                   for _ in range(5)]
+        threads[0].start()
+        while 'test:key' not in coalesce._inflight:
+            time.sleep(0.001)
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'value': 42}] * 5)
+
+    def test_cross_process_lock(self):
+        """测试其他进程持锁时等待缓存中的结果，超时后自行计算"""
+        import threading
+        from django.core.cache import cache
+        from .coalesce import coalesce, lock_key
+        cache.add(lock_key('test:shared'), 'other-node', 5)
+        threading.Timer(0.05, lambda: cache.set('test:shared', 'from-other', 60)).start()
+        self.assertEqual(coalesce('test:shared', lambda: 'local', timeout=60, wait_timeout=1), 'from-other')
+
+        cache.add(lock_key('test:stuck'), 'other-node', 5)
+        self.assertEqual(coalesce('test:stuck', lambda: 'local', timeout=60, wait_timeout=0.05), 'local')
+
+    def test_feed_page_shared_between_users(self):
+        """测试列表页在用户间共享，点赞状态按用户叠加"""
+        from .article_views import ARTICLE_LIST_FIELDS
+        Like.objects.create(article=self.article1, user=self.user2)
+        response = self.client.get('/api/articles/')
+        self.assertTrue(all(not item['liked'] for item in response.data['results']))
+
+        self.authenticate_user(self.user2)
+        response = self.client.get('/api/articles/')
+        liked = {item['id']: item['liked'] for item in response.data['results']}
+        self.assertEqual(liked, {self.article1.id: True, self.article2.id: False})
+        self.assertEqual(list(response.data['results'][0]), list(ARTICLE_LIST_FIELDS))
+
+
+class DailyStatsTestCase(BaseTestCase):
+    """文章按天统计测试"""
+
+    def test_flush_into_daily_buckets(self):
+        """测试缓存中的计数批量写入按天的统计表，重复写入不会重复累加"""
+        import datetime
+        from .analytics import flush, record
+        from .models import ArticleDailyStats
+        record(self.article1.id, 'views', 5)
+        Like.objects.create(article=self.article1, user=self.user2)
+        Comment.objects.create(article=self.article1, author=self.user2, content='按天统计的评论')
+        self.assertEqual(flush(), 1)
+        # 没有新的计数时不遍历文章
+        with self.assertNumQueries(0):
+            self.assertEqual(flush(), 0)
+
+        record(self.article1.id, 'views', 2)
+        flush()
+        row = ArticleDailyStats.objects.get(article=self.article1, day=datetime.date.today())
+        self.assertEqual((row.views, row.likes, row.comments), (7, 1, 1))
+
+    def test_flush_skips_deleted_articles_and_keeps_failed_writes(self):
+        """测试已删除文章的计数被丢弃，写入失败时计数保留到下次"""
+        import datetime
+        from unittest import mock
+        from .analytics import flush, record
+        from .deletion import purge_article
+        from .models import ArticleDailyStats
+        Like.objects.create(article=self.article2, user=self.user1)
+        record(self.article1.id, 'likes', 2)
+        purge_article(self.article2.id, pause=0)
+        record(self.article2.id, 'views')
+
+        with mock.patch('backend.analytics.ArticleDailyStats.objects.bulk_create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                flush()
+        self.assertEqual(flush(), 1)
+        row = ArticleDailyStats.objects.get(article=self.article1, day=datetime.date.today())
+        self.assertEqual(row.likes, 2)
+        self.assertEqual(flush(), 0)
+
+    def test_author_stats(self):
+        """测试作者统计接口按日期范围返回补0的序列和文章汇总"""
+        import datetime
+        from .models import ArticleDailyStats
+        day = datetime.date(2024, 5, 1)
+        ArticleDailyStats.objects.create(article=self.article1, day=day, views=10, likes=2, comments=1)
+        ArticleDailyStats.objects.create(article=self.article1, day=day + datetime.timedelta(days=2), views=5)
+        ArticleDailyStats.objects.create(article=self.article2, day=day, views=100)
+
+        self.authenticate_user(self.user1)
+        response = self.client.get('/api/users/profile/stats/', {'start': '2024-05-01', 'end': '2024-05-03'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['views'] for item in response.data['series']], [10, 0, 5])
+        self.assertEqual(response.data['totals'], {'views': 15, 'likes': 2, 'comments': 1})
+        self.assertEqual([item['id'] for item in response.data['articles']], [self.article1.id])
+
+        response = self.client.get('/api/users/profile/stats/', {'start': '2024-13-01'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class FollowTimelineTestCase(BaseTestCase):
+    """关注与关注时间线测试"""
+
+    def publish(self, title):
+        from .timeline import fanout_pending
+        with self.captureOnCommitCallbacks(execute=True):
+            article = Article.objects.create(title=title, content=f'{title}的内容', author=self.user2,
+                                             category=self.category1)
+        fanout_pending()
+        return article
+
+    def timeline_ids(self, **params):
+        response = self.client.get('/api/timeline/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['id'] for item in response.data['results']], response.data['next']
+
+    def test_follow_fanout_and_unfollow(self):
+        """测试关注时补入最近文章，新文章推送到粉丝时间线，取消关注后移除"""
+        self.authenticate_user(self.user1)
+        response = self.client.post(f'/api/users/{self.user2.id}/follow/')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(UserProfile.objects.get(user=self.user2).follower_count, 1)
+        self.assertEqual(self.timeline_ids()[0], [self.article2.id])
+
+        article = self.publish('关注后发布')
+        self.assertEqual(self.timeline_ids()[0], [article.id, self.article2.id])
+
+        self.client.delete(f'/api/users/{self.user2.id}/follow/')
+        self.assertEqual(self.timeline_ids()[0], [])
+        self.assertEqual(UserProfile.objects.get(user=self.user2).follower_count, 0)
+
+        response = self.client.post(f'/api/users/{self.user1.id}/follow/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_pull_for_large_authors_with_cursor(self):
+        """测试粉丝数达到上限的作者不推送，读取时合并，并按游标翻页"""
+        from .models import TimelineEntry
+        self.authenticate_user(self.user1)
+        self.client.post(f'/api/users/{self.user2.id}/follow/')
+        articles = [self.publish(f'大V文章{i}') for i in range(3)]
+        self.assertFalse(TimelineEntry.objects.filter(article__in=articles).exists())
+
+        first, cursor = self.timeline_ids(page_size=2)
+        second, cursor = self.timeline_ids(page_size=2, before=cursor)
+        self.assertEqual(first + second, [articles[2].id, articles[1].id, articles[0].id, self.article2.id])
+        self.assertEqual(self.timeline_ids(page_size=2, before=cursor), ([], None))
+
+    def test_publish_defers_fanout_and_page_size_bounds(self):
+        """测试发布时只记录待推送，分页大小越界时限制在范围内，非整数返回400"""
+        from .models import TimelineEntry
+        from .timeline import fanout_pending
+        self.authenticate_user(self.user1)
+        self.client.post(f'/api/users/{self.user2.id}/follow/')
+        with self.captureOnCommitCallbacks(execute=True):
+            article = Article.objects.create(title='稍后推送', content='稍后推送的内容', author=self.user2,
+                                             category=self.category1)
+        self.assertFalse(TimelineEntry.objects.filter(article=article).exists())
+        self.assertEqual(fanout_pending(), 1)
+        self.assertTrue(TimelineEntry.objects.filter(article=article, user=self.user1).exists())
+
+        self.assertEqual(len(self.timeline_ids(page_size=0)[0]), 1)
+        self.assertEqual(len(self.timeline_ids(page_size=-5)[0]), 1)
+        response = self.client.get('/api/timeline/', {'page_size': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RateLimitTestCase(BaseTestCase):
+    """写接口令牌桶限流测试"""
+
+    @override_settings(RATE_LIMITS={'likes': [('user', '2/m')]})
+    def test_rejects_with_retry_after(self):
+        """测试超出速率时返回429和 Retry-After，读请求不受限"""
+        self.authenticate_user(self.user1)
+        url = f'/api/articles/{self.article2.id}/likes/'
+        for _ in range(2):
+            self.assertNotEqual(self.client.post(url).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertEqual(self.client.get(f'/api/articles/{self.article2.id}/').status_code, status.HTTP_200_OK)
+
+    @override_settings(RATE_LIMITS={'likes': [('user', '1/m')]})
+    def test_user_scope_separates_users(self):
+        """测试按用户限流时不同用户各自计数"""
+        url = f'/api/articles/{self.article1.id}/likes/'
+        self.authenticate_user(self.user1)
+        self.client.post(url)
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.authenticate_user(self.user2)
+        self.assertNotEqual(self.client.post(url).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(RATE_LIMITS={'login': [('ip', '1/m')]}, RATE_LIMIT_PROXY_COUNT=1)
+    def test_ip_scope_behind_proxy(self):
+        """测试按代理追加的客户端地址限流"""
+        data = {'username': 'nobody', 'password': 'wrong'}
+        self.client.post('/api/auth/login/', data, HTTP_X_FORWARDED_FOR='10.0.0.1')
+        response = self.client.post('/api/auth/login/', data, HTTP_X_FORWARDED_FOR='10.0.0.1')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        response = self.client.post('/api/auth/login/', data, HTTP_X_FORWARDED_FOR='10.0.0.2')
+        self.assertNotEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(RATE_LIMITS={'login': [('ip', '1/m'), ('global', '3/m')]}, RATE_LIMIT_PROXY_COUNT=1)
+    def test_rejected_request_keeps_other_buckets(self):
+        """测试被单个地址的规则拒绝的请求不消耗全局桶的令牌"""
+        data = {'username': 'nobody', 'password': 'wrong'}
+        for _ in range(5):
+            self.client.post('/api/auth/login/', data, HTTP_X_FORWARDED_FOR='10.0.0.1')
+        for address in ('10.0.0.2', '10.0.0.3'):
+            response = self.client.post('/api/auth/login/', data, HTTP_X_FORWARDED_FOR=address)
+            self.assertNotEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+
+class SyndicationTestCase(BaseTestCase):
+    """订阅源和站点地图测试"""
+
+    def content(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_feeds_stream_latest_articles(self):
+        """测试 RSS/Atom 流式输出最新文章，未变化时返回304"""
+        Article.objects.filter(id=self.article1.id).update(title='A & <B>')
+        response = self.client.get('/api/feed/rss/')
+        self.assertEqual(response['Content-Type'], 'application/rss+xml; charset=utf-8')
+        body = self.content(response)
+        self.assertIn('A &amp; &lt;B&gt;', body)
+        self.assertIn(f'/posts/{self.article2.id}</link>', body)
+
+        response = self.client.get('/api/feed/rss/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        body = self.content(self.client.get('/api/feed/atom/'))
+        self.assertEqual(body.count('<entry>'), 2)
+
+    @override_settings(SITEMAP_SEGMENT_SIZE=1)
+    def test_sitemap_index_and_segments(self):
+        """测试站点地图按文章id分段，索引列出全部分段"""
+        body = self.content(self.client.get('/api/sitemap.xml'))
+        for article in (self.article1, self.article2):
+            self.assertIn(f'/api/sitemap-{article.id - 1}.xml</loc>', body)
+
+        body = self.content(self.client.get(f'/api/sitemap-{self.article2.id - 1}.xml'))
+        self.assertIn(f'/posts/{self.article2.id}</loc>', body)
+        self.assertNotIn(f'/posts/{self.article1.id}</loc>', body)
+        self.assertEqual(self.client.get('/api/sitemap-999.xml').status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(SITEMAP_SEGMENT_SIZE=10000)
+    def test_segments_updated_incrementally(self):
+        """测试发布、删除文章时修改已缓存的分段，不重新查询"""
+        from django.core.cache import cache
+        from .deletion import soft_delete_articles
+        from .syndication import segment_key
+        self.content(self.client.get('/api/sitemap-0.xml'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            article = Article.objects.create(title='新文章', content='新文章的内容', author=self.user1,
+                                             category=self.category1)
+        self.assertIn(article.id, cache.get(segment_key(0)))
+        with self.assertNumQueries(0):
+            body = self.content(self.client.get('/api/sitemap-0.xml'))
+        self.assertIn(f'/posts/{article.id}</loc>', body)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            soft_delete_articles([self.article1.id])
+        self.assertNotIn(self.article1.id, cache.get(segment_key(0)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Article.all_objects.get(id=self.article2.id).delete()
+        self.assertNotIn(self.article2.id, cache.get(segment_key(0)))
+
+    def test_index_built_by_one_request(self):
+        """测试其他请求正在构建索引时等待结果，不重复扫描全表"""
+        from unittest import mock
+        from django.core.cache import cache
+        from .syndication import INDEX_KEY, get_index
+        cache.add(f'{INDEX_KEY}:build', 1, 60)
+        built = {0: '2024-01-01'}
+        with mock.patch('backend.syndication.time.sleep', side_effect=lambda _: cache.set(INDEX_KEY, built)), \
+                self.assertNumQueries(0):
+            self.assertEqual(get_index(), built)
+
+
 if __name__ == '__main__':
     import unittest
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,135 @@
+"""
+关注与关注时间线
+作者发文后把文章id推送到每个粉丝的 TimelineEntry（写扩散）；粉丝数达到 TIMELINE_FANOUT_LIMIT 的作者不推送，
+读取时从这些作者的文章中直接取（读扩散）。两路结果都按 (发布时间, 文章id) 倒序，各取一页后归并，
+读取代价只与页大小和关注的大V数量有关，与关注的作者总数无关。
+推送不在发布请求中执行：文章提交后记入待推送集合，由定时任务 fanout_new_articles 批量推送
+"""
+import datetime
+import heapq
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .dirty import drain as drain_dirty, mark as mark_dirty
+from .models import Article, Follow, TimelineEntry, UserProfile
+
+FANOUT_BATCH_SIZE = 1000
+DIRTY_FANOUT = 'fanout'
+BACKFILL_SIZE = 50  # 关注时补入作者最近的文章数
+
+
+def is_fanout_author(author_id):
+    """粉丝数未达到上限的作者发文时推送到粉丝时间线"""
+    count = UserProfile.objects.filter(user_id=author_id).values_list('follower_count', flat=True).first() or 0
+    return count < settings.TIMELINE_FANOUT_LIMIT
+
+
+def fanout(article_id, author_id, pub_time):
+    """把新文章推送给作者的全部粉丝，返回推送的行数"""
+    if not is_fanout_author(author_id):
+        return 0
+    last_id, pushed = 0, 0
+    while True:
+        rows = list(Follow.objects.filter(followee_id=author_id, pk__gt=last_id).order_by('pk').values_list(
+            'pk', 'follower_id',
+        )[:FANOUT_BATCH_SIZE])
+        if not rows:
+            return pushed
+        TimelineEntry.objects.bulk_create([
+            TimelineEntry(user_id=follower_id, article_id=article_id, author_id=author_id, pub_time=pub_time)
+            for _, follower_id in rows
+        ], ignore_conflicts=True)
+        pushed += len(rows)
+        last_id = rows[-1][0]
+
+
+def enqueue_fanout(article_id):
+    """记录待推送的文章，由定时任务推送"""
+    mark_dirty(DIRTY_FANOUT, article_id)
+
+
+def fanout_pending():
+    """推送待推送集合中的文章，返回推送的行数；已删除的文章不推送"""
+    article_ids = drain_dirty(DIRTY_FANOUT)
+    pending, pushed = set(article_ids), 0
+    try:
+        for article_id, author_id, pub_time in Article.objects.filter(id__in=article_ids).values_list(
+            'id', 'author_id', 'pub_time',
+        ):
+            pushed += fanout(article_id, author_id, pub_time)
+            pending.discard(article_id)
+    except Exception:
+        # 未推送的文章留到下次
+        mark_dirty(DIRTY_FANOUT, *pending)
+        raise
+    return pushed
+
+
+def follow(follower_id, followee_id):
+    """关注作者并补入其最近的文章，已关注时返回 False；粉丝数由信号维护"""
+    with transaction.atomic():
+        _, created = Follow.objects.get_or_create(follower_id=follower_id, followee_id=followee_id)
+    if created and is_fanout_author(followee_id):
+        recent = Article.objects.filter(author_id=followee_id).order_by('-pub_time').values_list(
+            'id', 'pub_time',
+        )[:BACKFILL_SIZE]
+        TimelineEntry.objects.bulk_create([
+            TimelineEntry(user_id=follower_id, article_id=article_id, author_id=followee_id, pub_time=pub_time)
+            for article_id, pub_time in recent
+        ], ignore_conflicts=True)
+    return created
+
+
+def unfollow(follower_id, followee_id):
+    """取消关注并移除时间线中该作者的文章，未关注时返回 False"""
+    with transaction.atomic():
+        deleted, _ = Follow.objects.filter(follower_id=follower_id, followee_id=followee_id).delete()
+        if deleted:
+            TimelineEntry.objects.filter(user_id=follower_id, author_id=followee_id).delete()
+    return bool(deleted)
+
+
+def make_cursor(pub_time, article_id):
+    return f'{pub_time.isoformat()}_{article_id}'
+
+
+def parse_cursor(cursor):
+    """解析分页游标，格式错误时抛出 ValueError"""
+    pub_time, _, article_id = cursor.rpartition('_')
+    return datetime.datetime.fromisoformat(pub_time), int(article_id)
+
+
+def _before(cursor, time_field, id_field):
+    if cursor is None:
+        return Q()
+    pub_time, article_id = cursor
+    return Q(**{f'{time_field}__lt': pub_time}) | Q(**{time_field: pub_time, f'{id_field}__lt': article_id})
+
+
+def read_timeline(user_id, page_size, cursor=None):
+    """返回一页 (发布时间, 文章id)，按发布时间倒序；cursor 为上一页最后一项"""
+    pushed = TimelineEntry.objects.filter(
+        _before(cursor, 'pub_time', 'article_id'), user_id=user_id, article__deleted_at__isnull=True,
+    ).order_by('-pub_time', '-article_id').values_list('pub_time', 'article_id')[:page_size]
+
+    pulled = []
+    fanout_limit = settings.TIMELINE_FANOUT_LIMIT
+    authors = list(Follow.objects.filter(
+        follower_id=user_id, followee__backend_profile__follower_count__gte=fanout_limit,
+    ).values_list('followee_id', flat=True))
+    if authors:
+        pulled = Article.objects.filter(_before(cursor, 'pub_time', 'id'), author_id__in=authors).order_by(
+            '-pub_time', '-id',
+        ).values_list('pub_time', 'id')[:page_size]
+
+    # 作者粉丝数越过上限前推送的文章可能两路都有，按文章id去重
+    page, seen = [], set()
+    for pub_time, article_id in heapq.merge(pushed, pulled, reverse=True):
+        if article_id not in seen:
+            seen.add(article_id)
+            page.append((pub_time, article_id))
+            if len(page) == page_size:
+                break
+    return page
@@ -11,6 +11,8 @@ urlpatterns = [
     # 文章相关
     path('articles/', views.ArticleList.as_view(), name='articles'),
     path('articles/<int:pk>/', views.ArticleDetail.as_view(), name='article-detail'),
+    path('articles/<int:pk>/related/', views.related_articles, name='related-articles'),
+    path('suggestions/', views.suggestions, name='suggestions'),
 
     # 分类和标签相关
     path('categories/', views.get_categories, name='get-categories'),
@@ -23,8 +25,23 @@ urlpatterns = [
     # 互动功能
     path('articles/<int:article_id>/likes/', views.Likes.as_view(), name='likes'),
     path('articles/<int:article_id>/dislikes/', views.Dislikes.as_view(), name='dislikes'),
+    path('articles/<int:pk>/events/', views.article_events, name='article-events'),
     
     # 用户资料相关
     path('users/profile/', views.UserProfilesView.as_view(), name='my-profile'),
     path('users/<int:user_id>/profile/', views.UserProfilesView.as_view(), name='other-profile'),
+    path('users/profile/stats/', views.author_stats, name='author-stats'),
+
+    # 关注
+    path('users/<int:user_id>/follow/', views.FollowView.as_view(), name='follow'),
+    path('timeline/', views.following_timeline, name='following-timeline'),
+
+    # 订阅源和站点地图
+    path('feed/rss/', views.rss_feed, name='rss-feed'),
+    path('feed/atom/', views.atom_feed, name='atom-feed'),
+    path('sitemap.xml', views.sitemap, name='sitemap'),
+    path('sitemap-<int:segment>.xml', views.sitemap_segment, name='sitemap-segment'),
+
+    # 监控
+    path('metrics/cache/', views.cache_metrics, name='cache-metrics'),
 ]
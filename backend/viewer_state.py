@@ -0,0 +1,27 @@
+"""
+当前用户对文章的点赞/踩状态
+整页文章的状态通过一次 UNION 查询获取
+"""
+from django.db.models import Value
+
+from .models import Like, Dislike
+
+EMPTY_STATE = {'liked': False, 'disliked': False}
+
+
+def get_viewer_states(article_ids, user):
+    """批量获取用户对多篇文章的状态，返回 {文章id: {'liked':…, 'disliked':…}}"""
+    states = {article_id: dict(EMPTY_STATE) for article_id in article_ids}
+    if not user.is_authenticated or not states:
+        return states
+
+    likes = Like.objects.filter(user_id=user.id, article_id__in=states).values_list('article_id', Value('liked'))
+    dislikes = Dislike.objects.filter(user_id=user.id, article_id__in=states).values_list('article_id', Value('disliked'))
+    for article_id, kind in likes.union(dislikes, all=True):
+        states[article_id][kind] = True
+    return states
+
+
+def get_viewer_state(article_id, user):
+    """获取用户对单篇文章的状态"""
+    return get_viewer_states([article_id], user)[article_id]
@@ -5,10 +5,17 @@
 # 导入所有模块化视图
 from .auth_views import login, register, send_captcha, password_reset
 from .article_views import ArticleDetail, ArticleList
+from .related_views import related_articles
+from .suggest_views import suggestions
 from .comment_views import Comments
 from .interaction_views import Likes, Dislikes
+from .event_views import article_events
 from .profile_views import UserProfilesView
+from .analytics_views import author_stats
+from .follow_views import FollowView, following_timeline
 from .category_views import get_categories, tags
+from .syndication_views import rss_feed, atom_feed, sitemap, sitemap_segment
+from .metrics_views import cache_metrics
 
 # 导出所有视图函数
 __all__ = [
@@ -21,6 +28,8 @@ __all__ = [
     # 文章视图
     'ArticleList',
     'ArticleDetail',
+    'related_articles',
+    'suggestions',
 
     # 评论视图
     'Comments',
@@ -28,11 +37,26 @@ __all__ = [
     # 互动视图
     'Likes',
     'Dislikes',
+    'article_events',
     
     # 用户资料视图
     'UserProfilesView',
+    'author_stats',
+
+    # 关注视图
+    'FollowView',
+    'following_timeline',
     
     # 分类和标签视图
     'get_categories',
     'tags',
+
+    # 订阅源和站点地图
+    'rss_feed',
+    'atom_feed',
+    'sitemap',
+    'sitemap_segment',
+
+    # 监控视图
+    'cache_metrics',
 ]
\ No newline at end of file
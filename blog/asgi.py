@@ -5,6 +5,9 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+文章实时推送（/api/articles/<id>/events/）是长连接，需要通过本入口以 ASGI 方式部署，
+例如 gunicorn -c blog/gunicorn.conf.py -k uvicorn_worker.UvicornWorker blog.asgi
 """
 
 import os
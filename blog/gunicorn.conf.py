@@ -0,0 +1,48 @@
+"""
+gunicorn 生产环境配置
+启动：gunicorn -c blog/gunicorn.conf.py blog.wsgi
+
+主进程预加载应用并执行预热（导入视图、编译路由、加载分类快照），随后 gc.freeze()，
+fork 出的 worker 通过写时复制共享这部分内存。worker 类型和线程数由环境变量控制：
+  GUNICORN_WORKER_CLASS  sync / gthread，默认 gthread；
+                         需要文章实时推送时使用 uvicorn_worker.UvicornWorker 并加载 blog.asgi
+  GUNICORN_WORKERS       worker 数，默认 CPU核数 * 2 + 1
+  GUNICORN_THREADS       每个 worker 的线程数，默认 4（sync 时忽略）
+"""
+import multiprocessing
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv(Path(__file__).resolve().parent.parent / '.env')
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('GUNICORN_WORKERS', str(multiprocessing.cpu_count() * 2 + 1)))
+threads = int(os.environ.get('GUNICORN_THREADS', '4')) if worker_class == 'gthread' else 1
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '5'))
+
+# 定期重启 worker，防止内存缓慢增长；抖动避免所有 worker 同时重启
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '5000'))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', '500'))
+
+# 在主进程中加载应用，fork 前完成预热
+preload_app = True
+
+pidfile = os.environ.get('GUNICORN_PIDFILE') or None
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+loglevel = os.environ.get('LOG_LEVEL', 'INFO').lower()
+
+# 心跳文件放在内存文件系统，避免磁盘阻塞导致 worker 被误判超时
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+
+def when_ready(server):
+    """应用已预加载、尚未 fork worker 时执行预热"""
+    from backend.warmup import warmup
+    warmup(freeze=os.environ.get('GUNICORN_GC_FREEZE', 'True').lower() == 'true')
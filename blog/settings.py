@@ -53,6 +53,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'backend.middleware.CompressionMiddleware',
+    'backend.middleware.RateLimitMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',  # 暂时注释掉，用于API开发
@@ -164,7 +166,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'backend.renderers.FastJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
@@ -173,6 +175,66 @@ REST_FRAMEWORK = {
     ],
 }
 
+# 响应压缩配置（安装 brotli 后优先使用 br 编码）
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))  # 小于该字节数的响应不压缩
+COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', '6'))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', '5'))
+
+# 文章正文存储压缩：none / zlib / zstd（需安装 zstandard），小于阈值字节数的正文不压缩
+ARTICLE_CONTENT_CODEC = os.environ.get('ARTICLE_CONTENT_CODEC', 'zlib')
+ARTICLE_CONTENT_COMPRESS_MIN_SIZE = int(os.environ.get('ARTICLE_CONTENT_COMPRESS_MIN_SIZE', '1024'))
+ARTICLE_CONTENT_ZLIB_LEVEL = int(os.environ.get('ARTICLE_CONTENT_ZLIB_LEVEL', '6'))
+ARTICLE_CONTENT_ZSTD_LEVEL = int(os.environ.get('ARTICLE_CONTENT_ZSTD_LEVEL', '3'))
+
+# 缓存中累加的计数（浏览量、按天统计）记录待写入的文章id，定时任务只写入这些文章
+COUNTER_REDIS_ALIAS = 'redis'
+
+# 文章实时推送（SSE，需 ASGI 部署）
+# SSE_BACKEND=redis 时通过 Redis 发布/订阅在多个进程、节点间转发事件，local 只投递给本进程
+SSE_BACKEND = os.environ.get('SSE_BACKEND', 'redis')
+SSE_REDIS_ALIAS = 'redis'
+SSE_MAX_CONNECTIONS = int(os.environ.get('SSE_MAX_CONNECTIONS', '1000'))  # 每个进程的连接数上限
+SSE_MAX_CONNECTIONS_PER_ARTICLE = int(os.environ.get('SSE_MAX_CONNECTIONS_PER_ARTICLE', '200'))
+SSE_HEARTBEAT_INTERVAL = float(os.environ.get('SSE_HEARTBEAT_INTERVAL', '15'))  # 空闲时心跳间隔（秒）
+SSE_QUEUE_SIZE = 100  # 每个连接待发送事件的上限
+SSE_RETRY_MS = 3000  # 客户端断线重连间隔
+
+# 软删除：删除的文章和注销的账号在宽限期后由定时任务分批清理
+SOFT_DELETE_GRACE_PERIOD = timedelta(seconds=int(os.environ.get('SOFT_DELETE_GRACE_SECONDS', str(60 * 60))))
+PURGE_BATCH_SIZE = int(os.environ.get('PURGE_BATCH_SIZE', '500'))  # 每批删除的行数
+PURGE_BATCH_PAUSE = float(os.environ.get('PURGE_BATCH_PAUSE', '0.1'))  # 两批之间停顿的秒数
+
+# 请求合并：缓存失效时相同的并发查询只执行一次，其余请求等待结果
+COALESCE_WAIT_TIMEOUT = float(os.environ.get('COALESCE_WAIT_TIMEOUT', '2'))  # 等待超时后自行查询
+COALESCE_LOCK_TIMEOUT = float(os.environ.get('COALESCE_LOCK_TIMEOUT', '5'))  # 跨进程锁的有效期
+
+# 关注时间线：粉丝数未达到该值的作者发文时推送到粉丝时间线，达到后改为读取时合并
+TIMELINE_FANOUT_LIMIT = int(os.environ.get('TIMELINE_FANOUT_LIMIT', '10000'))
+
+# 订阅源和站点地图
+SITE_URL = os.environ.get('SITE_URL', 'http://localhost:8080').rstrip('/')  # 前端站点地址，文章链接为 SITE_URL/posts/<id>
+SITE_NAME = os.environ.get('SITE_NAME', '博客')
+FEED_ITEMS = int(os.environ.get('FEED_ITEMS', '50'))  # 订阅源中的文章数
+SITEMAP_SEGMENT_SIZE = 10000  # 每个站点地图分段的地址数（协议上限为50000）
+SITEMAP_CACHE_TIMEOUT = 24 * 60 * 60
+
+# 限流：按 URL 名称配置写请求（POST/PUT/PATCH/DELETE）的令牌桶，速率格式为 次数/s|m|h|d
+# 范围 ip 按客户端地址，user 按登录用户（未登录时按地址），global 为整个接口共享
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'True').lower() == 'true'
+RATE_LIMIT_PROXY_COUNT = int(os.environ.get('RATE_LIMIT_PROXY_COUNT', '0'))  # 前面的反向代理层数
+RATE_LIMIT_REDIS_ALIAS = 'redis'
+RATE_LIMITS = {
+    'send-captcha': [('ip', '5/m'), ('ip', '30/h'), ('global', '600/m')],
+    'login': [('ip', '10/m'), ('ip', '100/h')],
+    'register': [('ip', '5/m'), ('ip', '30/h')],
+    'password_reset': [('ip', '5/m'), ('ip', '30/h')],
+    'articles': [('user', '10/m')],
+    'Comments': [('user', '10/m'), ('ip', '30/m')],
+    'likes': [('user', '30/m')],
+    'dislikes': [('user', '30/m')],
+    'follow': [('user', '30/m')],
+}
+
 # JWT
 SIMPLE_JWT = {
     # 令牌有效期
@@ -190,48 +252,54 @@ CORS_ALLOWED_ORIGINS = [origin.strip() for origin in cors_origins.split(',')]
 CORS_ALLOW_CREDENTIALS = True
 
 # 缓存配置
+# default 为两级缓存：进程内LRU（L1）+ Redis（L2），Redis 不可用时退化为仅使用L1
 CACHES = {
     "default": {
+        "BACKEND": "backend.cache.TieredCache",
+        "LOCATION": "redis",  # L2 使用的缓存别名
+        "OPTIONS": {
+            "L1_MAX_ENTRIES": int(os.environ.get('CACHE_L1_MAX_ENTRIES', '1000')),
+            "L1_TIMEOUT": float(os.environ.get('CACHE_L1_TIMEOUT', '5')),  # L1 条目最长保存秒数
+            "L2_RETRY_INTERVAL": float(os.environ.get('CACHE_L2_RETRY_INTERVAL', '5')),  # Redis 出错后暂停访问的秒数
+        },
+    },
+    "redis": {
         "BACKEND": "django_redis.cache.RedisCache",
-        "LOCATION": "redis://127.0.0.1:6379/1",  # 这里根据你的Redis配置进行调整
+        "LOCATION": os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'),
         "OPTIONS": {
             "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            "CONNECTION_POOL_KWARGS": {
+                "max_connections": int(os.environ.get('REDIS_MAX_CONNECTIONS', '50')),
+                "retry_on_timeout": True,
+            },
+            "SOCKET_CONNECT_TIMEOUT": float(os.environ.get('REDIS_CONNECT_TIMEOUT', '0.5')),
+            "SOCKET_TIMEOUT": float(os.environ.get('REDIS_SOCKET_TIMEOUT', '0.5')),
             # 如果Redis设置了密码，需要添加以下内容
             # "PASSWORD": "your_password",
         },
-    }
+    },
 }
 
 # 日志配置
+# 日志先写入内存队列，由后台线程写入滚动文件（JSON格式）和控制台，避免磁盘阻塞请求
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
-    'formatters': {
-        'verbose': {
-            'format': '{levelname} {asctime} {module} {process:d} {thread:d} {message}',
-            'style': '{',
-        },
-    },
     'handlers': {
-        'file': {
+        'async': {
             'level': os.environ.get('LOG_LEVEL', 'INFO'),
-            'class': 'logging.FileHandler',
+            'class': 'backend.log_handlers.AsyncLogHandler',
             'filename': os.environ.get('LOG_FILE', os.path.join(BASE_DIR, 'django.log')),
-            'formatter': 'verbose',
-        },
-        'console': {
-            'level': 'DEBUG',
-            'class': 'logging.StreamHandler',
-            'formatter': 'verbose',
+            'console': os.environ.get('LOG_CONSOLE', 'True').lower() == 'true',
         },
     },
     'root': {
-        'handlers': ['console', 'file'],
+        'handlers': ['async'],
         'level': 'INFO',
     },
     'loggers': {
         'django': {
-            'handlers': ['console', 'file'],
+            'handlers': ['async'],
             'level': os.environ.get('LOG_LEVEL', 'INFO'),
             'propagate': False,
         },